@@ -1,5 +1,6 @@
 import math
 import random
+from array import array
 import pixpy as pix
 from dataclasses import dataclass
 from pixpy import Float2
@@ -37,17 +38,19 @@ balls = [
 ]
 
 margin = ball_img.size
+colors = array("I", [ball.color for ball in balls])
 
 while pix.run_loop():
     screen.clear()
     z = screen.frame_counter / 100
+    centers = array("f")
+    sizes = array("f")
     for ball in balls:
-        screen.draw_color = ball.color
-        screen.draw(
-            image=ball_img,
-            center=ball.pos,
-            size=ball_img.size * (math.sin(z) + 2.0) * 0.25,
-        )
+        size = ball_img.size.x * (math.sin(z) + 2.0) * 0.25
+        centers.append(ball.pos.x)
+        centers.append(ball.pos.y)
+        sizes.append(size)
+        sizes.append(size)
         z += 0.1
         ball.pos += ball.velocity
 
@@ -57,4 +60,6 @@ while pix.run_loop():
             # Move it to the opposite side of the screen
             ball.pos -= (screen.size + margin * 2) * d.sign()
 
+    # Draw all balls using a single draw call
+    screen.draw_many(ball_img, centers, sizes=sizes, colors=colors)
     screen.swap()
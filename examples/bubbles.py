@@ -1,4 +1,5 @@
 import math
+from array import array
 
 import pixpy as pix
 
@@ -7,8 +8,8 @@ screen = pix.open_display(size=(1280, 720))
 n = 250
 r = 2 * math.pi / 195
 x, y, v, t = 0.0, 0.0, 0.0, 0.0
-points = [0.0] * n * n * 2
-colors = [0] * n * n
+points = array("f", [0.0]) * (n * n * 2)
+colors = array("I", [0]) * (n * n)
 screen.point_size = 8.0
 while pix.run_loop():
     screen.clear()
@@ -8,17 +8,25 @@ screen = pix.open_display(size=(640, 360))
 
 animations: dict[str, list[pix.Image]] = {}
 
-# Load every png image in the `data/knight` folder
+# Find every png image in the `data/knight` folder
 with os.scandir('data/knight') as it:
-    for entry in it:
-        if entry.name.endswith(".png") and entry.is_file():
-            name = os.path.splitext(entry.name)[0]
-            """?
-            We use the file name (without extension) as the animation name, and we
-            assume that every png file contains a set of 120x80 images layed out
-            side by side (check for yourself).
-            """
-            animations[name] = pix.load_png(entry.path).split(width=120, height=80)
+    paths = [entry.path for entry in it
+             if entry.name.endswith(".png") and entry.is_file()]
+
+"""?
+Instead of loading each file into its own texture, we pack them all into
+one big texture, so switching between animations does not switch textures.
+"""
+sheets = pix.Atlas.pack(paths)
+
+for path, sheet in zip(paths, sheets):
+    name = os.path.splitext(os.path.basename(path))[0]
+    """?
+    We use the file name (without extension) as the animation name, and we
+    assume that every png file contains a set of 120x80 images layed out
+    side by side (check for yourself).
+    """
+    animations[name] = sheet.split(width=120, height=80)
 
 run_anim = animations["Run"]
 attack_anim = animations["Attack"]
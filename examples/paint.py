@@ -10,7 +10,10 @@ last_d = 1.0
 while pix.run_loop():
     screen.clear()
     for e in pix.all_events():
-        if isinstance(e, pix.event.Click):
+        if isinstance(e, pix.event.Click) and e.buttons == 1:
+            # Right click fills the area under the pointer
+            canvas.flood_fill((e.pos * 2).toi(), pix.color.LIGHT_BLUE, tolerance=32)
+        elif isinstance(e, pix.event.Click):
             last = e.pos
             canvas.rounded_line(last * 2, 10, last * 2, 10)
         elif isinstance(e, pix.event.Move):
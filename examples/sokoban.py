@@ -154,7 +154,9 @@ class Sokoban:
                     if move:
                         self.player.move_to(target)
             img = pix.Font.UNSCII_FONT.make_image(
-                f"Level: {self.level_no+1:02} Boxes: {self.correct}/{len(self.boxes)}", 16 * 3
+                f"Level: {self.level_no+1:02} Boxes: {self.correct}/{len(self.boxes)}",
+                16 * 3,
+                cached=True,
             )
             self.screen.draw(img)
 
@@ -7,8 +7,9 @@ syntax highlighting, and code execution capabilities.
 
 from .editor import TextEdit
 from .viewer import TextViewer, TextRange
+from .text_buffer import TextBuffer
 from .ide import PixIDE
 
 __version__ = "1.0.0"
-__all__ = ["TextEdit", "TextRange", "TextViewer", "PixIDE"]
+__all__ = ["TextBuffer", "TextEdit", "TextRange", "TextViewer", "PixIDE"]
 
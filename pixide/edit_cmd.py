@@ -1,6 +1,7 @@
+from collections.abc import Sequence
 from typing import override
 
-Char = tuple[int, int]
+from .text_buffer import Char, Line, TextBuffer
 
 Pos = tuple[int, int] | None
 
@@ -10,13 +11,13 @@ class EditCmd:
     Represent an undoable editor command
     """
 
-    def apply(self, _target: list[list[Char]]) -> Pos:
-        """Apply the command to the provided list of lines"""
+    def apply(self, _target: TextBuffer) -> Pos:
+        """Apply the command to the provided text buffer"""
         pass
 
-    def undo(self, _target: list[list[Char]]) -> Pos:
+    def undo(self, _target: TextBuffer) -> Pos:
         """
-        Undo the command from the provided list of lines.
+        Undo the command from the provided text buffer.
         Returns recommended cursor position after undo, or None if undo
         had no effect.
         """
@@ -30,14 +31,14 @@ class CombinedCmd(EditCmd):
         self.commands = commands
 
     @override
-    def apply(self, target: list[list[Char]]) -> Pos:
+    def apply(self, target: TextBuffer) -> Pos:
         pos: Pos = None
         for cmd in self.commands:
             pos = cmd.apply(target)
         return pos
 
     @override
-    def undo(self, target: list[list[Char]]) -> Pos:
+    def undo(self, target: TextBuffer) -> Pos:
         pos: Pos = None
         for cmd in reversed(self.commands):
             pos = cmd.undo(target)
@@ -52,20 +53,14 @@ class EditSplit(EditCmd):
         self.col: int = col
 
     @override
-    def apply(self, target: list[list[Char]]) -> Pos:
-        line = target[self.line]
-        rest = line[self.col :]
-        del line[self.col :]
-        target.insert(self.line + 1, rest)
+    def apply(self, target: TextBuffer) -> Pos:
+        target.split_line(self.line, self.col)
         return (self.line, self.col)
 
     @override
-    def undo(self, target: list[list[Char]]) -> Pos:
-        y = self.line
-        x = len(target[y])
-        target[y] = target[y] + target[y + 1]
-        del target[y + 1]
-        return (y, x)
+    def undo(self, target: TextBuffer) -> Pos:
+        x = target.join_line(self.line)
+        return (self.line, x)
 
 
 class EditJoin(EditCmd):
@@ -77,20 +72,14 @@ class EditJoin(EditCmd):
         self.col: int = -1
 
     @override
-    def apply(self, target: list[list[Char]]):
-        y = self.line
-        self.col = len(target[y])
-        target[y] = target[y] + target[y + 1]
-        del target[y + 1]
+    def apply(self, target: TextBuffer):
+        self.col = target.join_line(self.line)
         return (self.line, self.col)
 
     @override
-    def undo(self, target: list[list[Char]]):
+    def undo(self, target: TextBuffer):
         if self.col != -1:
-            line = target[self.line]
-            rest = line[self.col :]
-            del line[self.col :]
-            target.insert(self.line + 1, rest)
+            target.split_line(self.line, self.col)
             return (self.line + 1, 0)
         return None
 
@@ -103,20 +92,17 @@ class EditDelete(EditCmd):
         self.line: int = line
         self.col: int = col
         self.remove = remove
-        self.removed: None | list[Char] = None
+        self.removed: None | Line = None
 
     @override
-    def apply(self, target: list[list[Char]]):
-        line = target[self.line]
-        self.removed = line[self.col : self.col + self.remove]
-        del line[self.col : self.col + self.remove]
+    def apply(self, target: TextBuffer):
+        self.removed = target.delete_chars(self.line, self.col, self.remove)
         return (self.line, self.col)
 
     @override
-    def undo(self, target: list[list[Char]]):
+    def undo(self, target: TextBuffer):
         if self.removed is not None:
-            line = target[self.line]
-            line[self.col : self.col] = self.removed
+            target.insert_chars(self.line, self.col, self.removed)
             return (self.line, self.col + len(self.removed))
         return None
 
@@ -124,23 +110,20 @@ class EditDelete(EditCmd):
 class EditInsert(EditCmd):
     """Insert a list of dharacters into this line"""
 
-    def __init__(self, line: int, col: int, add: list[Char]):
+    def __init__(self, line: int, col: int, add: Sequence[Char]):
         super().__init__()
         self.line: int = line
         self.col: int = col
-        self.add = add
-        self.removed: None | list[Char] = None
+        self.add: Line = Line(add)
 
     @override
-    def apply(self, target: list[list[Char]]):
-        line = target[self.line]
-        line[self.col : self.col] = self.add
+    def apply(self, target: TextBuffer):
+        target.insert_chars(self.line, self.col, self.add)
         return (self.line, self.col + len(self.add))
 
     @override
-    def undo(self, target: list[list[Char]]):
-        line = target[self.line]
-        del line[self.col : self.col + len(self.add)]
+    def undo(self, target: TextBuffer):
+        _ = target.delete_chars(self.line, self.col, len(self.add))
         return (self.line, self.col)
 
 
@@ -154,10 +137,10 @@ class CmdStack:
         self.redo_stack: list[EditCmd] = []
 
     def apply(
-        self, cmd: EditCmd, target: list[list[Char]], join_prev: bool = False
+        self, cmd: EditCmd, target: TextBuffer, join_prev: bool = False
     ) -> EditCmd:
         """
-        Apply the command to the target list of lines and remember it by
+        Apply the command to the target text buffer and remember it by
         pushing it onto a stack -- or, extend the previous command in the
         stack if appropriate, by undoing, modifying and redoing the previous
         command.
@@ -193,7 +176,7 @@ class CmdStack:
         cmd.apply(target)
         return cmd
 
-    def undo(self, target: list[list[Char]]) -> Pos:
+    def undo(self, target: TextBuffer) -> Pos:
         """Undo the last command, if any."""
 
         if len(self.stack) > 0:
@@ -203,7 +186,7 @@ class CmdStack:
             return pos
         return None
 
-    def redo(self, target: list[list[Char]]) -> Pos:
+    def redo(self, target: TextBuffer) -> Pos:
         """Redo the undo command, if any."""
 
         if len(self.redo_stack) > 0:
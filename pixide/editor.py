@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Final, cast, override, TypeVar
 
@@ -12,7 +13,8 @@ from .edit_cmd import (
     EditSplit,
     CmdStack,
 )
-from .viewer import TextViewer, TextRange, Char
+from .text_buffer import Char, Line, TextBuffer
+from .viewer import TextViewer, TextRange
 
 Int2 = pix.Int2
 
@@ -37,8 +39,8 @@ class TextEdit(TextViewer):
     Text editor using a `pix.Console`.
     """
 
-    def __init__(self, con: pix.Console):
-        super().__init__(con)
+    def __init__(self, con: pix.Console, buffer: TextBuffer | None = None):
+        super().__init__(con, buffer)
 
         # Additional editor-specific properties
         self.last_scroll: int = -1
@@ -46,7 +48,7 @@ class TextEdit(TextViewer):
         self.cursor_col: int = 0
         self.cursor_line: int = 0
         self.preserved_col: int = -1
-        self.yank_buffer: list[Char] = []
+        self.yank_buffer: Line = Line()
         self.cmd_stack: CmdStack = CmdStack()
 
         self.indent_size = 4
@@ -60,20 +62,20 @@ class TextEdit(TextViewer):
             pix.key.RIGHT: lambda: (self.cursor_col + 1, self.cursor_line),
             CMD | pix.key.RIGHT: lambda: (self.next_word(), self.cursor_line),
             CMD | pix.key.LEFT: lambda: (self.pre_word(), self.cursor_line),
-            pix.key.END: lambda: (len(self.lines[self.cursor_line]), self.cursor_line),
+            pix.key.END: lambda: (self.buffer.line_length(self.cursor_line), self.cursor_line),
             pix.key.HOME: lambda: (int(0), self.cursor_line),
             pix.key.UP: lambda: (self.cursor_col, self.cursor_line - 1),
             pix.key.DOWN: lambda: (self.cursor_col, self.cursor_line + 1),
             pix.key.PAGEUP: lambda: (self.cursor_col, self.cursor_line - self.rows),
             pix.key.PAGEDOWN: lambda: (self.cursor_col, self.cursor_line + self.rows),
             CMD | pix.key.UP: lambda: (self.cursor_col, int(0)),
-            CMD | pix.key.DOWN: lambda: (self.cursor_col, len(self.lines)),
+            CMD | pix.key.DOWN: lambda: (self.cursor_col, len(self.buffer)),
         }
         """Key bindings for keys that move the cursor."""
 
     @property
-    def current_line(self) -> list[Char]:
-        return self.lines[self.cursor_line]
+    def current_line(self) -> Line:
+        return self.buffer[self.cursor_line]
 
     def select(self, start: pix.Int2, end: pix.Int2):
 
@@ -106,8 +108,8 @@ class TextEdit(TextViewer):
 
         if line_no < 0:
             line_no = 0
-        elif line_no >= len(self.lines):
-            line_no = len(self.lines) - 1
+        elif line_no >= len(self.buffer):
+            line_no = len(self.buffer) - 1
         if self.cursor_line == line_no:
             return False
         self.cursor_line = line_no
@@ -146,47 +148,45 @@ class TextEdit(TextViewer):
         return x
 
     def apply(self, cmd: EditCmd, join_prev: bool = False):
-        self.cmd_stack.apply(cmd, self.lines, join_prev)
+        self.cmd_stack.apply(cmd, self.buffer, join_prev)
         self.dirty = True
         self.deselect()
 
     def undo(self):
-        pos = self.cmd_stack.undo(self.lines)
+        pos = self.cmd_stack.undo(self.buffer)
         if pos is not None:
             self.cursor_line, self.cursor_col = pos
             self.dirty = True
 
     def redo(self):
-        pos = self.cmd_stack.redo(self.lines)
+        pos = self.cmd_stack.redo(self.buffer)
         if pos is not None:
             self.cursor_line, self.cursor_col = pos
         self.dirty = True
 
-    def insert(self, text: list[Char], join_prev: bool = False):
+    def insert(self, text: Sequence[Char], join_prev: bool = False):
         self.apply(EditInsert(self.cursor_line, self.cursor_col, text), join_prev)
 
     def remove(self, count: int):
         self.apply(EditDelete(self.cursor_line, self.cursor_col, count))
 
-    def copy(self):
-        data: list[list[Char]] = []
+    def copy(self) -> list[Line]:
+        data: list[Line] = []
         for line_no, col0, col1 in self.selection.lines_reversed():
-            if col1 == -1:
-                col1 = len(self.lines[line_no])
-            data.insert(0, self.lines[line_no][col0:col1])
+            data.insert(0, self.buffer.get_chars(line_no, col0, col1))
         return data
 
     def cut(self):
         """Cut (delete) the current selection using EditCommands"""
-        cut_data: list[list[Char]] = []
+        cut_data: list[Line] = []
 
         commands: list[EditCmd] = []
         lines_to_process = list(self.selection.lines_reversed())
 
         for line_no, col0, col1 in lines_to_process:
             if col1 == -1:
-                col1 = len(self.lines[line_no])
-            cut_data.insert(0, self.lines[line_no][col0:col1])
+                col1 = self.buffer.line_length(line_no)
+            cut_data.insert(0, self.buffer.get_chars(line_no, col0, col1))
             commands.append(EditDelete(line_no, col0, col1 - col0))
 
         for _ in range(len(lines_to_process) - 1):
@@ -231,24 +231,24 @@ class TextEdit(TextViewer):
             shift = -n
         if not self.selection_active:
             self.cursor_col += shift
-        self.cmd_stack.apply(CombinedCmd(commands), self.lines)
+        self.cmd_stack.apply(CombinedCmd(commands), self.buffer)
         self.dirty = True
         if self.selection_active:
             self.selection.start = Int2(0, self.selection.start[1])
             self.selection.end = Int2(
-                len(self.lines[self.selection.end[1]]), self.selection.end[1]
+                len(self.buffer[self.selection.end[1]]), self.selection.end[1]
             )
 
     def get_leading_spaces(self, line_no: int) -> int:
         i = 0
-        line = self.lines[line_no]
+        line = self.buffer[line_no]
         while i < len(line) and line[i][0] == 0x20:
             i += 1
         if i >= len(line):
             i = 0
         return i
 
-    def paste(self, lines: list[list[Char]]):
+    def paste(self, lines: Sequence[Sequence[Char]]):
         """Paste (insert) the provided lines using EditCommands"""
         if not lines:
             return
@@ -305,9 +305,7 @@ class TextEdit(TextViewer):
                 pix.set_clipboard(self.get_text(data))
             elif key == ord("v"):
                 clipboard = pix.get_clipboard()
-                lines: list[list[Char]] = []
-                for line in clipboard.splitlines():
-                    lines.append([(ord(c), 1) for c in line])
+                lines = [Line.from_text(line) for line in clipboard.splitlines()]
                 if self.selection_active:
                     self.cut()
                 self.paste(lines)
@@ -318,7 +316,7 @@ class TextEdit(TextViewer):
                 self.yank_buffer[:] = self.current_line
                 length = len(self.current_line)
                 self.apply(EditDelete(self.cursor_line, 0, length))
-                if self.cursor_line < len(self.lines) - 1:
+                if self.cursor_line < len(self.buffer) - 1:
                     self.apply(EditJoin(self.cursor_line), True)
                 self.wrap_cursor()
         elif key == pix.key.TAB:
@@ -342,7 +340,7 @@ class TextEdit(TextViewer):
                     self.remove(1)
                 elif self.cursor_line > 0:
                     # Handle backspace at beginning of line
-                    ll = len(self.lines[self.cursor_line - 1])
+                    ll = self.buffer.line_length(self.cursor_line - 1)
                     self.apply(EditJoin(self.cursor_line - 1))
                     _ = self.goto_line(self.cursor_line - 1)
                     self.cursor_col = ll
@@ -184,7 +184,7 @@ class PixIDE:
 
     def draw_scrollbar(self):
         """Draw a scroll bar on the right side of the editor area"""
-        if len(self.edit.lines) <= self.edit.rows:
+        if len(self.edit.buffer) <= self.edit.rows:
             return  # No scrollbar needed if all content fits
 
         # Scrollbar dimensions
@@ -201,7 +201,7 @@ class PixIDE:
         )
 
         # Calculate thumb position and size
-        total_lines = len(self.edit.lines)
+        total_lines = len(self.edit.buffer)
         visible_lines = self.edit.rows
         thumb_height = max(20, (visible_lines / total_lines) * scrollbar_height)
 
@@ -47,6 +47,7 @@ def main():
     if args.fullscreen:
         size = pix.Int2(-1, -1)
 
+    pix.set_tileset_cache(Path.home() / ".cache" / "pixide")
     screen = pix.open_display(size=size, full_screen=args.fullscreen)
     split = screen.split((2, 1))
     ide = PixIDE(split[0], font_size=args.font_size)
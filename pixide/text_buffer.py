@@ -0,0 +1,312 @@
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import cast, overload, override
+
+Char = tuple[int, int]
+"""A `Char` holds a character and a color index"""
+
+Point = tuple[int, int]
+"""A (line, col) position in the text"""
+
+
+@dataclass
+class TextChange:
+    """
+    Describes one edit of the text, in the form tree-sitter expects.
+    Offsets are character indexes into `TextBuffer.get_text()`.
+    """
+
+    start: Point
+    old_end: Point
+    new_end: Point
+    start_offset: int
+    old_end_offset: int
+    new_end_offset: int
+
+
+class Line:
+    """
+    A line of text stored as two parallel `array('I')` buffers, one with
+    codepoints and one with color indexes.
+
+    Behaves like a `list[Char]`: indexing returns a `Char` tuple, slicing
+    returns a new `Line` and slice assignment accepts any sequence of
+    `Char`s. Use `chars` and `colors` directly to avoid creating tuples.
+    """
+
+    __slots__: tuple[str, ...] = ("chars", "colors")
+
+    def __init__(self, chars: Iterable[Char] = ()):
+        self.chars: array[int] = array("I")
+        self.colors: array[int] = array("I")
+        if isinstance(chars, Line):
+            self.chars.extend(chars.chars)
+            self.colors.extend(chars.colors)
+        else:
+            for c, color in chars:
+                self.chars.append(c)
+                self.colors.append(color)
+
+    @classmethod
+    def from_text(cls, text: str, color: int = 1) -> "Line":
+        line = cls()
+        line.chars.extend(map(ord, text))
+        line.colors = array("I", [color]) * len(text)
+        return line
+
+    @classmethod
+    def from_arrays(cls, chars: array[int], colors: array[int]) -> "Line":
+        line = cls()
+        line.chars = chars
+        line.colors = colors
+        return line
+
+    def get_text(self) -> str:
+        return "".join(map(chr, self.chars))
+
+    def set_color(self, col0: int, col1: int, color: int):
+        """Set the color of the characters between `col0` and `col1`"""
+        if col1 > col0:
+            self.colors[col0:col1] = array("I", [color]) * (col1 - col0)
+
+    def __len__(self) -> int:
+        return len(self.chars)
+
+    def __iter__(self) -> Iterator[Char]:
+        return zip(self.chars, self.colors)
+
+    @overload
+    def __getitem__(self, index: int) -> Char: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "Line": ...
+
+    def __getitem__(self, index: int | slice) -> "Char | Line":
+        if isinstance(index, slice):
+            return Line.from_arrays(self.chars[index], self.colors[index])
+        return (self.chars[index], self.colors[index])
+
+    def __setitem__(self, index: int | slice, value: "Char | Iterable[Char]"):
+        if isinstance(index, slice):
+            line = Line(cast(Iterable[Char], value))
+            self.chars[index] = line.chars
+            self.colors[index] = line.colors
+        else:
+            self.chars[index], self.colors[index] = cast(Char, value)
+
+    def __delitem__(self, index: int | slice):
+        del self.chars[index]
+        del self.colors[index]
+
+    def __iadd__(self, other: Iterable[Char]) -> "Line":
+        line = other if isinstance(other, Line) else Line(other)
+        self.chars.extend(line.chars)
+        self.colors.extend(line.colors)
+        return self
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Line):
+            return self.chars == other.chars and self.colors == other.colors
+        if isinstance(other, Sequence):
+            return list(self) == list(cast(Sequence[Char], other))
+        return NotImplemented
+
+    @override
+    def __repr__(self) -> str:
+        return f"Line({self.get_text()!r})"
+
+
+class TextBuffer:
+    """
+    Line indexed text storage used by `TextViewer`, `TextEdit` and the
+    `EditCmd` classes.
+
+    All modifications go through `insert_chars()`, `delete_chars()`,
+    `split_line()` and `join_line()`, which lets the buffer keep its
+    caches up to date incrementally. The text of every line is cached as a
+    string, so `get_text()` only has to re-encode the lines that changed
+    since the last call. Subclasses can replace the storage entirely as long
+    as they implement the same methods.
+
+    Edits are also recorded as `TextChange`s, which lets a parser like
+    tree-sitter update its syntax tree incrementally; see `take_changes()`.
+    """
+
+    MAX_CHANGES: int = 1000
+    """Pending changes above this count are dropped in favor of a full reparse"""
+
+    def __init__(self, text: str = ""):
+        self.lines: list[Line] = [Line()]
+        self._line_text: list[str | None] = [None]
+        self._text: str | None = None
+        self._changes: list[TextChange] | None = None
+        self._line_offsets: list[int] = [0]
+        """Offset of the start of every line, see `offset()`"""
+        self._valid_offsets: int = 1
+        """Number of leading entries in `_line_offsets` that are up to date"""
+        self.version: int = 0
+        """Incremented every time the text (not colors) is modified"""
+        self.set_text(text)
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[Sequence[Char]]) -> "TextBuffer":
+        buffer = cls()
+        buffer.set_lines(lines)
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __getitem__(self, line_no: int) -> Line:
+        return self.lines[line_no]
+
+    def __iter__(self) -> Iterator[Line]:
+        return iter(self.lines)
+
+    def _changed(self, line_no: int):
+        self._line_text[line_no] = None
+        self._text = None
+        # Lines after this one have moved
+        self._valid_offsets = min(self._valid_offsets, line_no + 1)
+        self.version += 1
+
+    def _reset_offsets(self):
+        self._line_offsets = [0] * len(self.lines)
+        self._valid_offsets = 1
+
+    def _record(self, start: Point, old_end: Point, new_end: Point, removed: int):
+        """Record a change. Must be called before the text is modified."""
+        if self._changes is None:
+            return
+        if len(self._changes) >= self.MAX_CHANGES:
+            self._changes = None
+            return
+        offset = self.offset(*start)
+        inserted = (
+            new_end[1] - start[1]
+            if new_end[0] == start[0]
+            else 1 + new_end[1]
+        )
+        self._changes.append(
+            TextChange(
+                start, old_end, new_end, offset, offset + removed, offset + inserted
+            )
+        )
+
+    def take_changes(self) -> list[TextChange] | None:
+        """
+        Get and clear the list of changes made since the last call.
+        Returns None if the whole text was replaced (or this is the first
+        call) and has to be processed again from scratch.
+        """
+        changes = self._changes
+        self._changes = []
+        return changes
+
+    def offset(self, line_no: int, col: int) -> int:
+        """
+        Get the index of a position in the string returned by `get_text()`.
+        Line offsets are cached, and only the ones between the first edited
+        line and `line_no` are updated, so repeated edits in the same area
+        do not depend on the size of the text.
+        """
+        offsets = self._line_offsets
+        for i in range(self._valid_offsets, line_no + 1):
+            offsets[i] = offsets[i - 1] + len(self.lines[i - 1]) + 1
+        self._valid_offsets = max(self._valid_offsets, line_no + 1)
+        return offsets[line_no] + col
+
+    def line_length(self, line_no: int) -> int:
+        return len(self.lines[line_no])
+
+    def set_text(self, text: str):
+        self._line_text = list(text.split("\n"))
+        self.lines = [Line.from_text(line) for line in self._line_text]
+        self._text = text
+        self._changes = None
+        self._reset_offsets()
+        self.version += 1
+
+    def set_lines(self, lines: Sequence[Sequence[Char]]):
+        self.lines = [Line(line) for line in lines]
+        self._line_text = [None] * len(self.lines)
+        self._text = None
+        self._changes = None
+        self._reset_offsets()
+        self.version += 1
+
+    def get_line_text(self, line_no: int) -> str:
+        text = self._line_text[line_no]
+        if text is None:
+            text = self.lines[line_no].get_text()
+            self._line_text[line_no] = text
+        return text
+
+    def get_text(self) -> str:
+        """Get the entire text as a string. Cached until the next edit."""
+        if self._text is None:
+            self._text = "\n".join(
+                [self.get_line_text(i) for i in range(len(self.lines))]
+            )
+        return self._text
+
+    def get_codepoints(self) -> list[int]:
+        """Get all codepoints, with every line (including the last) ending in a newline."""
+        return [ord(c) for c in self.get_text() + "\n"]
+
+    def get_chars(self, line_no: int, col0: int = 0, col1: int = -1) -> Line:
+        """Get a copy of the characters between `col0` and `col1` (-1 = end of line)"""
+        line = self.lines[line_no]
+        if col1 == -1:
+            col1 = len(line)
+        return line[col0:col1]
+
+    def set_color(self, line_no: int, col0: int, col1: int, color: int):
+        """Set the color of the characters between `col0` and `col1`"""
+        line = self.lines[line_no]
+        if col1 == -1 or col1 > len(line):
+            col1 = len(line)
+        line.set_color(col0, col1, color)
+
+    def insert_chars(self, line_no: int, col: int, chars: Sequence[Char]):
+        line = self.lines[line_no]
+        n = len(chars)
+        self._record((line_no, col), (line_no, col), (line_no, col + n), 0)
+        line[col:col] = chars
+        self._changed(line_no)
+
+    def delete_chars(self, line_no: int, col: int, count: int) -> Line:
+        """Delete `count` characters and return them"""
+        line = self.lines[line_no]
+        removed = line[col : col + count]
+        n = len(removed)
+        self._record((line_no, col), (line_no, col + n), (line_no, col), n)
+        del line[col : col + count]
+        self._changed(line_no)
+        return removed
+
+    def split_line(self, line_no: int, col: int):
+        """Split a line at the given column, moving the rest to a new line"""
+        self._record((line_no, col), (line_no, col), (line_no + 1, 0), 0)
+        line = self.lines[line_no]
+        rest = line[col:]
+        del line[col:]
+        self.lines.insert(line_no + 1, rest)
+        self._line_text.insert(line_no + 1, None)
+        self._line_offsets.insert(line_no + 1, 0)
+        self._changed(line_no)
+
+    def join_line(self, line_no: int) -> int:
+        """Join a line with the next one. Returns the column of the join."""
+        line = self.lines[line_no]
+        col = len(line)
+        next_line = self.lines[line_no + 1]
+        self._record((line_no, col), (line_no + 1, 0), (line_no, col), 1)
+        line += next_line
+        del self.lines[line_no + 1]
+        del self._line_text[line_no + 1]
+        del self._line_offsets[line_no + 1]
+        self._changed(line_no)
+        return col
@@ -1,8 +1,22 @@
+import re
 from typing import Final
 import pixpy as pix
-from .viewer import TextRange
 from .editor import TextEdit
 
+_NON_BMP: Final = re.compile("[\U00010000-\U0010ffff]")
+
+
+def encode_utf16(text: str) -> bytes:
+    """
+    Encode text as UTF16-LE with every character as a single unit, the way
+    the buffer counts columns. Characters outside the BMP would need two
+    units, so they are replaced.
+    """
+    data = text.encode("utf-16-le")
+    if len(data) == len(text) * 2:
+        return data
+    return _NON_BMP.sub("\ufffd", text).encode("utf-16-le")
+
 
 class TreeSitter:
     def __init__(self, edit: TextEdit):
@@ -49,6 +63,10 @@ class TreeSitter:
         self.treesitter.set_format(f)
 
         self.node: pix.treesitter.TSNode | None = None
+        self.version: int = -1
+        """Text buffer version of the current syntax tree"""
+        self.rows: tuple[int, int] = (0, 0)
+        """Rows colored by the last `highlight()`"""
 
         self.edit: TextEdit = edit
 
@@ -56,18 +74,46 @@ class TreeSitter:
         self.edit.set_palette(self.palette)
 
     def highlight(self):
+        """Reparse the text if needed, and color the rows visible in the editor"""
         if not self.edit.selection_active:
             self.node = None
-        self.treesitter.set_source_utf16(self.edit.get_codepoints())
-        highlights = [
-            TextRange(
-                pix.Int2(col0 // 2, row0),
-                pix.Int2(col1 // 2, row1),
-                color if color >= 0 else 1,
-            )
-            for col0, row0, col1, row1, color in self.treesitter.get_highlights()
-        ]
-        self.edit.highlight(highlights)
+        buffer = self.edit.buffer
+        row_start = self.edit.horizontal_scroll
+        row_end = min(row_start + self.edit.rows, len(buffer))
+        if buffer.version == self.version:
+            if (row_start, row_end) == self.rows:
+                return
+        else:
+            self.parse()
+        self.rows = (row_start, row_end)
+
+        # Columns are in bytes of UTF16
+        hl = iter(self.treesitter.get_highlights(row_start, row_end))
+        for col0, row0, col1, row1, color in zip(hl, hl, hl, hl, hl):
+            for row in range(max(row0, row_start), min(row1 + 1, row_end)):
+                c0 = col0 // 2 if row == row0 else 0
+                c1 = col1 // 2 if row == row1 else -1
+                buffer.set_color(row, c0, c1, color)
+
+    def parse(self):
+        """Update the syntax tree from the edits made since the last parse"""
+        buffer = self.edit.buffer
+        self.version = buffer.version
+        # Nodes point into the old tree, which is freed by the reparse
+        self.node = None
+        changes = buffer.take_changes()
+        if changes is not None:
+            # Columns and offsets are in bytes of UTF16
+            for c in changes:
+                self.treesitter.edit(
+                    c.start_offset * 2,
+                    c.old_end_offset * 2,
+                    c.new_end_offset * 2,
+                    (c.start[1] * 2, c.start[0]),
+                    (c.old_end[1] * 2, c.old_end[0]),
+                    (c.new_end[1] * 2, c.new_end[0]),
+                )
+        self.treesitter.set_source_utf16(encode_utf16(buffer.get_text() + "\n"))
 
     def select_parent_node(self):
         """
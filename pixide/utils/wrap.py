@@ -1,3 +1,5 @@
+from bisect import bisect_right
+
 import pixpy as pix
 
 def wrap_lines(lines: list[str], max_len: int, break_chars: str = " ") -> list[str]:
@@ -30,31 +32,19 @@ def wrap_text(text: str, font: pix.Font, size: int, width: float) -> list[str]:
     text = text.strip()
     start = 0
     length = len(text)
+    # widths[i] is the width of text[:i]
+    widths = font.prefix_widths(text, size)
 
-    #print(f"len {length}")
     while start < length:
-        # Binary search for max character count fitting in width
-        low = 1
-        high = length - start
-        best = 1
-
-        if font.text_size(text[start:], size).x <= width:
+        # Find max character count fitting in width (at least 1)
+        end = bisect_right(widths, widths[start] + width, start + 1) - 1
+        if end >= length:
             lines.append(text[start:])
             break
-
-        while low <= high:
-            mid = (low + high) // 2
-            candidate = text[start : start + mid]
-            if font.text_size(candidate, size).x <= width:
-                best = mid
-                low = mid + 1
-            else:
-                high = mid - 1
-
-        #print(f"break '{text}' at {high} = {text[start:start+high]}")
+        end = max(end, start + 1)
 
         # Try to break at a space for better word boundaries
-        line_end = start + best
+        line_end = end
         space_pos = text.rfind(" ", start, line_end)
         if space_pos != -1 and space_pos > start:
             line_end = space_pos
@@ -67,6 +57,4 @@ def wrap_text(text: str, font: pix.Font, size: int, width: float) -> list[str]:
         while start < length and text[start] == " ":
             start += 1
 
-    #/"lenprint(f"{lines}")
     return lines
-
@@ -1,8 +1,11 @@
-from collections.abc import Iterator
+from array import array
+from collections.abc import Iterator, Sequence
 from typing import cast, override, TypeVar
 
 import pixpy as pix
 
+from .text_buffer import Char, Line, TextBuffer
+
 Int2 = pix.Int2
 
 
@@ -17,10 +20,6 @@ def clamp(v: T, lo: T, hi: T) -> T:
     return v
 
 
-Char = tuple[int, int]
-"""A `Char` holds a character and a color index"""
-
-
 class TextRange:
     """Represent a range of text in list of strings"""
 
@@ -50,14 +49,22 @@ class TextRange:
             yield (line_no, col0, col1)
 
 
+RowKey = tuple[array[int], array[int], int, int] | None
+"""The contents of a rendered console row; chars, colors and marked columns"""
+
+_STALE: RowKey = (array("I"), array("I"), -2, -2)
+"""Key for console rows with unknown content"""
+
+
 class TextViewer:
     """
     Non-interactive text viewer using a `pix.Console`.
     Handles text display, scrolling, highlighting, and color management.
     """
 
-    def __init__(self, con: pix.Console):
-        self.lines: list[list[Char]] = [[]]
+    def __init__(self, con: pix.Console, buffer: TextBuffer | None = None):
+        self.buffer: TextBuffer = TextBuffer() if buffer is None else buffer
+        """The text storage. Pass a `TextBuffer` subclass to change how text is stored."""
         self.horizontal_scroll: int = 0
         self.vertical_scroll: int = 0
         self.dirty: bool = True
@@ -77,48 +84,50 @@ class TextViewer:
 
         self.show_cursor = True
 
+        self.rendered_rows: list[RowKey] | None = None
+        """What is currently drawn on each console row, or None if unknown"""
+        self.rendered_scroll: tuple[int, int] = (0, 0)
+        self.cells_written: int = 0
+        """Number of console cells written by the last `render()`"""
+
         self.console.cursor_on = True
         self.console.wrap_lines = self.console.autoscroll = False
 
-    def get_text(self, lines: list[list[Char]] | None = None):
+    @property
+    def lines(self) -> TextBuffer:
+        return self.buffer
+
+    @lines.setter
+    def lines(self, lines: Sequence[Sequence[Char]]):
+        self.buffer.set_lines(lines)
+        self.dirty = True
+
+    def get_text(self, lines: Sequence[Sequence[Char]] | None = None):
         if lines is None:
-            lines = self.lines
-        return "\n".join(["".join([chr(c[0]) for c in line]) for line in lines])
+            return self.buffer.get_text()
+        return "\n".join([Line(line).get_text() for line in lines])
 
     def get_codepoints(self) -> list[int]:
-        eol = 10
-        return list(
-            [
-                codepoint
-                for line in self.lines
-                for codepoint in ([c[0] for c in line] + [eol])
-            ]
-        )
+        return self.buffer.get_codepoints()
 
     def highlight(self, tranges: list[TextRange]):
         """Set the color of all passed textranges, using `arg` as color"""
         for trange in tranges:
             color = trange.arg
             for ln, col0, col1 in trange.lines():
-                if ln >= len(self.lines):
+                if ln >= len(self.buffer):
                     break
-                line = self.lines[ln]
-                if col1 == -1:
-                    col1 = len(line)
-                for j in range(col0, col1):
-                    line[j] = (line[j][0], color)
+                self.buffer.set_color(ln, col0, col1, color)
 
     def set_text(self, text: str):
         self.horizontal_scroll = 0
         self.vertical_scroll = 0
-        lines = text.split("\n")
-        self.lines = []
-        for line in lines:
-            self.lines.append([(ord(c), 1) for c in line])
+        self.buffer.set_text(text)
         self.dirty = True
 
     def set_console(self, console: pix.Console):
         self.console = console
+        self.rendered_rows = None
         self.console.cursor_on = self.show_cursor
         self.console.wrap_lines = self.console.autoscroll = False
         self.fg_color = pix.color.GREEN
@@ -127,11 +136,13 @@ class TextViewer:
         self.dirty = True
 
     def set_color(self, fg: int, bg: int):
+        self.rendered_rows = None
         self.fg_color = fg
         self.bg_color = bg
 
     def set_palette(self, colors: list[int]):
         """Set palette. 0 = default bg, 1 = default text"""
+        self.rendered_rows = None
         self.bg_color = (colors[0] << 8) | 0xFF
         self.fg_color = (colors[1] << 8) | 0xFF
         for i, c in enumerate(colors):
@@ -141,7 +152,7 @@ class TextViewer:
     def scroll_screen(self, y: int):
         self.horizontal_scroll -= y
         y = self.rows - 1
-        line_count = len(self.lines)
+        line_count = len(self.buffer)
         if self.horizontal_scroll > line_count - y:
             self.horizontal_scroll = line_count - y
         if self.horizontal_scroll < 0:
@@ -155,7 +166,9 @@ class TextViewer:
         """
         Update the characters in the Console from the internal text state.
         Needs to be done when text, highlighting or scroll position changes.
+        Only the console rows that actually changed are rewritten.
         """
+        self.cells_written = 0
         if self.dirty:
             self.render_editor(selection)
 
@@ -172,58 +185,100 @@ class TextViewer:
             else:
                 self.console.cursor_on = False
 
+    def scroll_rows(self) -> list[RowKey]:
+        """
+        Get the rendered rows, after scrolling the console to match the
+        current scroll position.
+        """
+        rows = self.rendered_rows
+        old_x, old_y = self.rendered_scroll
+        self.rendered_scroll = (self.vertical_scroll, self.horizontal_scroll)
+        dy = old_y - self.horizontal_scroll
+        if (
+            rows is None
+            or len(rows) != self.rows
+            or old_x != self.vertical_scroll
+            or abs(dy) >= self.rows
+        ):
+            self.console.clear()
+            self.cells_written += self.rows * self.cols
+            return [None] * self.rows
+        if dy > 0:
+            self.console.scroll(dy, 0)
+            return [_STALE] * dy + rows[:-dy]
+        if dy < 0:
+            self.console.scroll(dy, 0)
+            return rows[-dy:] + [_STALE] * -dy
+        return rows
+
     def render_editor(self, selection: TextRange | None = None):
         self.dirty = False
         self.console.set_color(self.fg_color, self.bg_color)
-        self.console.clear()
+        rows = self.scroll_rows()
         for y in range(self.rows):
             i = y + self.horizontal_scroll
-            if i >= len(self.lines):
-                break
-            left_cropped = False
-            right_cropped = False
+            key: RowKey = None
             mark_startx = -1
             mark_endx = -1
-            if selection is not None:
-                # Figure if parts of this line should be marked
-                my0 = i - selection.start.y
-                my1 = selection.end.y - i
-                if my0 == 0:
-                    mark_startx = selection.start.x
-                elif my0 > 0:
-                    mark_startx = 0
-                if my1 == 0:
-                    mark_endx = selection.end.x - 1
-                elif my1 > 0:
-                    mark_endx = 999999
-                else:
-                    mark_startx = -1
-
-            for x, (t, c) in enumerate(self.lines[i], -self.vertical_scroll):
-                if x < 0:
-                    if t != 0x20:
-                        left_cropped = True
-                elif x >= self.cols - 1:
-                    if t != 0x20:
-                        right_cropped = True
-                else:
-                    if mark_startx >= 0 and x >= mark_startx and x <= mark_endx:
-                        fg, bg = self.palette[self.selection_color]
+            if i < len(self.buffer):
+                if selection is not None:
+                    # Figure if parts of this line should be marked
+                    my0 = i - selection.start.y
+                    my1 = selection.end.y - i
+                    if my0 == 0:
+                        mark_startx = selection.start.x
+                    elif my0 > 0:
+                        mark_startx = 0
+                    if my1 == 0:
+                        mark_endx = selection.end.x - 1
+                    elif my1 > 0:
+                        mark_endx = 999999
                     else:
-                        fg, bg = self.palette[c]
-                    self.console.put((x, y), t, fg, bg)
-
-            if left_cropped:
-                self.console.put(
-                    (0, y),
-                    ord("$"),
-                    pix.color.LIGHT_RED,
-                    pix.color.BLACK,
-                )
-            if right_cropped:
-                self.console.put(
-                    (self.cols - 1, y),
-                    ord("$"),
-                    pix.color.LIGHT_RED,
-                    pix.color.BLACK,
-                )
+                        mark_startx = -1
+                line = self.buffer[i]
+                key = (line.chars, line.colors, mark_startx, mark_endx)
+            if key == rows[y]:
+                continue
+            if rows[y] is not None:
+                self.console.clear_area(0, y, self.cols, 1)
+                self.cells_written += self.cols
+            if key is None:
+                rows[y] = None
+                continue
+            rows[y] = (key[0][:], key[1][:], mark_startx, mark_endx)
+            self.render_line(y, self.buffer[i], mark_startx, mark_endx)
+        self.rendered_rows = rows
+
+    def render_line(self, y: int, line: Line, mark_startx: int, mark_endx: int):
+        x0 = self.vertical_scroll
+        width = self.cols - 1
+        chars = line.chars[x0 : x0 + width]
+        colors = line.colors[x0 : x0 + width]
+        fg = array("I", [self.palette[c][0] for c in colors])
+        bg = array("I", [self.palette[c][1] for c in colors])
+        if mark_startx >= 0:
+            start = mark_startx
+            end = min(mark_endx + 1, len(chars))
+            if end > start:
+                sel_fg, sel_bg = self.palette[self.selection_color]
+                fg[start:end] = array("I", [sel_fg]) * (end - start)
+                bg[start:end] = array("I", [sel_bg]) * (end - start)
+        self.console.put_row(y, 0, chars, fg, bg)
+        self.cells_written += len(chars)
+
+        left = line.chars[:x0]
+        if left.count(0x20) != len(left):
+            self.console.put(
+                (0, y),
+                ord("$"),
+                pix.color.LIGHT_RED,
+                pix.color.BLACK,
+            )
+        right = line.chars[x0 + width :]
+        if right.count(0x20) != len(right):
+            self.console.put(
+                (self.cols - 1, y),
+                ord("$"),
+                pix.color.LIGHT_RED,
+                pix.color.BLACK,
+            )
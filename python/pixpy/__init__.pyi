@@ -5,11 +5,21 @@ from __future__ import annotations
 from typing import Union, Tuple, List
 import os
 import typing
+import typing_extensions
 from . import color
 from . import event
 from . import key
 from . import treesitter
-__all__ = ['BLEND_ADD', 'BLEND_COPY', 'BLEND_MULTIPLY', 'BLEND_NORMAL', 'Canvas', 'Console', 'Float2', 'Font', 'Image', 'Int2', 'Screen', 'TileSet', 'add_color', 'add_event_listener', 'all_events', 'allow_break', 'blend_color', 'blend_colors', 'color', 'event', 'get_clipboard', 'get_display', 'get_pointer', 'inside_polygon', 'is_pressed', 'key', 'load_font', 'load_png', 'open_display', 'post_event', 'quit_loop', 'remove_event_listener', 'rgba', 'run_every_frame', 'run_loop', 'save_png', 'set_clipboard', 'set_keyboard_device', 'treesitter', 'update_tweens', 'was_pressed', 'was_released']
+__all__ = ['Atlas', 'BLEND_ADD', 'BLEND_COPY', 'BLEND_MULTIPLY', 'BLEND_NORMAL', 'Canvas', 'Console', 'DisplayList', 'Float2', 'Font', 'Image', 'Int2', 'Mesh', 'PendingFont', 'PendingImage', 'PixelSurface', 'Screen', 'TileSet', 'add_color', 'add_event_listener', 'all_events', 'allow_break', 'blend_color', 'blend_colors', 'color', 'event', 'get_clipboard', 'get_display', 'get_pointer', 'inside_polygon', 'is_pressed', 'key', 'load_font', 'load_font_async', 'load_images', 'load_png', 'load_png_async', 'open_display', 'post_event', 'quit_loop', 'remove_event_listener', 'rgba', 'run_every_frame', 'run_loop', 'save_png', 'set_clipboard', 'set_keyboard_device', 'set_tileset_cache', 'treesitter', 'update_tweens', 'was_pressed', 'was_released']
+class Atlas:
+    """
+    Packs many images into a few large textures. Drawing images that share a texture is faster, since they can be batched together.
+    """
+    @staticmethod
+    def pack(images: list[Union[Image, os.PathLike[str], str]], max_size: int = 2048, padding: int = 1, cache: Union[os.PathLike[str], str] | None = None) -> list[Image]:
+        """
+        Pack `images`, given as png file names or `Image`s, into as few textures of at most `max_size` x `max_size` pixels as possible, with `padding` empty pixels between them. Returns a new `Image` for each image, in the same order, so images from different files can be drawn without switching textures. If `cache` is given, the packed textures are saved to that file, and loaded from it the next time the same files are packed with the same settings. Only file names can be cached.
+        """
 class Canvas:
     """
     A `Canvas` is used for rendering. It is implemented by both `Screen` and `Image`.
@@ -41,6 +51,16 @@ class Canvas:
         Render an image. The image can either be aligned to its top left corner, or centered, in which case it can also be rotated.
         """
     @typing.overload
+    def draw(self, surface: PixelSurface, top_left: Union[Float2, Int2, Tuple[float, float]] | None = None, center: Union[Float2, Int2, Tuple[float, float]] | None = None, size: Union[Float2, Int2, Tuple[float, float]] = ..., rot: float = 0) -> None:
+        """
+        Render a pixel surface, uploading any changed areas first.
+        """
+    @typing.overload
+    def draw(self, mesh: Mesh, pos: Union[Float2, Int2, Tuple[float, float]] = ..., scale: Union[Float2, Int2, Tuple[float, float]] = ..., rot: float = 0, color: int | None = None) -> None:
+        """
+        Draw a mesh scaled and rotated around its origin, with the origin at `pos`. Uses the current draw color unless `color` is given.
+        """
+    @typing.overload
     def draw(self, drawable: Console, top_left: Union[Float2, Int2, Tuple[float, float]] = ..., size: Union[Float2, Int2, Tuple[float, float]] = ...) -> None:
         """
         Render a console. `top_left` and `size` are in pixels. If `size` is not given, it defaults to `tile_size*grid_size`.
@@ -49,6 +69,16 @@ class Canvas:
 
         `console.render(screen, size=screen.size)`
         """
+    @typing.overload
+    def draw_many(self, image: Image, centers: typing_extensions.Buffer, sizes: typing_extensions.Buffer | None = None, rotations: typing_extensions.Buffer | None = None, colors: typing_extensions.Buffer | None = None) -> None:
+        """
+        Draw `image` centered at every x,y pair in `centers`, using a single draw call. `sizes` can hold one x,y pair for all images or one per image, and `rotations` and `colors` one value for all images or one per image. All arguments are buffers, like `array` or numpy arrays.
+        """
+    @typing.overload
+    def draw_many(self, images: list[Image], centers: typing_extensions.Buffer, sizes: typing_extensions.Buffer | None = None, rotations: typing_extensions.Buffer | None = None, colors: typing_extensions.Buffer | None = None) -> None:
+        """
+        Draw one image from `images` centered at each x,y pair in `centers`. Images that share a texture, like frames from `split()`, are drawn using a single draw call.
+        """
     def filled_circle(self, center: Union[Float2, Int2, Tuple[float, float]], radius: float) -> None:
         """
         Draw a filled circle.
@@ -57,13 +87,13 @@ class Canvas:
         """
         Draw a filled rectangle.
         """
-    def flood_fill(self, pos: Union[Int2, Tuple[int, int]], color: int) -> None:
+    def flood_fill(self, pos: Union[Int2, Tuple[int, int]], color: int, tolerance: int = 0, mask: Image | None = None) -> tuple[Int2, Int2]:
         """
-        Flood fill starting from the given position with the specified color.
+        Flood fill starting from the given position with the specified color. Pixels whose color channels differ at most `tolerance` from the start pixel are filled. If `mask` is given, the area is filled in the mask image instead. Returns the top left corner and size of the filled area.
         """
     def flush(self) -> None:
         """
-        Flush pixel operations
+        Draw everything that is waiting in pixel and shape batches
         """
     def get_pointer(self) -> Float2:
         """
@@ -95,16 +125,36 @@ class Canvas:
     @typing.overload
     def plot(self, points: typing.Any, colors: typing.Any) -> None:
         """
-        Draw `n` points given by the array like objects. `points` should n*2 floats and `colors` should contain `n` unsigned ints.
+        Draw `n` points given by the array like objects. `points` should n*2 floats and `colors` should contain `n` unsigned ints. Objects supporting the buffer protocol (like `array` or numpy arrays) are read directly, which is much faster.
+        """
+    def plot_xy(self, xs: typing_extensions.Buffer, ys: typing_extensions.Buffer, colors: typing_extensions.Buffer) -> None:
+        """
+        Draw `n` points, with the coordinates given as separate arrays of `n` x and `n` y values. All arguments should support the buffer protocol (like `array` or numpy arrays).
         """
     def polygon(self, points: list[Float2], convex: bool = False) -> None:
         """
         Draw a filled polygon by stringing together the given points. If convex is `true` the polygon is rendered as a simple triangle fan, otherwise the polygon is split into triangles using the ear-clipping method.
         """
+    def pop_transform(self) -> None:
+        """
+        Go back to the transform that was current before the last `push_transform()`.
+        """
+    def push_transform(self, matrix: typing.Any | None = None, translate: Union[Float2, Int2, Tuple[float, float]] = ..., rotate: float = 0, scale: Union[Float2, Int2, Tuple[float, float]] = ...) -> None:
+        """
+        Save the current transform and combine it with a new one. Everything drawn is first transformed by `matrix`, then scaled, rotated (in radians) and translated, and then transformed by the previous transform. `matrix` is a 2x3 affine or 3x3 projective matrix, given row by row.
+        """
+    def record(self) -> DisplayList:
+        """
+        Create a display list with the same size and settings as this canvas, for use in a `with` statement. Shapes, polygons, images and text drawn into it are recorded instead of drawn, and can then be drawn any number of times using `replay()`. Recording must be done in the main thread.
+        """
     def rect(self, top_left: Union[Float2, Int2, Tuple[float, float]], size: Union[Float2, Int2, Tuple[float, float]]) -> None:
         """
         Draw a rectangle.
         """
+    def replay(self, display_list: DisplayList, offset: Union[Float2, Int2, Tuple[float, float]] = ...) -> None:
+        """
+        Draw everything recorded in `display_list`, moved by `offset`.
+        """
     @typing.overload
     def rounded_line(self, start: Union[Float2, Int2, Tuple[float, float]], rad0: float, end: Union[Float2, Int2, Tuple[float, float]], rad1: float) -> None:
         """
@@ -182,7 +232,11 @@ class Canvas:
 class Console:
     """
     A console is a 2D grid of tiles that can be rendered.
+
+    The console supports the buffer protocol, so `memoryview(console)` or `numpy.asarray(console)` gives direct access to the tiles as a `rows * cols * 3` array of `[tile, fg, bg]` values. Call `mark_dirty()` after modifying it. Views stay valid when writing scrolls the console, but `scroll()` raises `BufferError` while a view exists.
     """
+    def __buffer__(self, flags: int) -> memoryview:
+        ...
     @typing.overload
     def __init__(self, cols: int, rows: int, font_file: Union[os.PathLike[str], str] | None = None, tile_size: Union[Float2, Int2, Tuple[float, float]] = ..., font_size: int = -1) -> None:
         """
@@ -229,16 +283,28 @@ class Console:
         """
         Get all the tiles and colors as an array of ints. Format is: `[tile0, fg0, bg0, tile1, fg1, bg1 ...]` etc.
         """
+    def mark_dirty(self) -> None:
+        """
+        Update the console after its tiles were changed through the buffer protocol.
+        """
     def put(self, pos: Union[Int2, Tuple[int, int]], tile: int, fg: int | None = None, bg: int | None = None) -> None:
         """
         Put `tile` at given position, optionally setting a specific foreground and/or background color
         """
+    def put_row(self, y: int, x: int, tiles: typing_extensions.Buffer, fg: int | typing_extensions.Buffer | None = None, bg: int | typing_extensions.Buffer | None = None) -> None:
+        """
+        Put a row of tiles starting at column `x` of row `y`, in one call. `tiles` can be any buffer of integers (`array`, `bytes`, numpy array etc). `fg` and `bg` can be a single color, or a buffer holding one color per tile. If not given, the current colors are used. Tiles outside the console are ignored.
+        """
     def read_line(self) -> None:
         """
         Puts the console in line edit mode.
 
         A cursor will be shown and all text events will be captured by the console until `Enter` is pressed. At this point the entire line will be pushed as a `TextEvent`.
         """
+    def scroll(self, dy: int, dx: int = 0) -> None:
+        """
+        Move the contents of the console `dy` rows down and `dx` columns right. Negative values scroll up/left. Scrolling wraps around, so tiles scrolled out on one edge come back in on the opposite edge. Vertical scrolling only moves the start row, and does not copy or upload any tiles. Raises `BufferError` while views from the buffer protocol exist.
+        """
     def set_color(self, fg: int, bg: int) -> None:
         """
         Set the default colors used when putting/writing to the console.
@@ -255,10 +321,20 @@ class Console:
         """
         Sets a cllback that will be called when a line of text was entered by the user. Setting this will stop the normal TextEvent from being sent.
         """
+    def set_region(self, x: int, y: int, w: int, h: int, tiles: typing_extensions.Buffer) -> None:
+        """
+        Set all tiles in the given rectangle from a buffer of integers, in the same `[tile0, fg0, bg0, tile1, fg1, bg1 ...]` format as `get_tiles()`, row by row.
+        """
     def set_tile_images(self, start_no: int, images: list[Image]) -> None:
         """
         Set images to use for a set of indexes, starting at `start_no`.
         """
+    @typing.overload
+    def set_tiles(self, tiles: typing_extensions.Buffer) -> None:
+        """
+        Set tiles from a buffer of ints, in the same format as `get_tiles()`.
+        """
+    @typing.overload
     def set_tiles(self, tiles: list[int]) -> None:
         """
         Set tiles from an array of ints.
@@ -288,6 +364,11 @@ class Console:
     def bg_color(self, arg0: int) -> None:
         ...
     @property
+    def bytes_uploaded(self) -> int:
+        """
+        Number of bytes uploaded to the GPU the last time the console was drawn. Only rows that changed are uploaded.
+        """
+    @property
     def cursor_color(self) -> int:
         """
         Cursor color.
@@ -347,6 +428,27 @@ class Console:
     @wrap_lines.setter
     def wrap_lines(self, arg0: bool) -> None:
         ...
+class DisplayList(Canvas):
+    """
+    A canvas that records what is drawn into it, so it can be drawn any number of times using `Canvas.replay()`. Geometry is generated while recording, and uploaded to the GPU on the first replay. Recording must be done in the main thread. Shapes, polygons, images, text from a `TileSet`, `clear()` and other display lists can be recorded; drawing meshes, consoles or pixel surfaces and reading or writing pixels raise an exception.
+    """
+    def __enter__(self) -> DisplayList:
+        ...
+    def __exit__(self, *args) -> None:
+        ...
+    def __init__(self, canvas: Canvas) -> None:
+        """
+        Start recording, with the same size and settings as `canvas`.
+        """
+    def finish(self) -> None:
+        """
+        Stop recording. Drawing into the list after this is an error.
+        """
+    @property
+    def command_count(self) -> int:
+        """
+        Number of draw calls needed to replay the list.
+        """
 class Float2:
     """
     Represents an floating point coordinate or size. Mostly behaves like a normal float when used in arithmetic operations.
@@ -536,9 +638,28 @@ class Font:
         """
         Create a font from a TTF file.
         """
-    def make_image(self, text: str, size: int, color: int = 4294967295) -> Image:
+    @staticmethod
+    def clear_image_cache() -> None:
+        """
+        Remove all cached text images.
+        """
+    @staticmethod
+    def image_cache_info() -> dict[str, int]:
+        """
+        Get a dict with `hits`, `misses`, `images`, `bytes` and `max_bytes` for the text image cache.
+        """
+    def make_image(self, text: str, size: int, color: int = 4294967295, cached: bool = False) -> Image:
+        """
+        Create an image containing the given text. If `cached` is true, the image is kept in a cache and calling this again with the same arguments returns the same image, so do not draw into it.
+        """
+    def prefix_widths(self, text: str, size: int) -> list[int]:
         """
-        Create an image containing the given text.
+        Return the width of every prefix of `text`, so that element `i` is the width of `text[:i]`. Much faster than calling `text_size()` repeatedly.
+        """
+    @staticmethod
+    def set_image_cache_size(max_bytes: int) -> None:
+        """
+        Set the maximum number of bytes used by cached text images. Set to 0 to turn off caching.
         """
     def text_size(self, text: str, size: int) -> Float2:
         """
@@ -575,6 +696,10 @@ class Image(Canvas):
         """
         Crop an image. Returns a view into the old image.
         """
+    def read_pixels(self) -> memoryview:
+        """
+        Read the pixels of the image into a (height, width, 4) memoryview of RGBA bytes. Wrap with `numpy.asarray()` to get an array without copying.
+        """
     def set_texture_filter(self, min: bool, max: bool) -> None:
         """
         Set whether the texture should apply linear filtering.
@@ -593,6 +718,10 @@ class Image(Canvas):
         """
         Update the texture with a raw buffer that must fit the texture format.
         """
+    def write_pixels(self, pixels: typing_extensions.Buffer, xy: Union[Int2, Tuple[int, int]] = Int2(0, 0)) -> None:
+        """
+        Write a (height, width, 4) buffer of RGBA bytes (like a numpy uint8 array) into the image, with its top left corner at `xy`.
+        """
     @property
     def height(self) -> float:
         ...
@@ -753,6 +882,99 @@ class Int2:
     @property
     def yy(self) -> Int2:
         ...
+class Mesh:
+    """
+    Filled polygon geometry that is split into triangles once and kept on the GPU, so it can be drawn many times at different positions, scales and rotations.
+    """
+    @typing.overload
+    def __init__(self, points: list[Float2], convex: bool = False) -> None:
+        """
+        Create a mesh from the points of a polygon. If convex is `true` the polygon is used as a simple triangle fan, otherwise it is split into triangles using the ear-clipping method.
+        """
+    @typing.overload
+    def __init__(self, *, contours: list[list[Float2]]) -> None:
+        """
+        Create a mesh from a complex polygon that can consist of holes.
+        """
+    @property
+    def triangle_count(self) -> int:
+        """
+        Number of triangles in the mesh.
+        """
+class PendingFont:
+    """
+    A font that is being loaded in the background. Loading does not block the main thread until `result()` is called.
+    """
+    def done(self) -> bool:
+        """
+        True when the font is ready, which happens in `run_loop()` after it has been loaded.
+        """
+    def result(self) -> Font:
+        """
+        Get the font, first waiting for it to load if it is not ready. Raises the error if loading failed. Main thread only, use `done()` to check for it from other threads.
+        """
+class PendingImage:
+    """
+    A image that is being loaded in the background. Loading does not block the main thread until `result()` is called.
+    """
+    def done(self) -> bool:
+        """
+        True when the image is ready, which happens in `run_loop()` after it has been loaded.
+        """
+    def result(self) -> Image:
+        """
+        Get the image, first waiting for it to load if it is not ready. Raises the error if loading failed. Main thread only, use `done()` to check for it from other threads.
+        """
+class PixelSurface:
+    """
+    A CPU side image for fast pixel access. Changes are kept in memory, and only the changed areas are uploaded to the GPU when the surface is drawn.
+    """
+    @typing.overload
+    def __init__(self, width: int, height: int, color: int = 0) -> None:
+        """
+        Create a surface of the given size, filled with `color`.
+        """
+    @typing.overload
+    def __init__(self, size: Union[Int2, Tuple[int, int]], color: int = 0) -> None:
+        """
+        Create a surface of the given size, filled with `color`.
+        """
+    @typing.overload
+    def __init__(self, image: Image) -> None:
+        """
+        Create a surface holding a copy of `image`.
+        """
+    def clear(self, color: int = 0) -> None:
+        """
+        Fill the whole surface with `color`.
+        """
+    def flood_fill(self, pos: Union[Int2, Tuple[int, int]], color: int, tolerance: int = 0, mask: PixelSurface | None = None) -> tuple[Int2, Int2]:
+        """
+        Fill the area of same colored pixels around `pos` with `color`. Pixels whose color channels differ at most `tolerance` from the start pixel are filled. If `mask` is given, the area is filled in the mask instead. Returns the top left corner and size of the filled area.
+        """
+    def get_pixel(self, pos: Union[Int2, Tuple[int, int]]) -> int:
+        """
+        Get the color of a pixel. Pixels outside the surface are 0.
+        """
+    def set_pixel(self, pos: Union[Int2, Tuple[int, int]], color: int) -> None:
+        """
+        Set the color of a pixel.
+        """
+    @property
+    def bytes_uploaded(self) -> int:
+        """
+        Number of bytes uploaded to the texture so far.
+        """
+    @property
+    def image(self) -> Image:
+        """
+        The surface as an image. Changed areas are uploaded to the texture first.
+        """
+    @property
+    def size(self) -> Int2:
+        """
+        Size of the surface in pixels.
+        """
 class Screen(Canvas):
     """
     The main window. Currently there can be only one instance of this class.
@@ -781,6 +1003,11 @@ class Screen(Canvas):
         Time in seconds for last frame.
         """
     @property
+    def draw_calls(self) -> int:
+        """
+        Number of draw calls made during the last frame.
+        """
+    @property
     def fps(self) -> int:
         """
         Current FPS. Set to 0 to disable fixed FPS. Then use `seconds` or `delta` to sync your movement.
@@ -825,7 +1052,7 @@ class Screen(Canvas):
         ...
 class TileSet:
     """
-    A tileset is a texture split up into tiles for rendering. It is used by the `Console` class but can also be used directly.
+    A tileset is a texture split up into tiles for rendering. It is used by the `Console` class but can also be used directly. Glyphs are rendered into the texture when first used, and when it is full the least recently used glyph is evicted to make room.
     """
     @typing.overload
     def __init__(self, font_file: str, size: int = -1, tile_size: Union[Int2, Tuple[int, int]] = ..., distance: Union[Int2, Tuple[int, int]] = ...) -> None:
@@ -845,24 +1072,24 @@ class TileSet:
     @typing.overload
     def get_image_for(self, tile: int) -> Image:
         """
-        Get the image for a specific tile. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. Will throw an exception if there is no room.for the new tile in the tile texture.
+        Get the image for a specific tile. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. The tile will never be evicted from the tileset. Will throw an exception if there is no room for the new tile in the tile texture.
         """
     @typing.overload
     def get_image_for(self, character: str) -> Image:
         """
-        Get the image for a specific character. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. Will throw an exception if there is no room for the new tile in the tile texture.
+        Get the image for a specific character. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. The tile will never be evicted from the tileset. Will throw an exception if there is no room for the new tile in the tile texture.
         """
     def get_tileset_image(self) -> Image:
         """
         Get the entire tileset image. Typically used with `save_png()` to check generated tileset.
         """
     @typing.overload
-    def render_text(self, screen: Screen, text: str, pos: Union[Float2, Int2, Tuple[float, float]], size: Union[Float2, Int2, Tuple[float, float]] = ...) -> None:
+    def render_text(self, screen: Canvas, text: str, pos: Union[Float2, Int2, Tuple[float, float]], size: Union[Float2, Int2, Tuple[float, float]] = ...) -> None:
         """
         Render characters from the TileSet at given `pos` and given `size` (defaults to tile_size).
         """
     @typing.overload
-    def render_text(self, screen: Screen, text: str, points: list[Float2]) -> None:
+    def render_text(self, screen: Canvas, text: str, points: list[Float2]) -> None:
         """
         Render characters from the TileSet, each character using the next position from `points`, using the default tile size.
         """
@@ -915,10 +1142,22 @@ def load_font(name: Union[os.PathLike[str], str], size: int = 0) -> Font:
     """
     Load a TTF font.
     """
+def load_font_async(name: Union[os.PathLike[str], str], size: int = 0) -> PendingFont:
+    """
+    Start loading a TTF font in the background. The font becomes ready in the next `run_loop()`.
+    """
+def load_images(file_names: list[Union[os.PathLike[str], str]]) -> list[PendingImage]:
+    """
+    Start loading png files in the background, decoding them in parallel. Returns a `PendingImage` for every file.
+    """
 def load_png(file_name: Union[os.PathLike[str], str]) -> Image:
     """
     Create an _Image_ from a png file on disk.
     """
+def load_png_async(file_name: Union[os.PathLike[str], str]) -> PendingImage:
+    """
+    Start loading a png file in the background. The image is decoded in another thread, and uploaded to the GPU in the next `run_loop()`.
+    """
 @typing.overload
 def open_display(width: int = -1, height: int = -1, full_screen: bool = False, visible: bool = True) -> Screen:
     """
@@ -967,6 +1206,10 @@ def set_keyboard_device(device: int) -> None:
     """
     Set the device number that keyboard events will originate from. This can be used to handle multiple readline calls from consoles.
     """
+def set_tileset_cache(directory: Union[os.PathLike[str], str]) -> None:
+    """
+    Cache the pre-rendered glyphs of new TileSets in `directory`, so creating the same TileSet again is fast. An empty string turns the cache off.
+    """
 def update_tweens() -> None:
     """
     Manually update tweens
@@ -24,13 +24,33 @@ class TreeSitter:
         """
     def dump_tree(self) -> str:
         ...
+    def edit(self, start_byte: int, old_end_byte: int, new_end_byte: int, start: tuple[int, int], old_end: tuple[int, int], new_end: tuple[int, int]) -> None:
+        """
+        Tell the parser that the source has been edited, so the next `set_source` call can reuse the old tree. Points are `(column, row)` with columns in bytes, same as in `get_highlights()`.
+        """
     def find_node(self, arg0: int, arg1: int) -> TSNode | None:
         ...
+    @typing.overload
     def get_highlights(self) -> list[tuple[int, int, int, int, int]]:
         ...
+    @typing.overload
+    def get_highlights(self, row_start: int, row_end: int) -> typing.Any:
+        """
+        Get highlights for nodes intersecting rows `row_start` to `row_end` (exclusive). Only the part of the tree covering these rows is visited. Returns a flat `array('I')` with 5 values (col0, row0, col1, row1, color) per highlight.
+        """
     def set_format(self, arg0: list[tuple[str, int]]) -> None:
         ...
     def set_source(self, arg0: str) -> None:
-        ...
+        """
+        Parse UTF8 source. If `edit()` has been called since the last parse, only the edited parts are reparsed.
+        """
+    @typing.overload
     def set_source_utf16(self, arg0: list[int]) -> None:
-        ...
+        """
+        Parse UTF16 source. If `edit()` has been called since the last parse, only the edited parts are reparsed.
+        """
+    @typing.overload
+    def set_source_utf16(self, arg0: bytes) -> None:
+        """
+        Parse UTF16 (little endian) source from a bytes object.
+        """
@@ -0,0 +1,297 @@
+#include "atlas.hpp"
+
+#include "gl/texture.hpp"
+
+#include <algorithm>
+#include <array>
+#include <cstring>
+#include <fstream>
+#include <iterator>
+#include <limits>
+#include <memory>
+#include <numeric>
+#include <string>
+
+namespace pix {
+
+namespace {
+
+// The top edge of the used area of a page, as segments from left to right.
+// New rectangles are placed as far up as possible on top of it.
+struct Skyline
+{
+    struct Segment
+    {
+        int x;
+        int y;
+        int width;
+    };
+    int size;
+    std::vector<Segment> segments;
+
+    explicit Skyline(int sz) : size{sz}, segments{{0, 0, sz}} {}
+
+    // The y where a `w` * `h` rectangle would end up with its left edge at
+    // segment `i`, or -1 if it does not fit there
+    [[nodiscard]] int fit(size_t i, int w, int h) const
+    {
+        if (segments[i].x + w > size) { return -1; }
+        int y = 0;
+        int left = w;
+        for (auto j = i; left > 0; j++) {
+            y = std::max(y, segments[j].y);
+            if (y + h > size) { return -1; }
+            left -= segments[j].width;
+        }
+        return y;
+    }
+
+    // Make sure nothing more is placed here
+    void fill() { segments = {{0, size, size}}; }
+
+    void add(size_t i, int y, int w, int h)
+    {
+        auto const x = segments[i].x;
+        auto const end = x + w;
+        segments.insert(segments.begin() + static_cast<std::ptrdiff_t>(i),
+                        {x, y + h, w});
+        // Cut away what the new segment covers
+        auto j = i + 1;
+        while (j < segments.size() && segments[j].x < end) {
+            auto& seg = segments[j];
+            if (seg.x + seg.width <= end) {
+                segments.erase(segments.begin() +
+                               static_cast<std::ptrdiff_t>(j));
+                continue;
+            }
+            seg.width -= end - seg.x;
+            seg.x = end;
+            break;
+        }
+        // Join neighbours at the same height
+        for (j = 1; j < segments.size();) {
+            if (segments[j - 1].y == segments[j].y) {
+                segments[j - 1].width += segments[j].width;
+                segments.erase(segments.begin() +
+                               static_cast<std::ptrdiff_t>(j));
+            } else {
+                j++;
+            }
+        }
+    }
+};
+
+struct CacheHeader
+{
+    uint32_t magic = 0x54415850; // "PXAT"
+    uint32_t version = 1;
+    uint64_t key = 0;
+    int32_t page_count = 0;
+    int32_t image_count = 0;
+};
+
+} // namespace
+
+void Atlas::place(std::vector<Vec2i> const& sizes, int max_size, int padding)
+{
+    // Placing the tallest images first gives the flattest skyline
+    std::vector<size_t> order(sizes.size());
+    std::iota(order.begin(), order.end(), 0);
+    std::ranges::stable_sort(order, [&](size_t a, size_t b) {
+        return sizes[a].y != sizes[b].y ? sizes[a].y > sizes[b].y
+                                        : sizes[a].x > sizes[b].x;
+    });
+
+    // Pages are `padding` larger, since every rectangle is padded
+    std::vector<Skyline> pages;
+    placements.resize(sizes.size());
+    for (auto index : order) {
+        if (sizes[index].x <= 0 || sizes[index].y <= 0) { continue; }
+        auto const w = sizes[index].x + padding;
+        auto const h = sizes[index].y + padding;
+        size_t page = 0;
+        size_t best = 0;
+        int best_y = -1;
+        for (; page < pages.size(); page++) {
+            auto best_bottom = std::numeric_limits<int>::max();
+            auto const& segments = pages[page].segments;
+            for (size_t i = 0; i < segments.size(); i++) {
+                auto y = pages[page].fit(i, w, h);
+                if (y >= 0 && y + h < best_bottom) {
+                    best_bottom = y + h;
+                    best = i;
+                    best_y = y;
+                }
+            }
+            if (best_y >= 0) { break; }
+        }
+        if (best_y < 0) {
+            auto size = std::max({max_size, sizes[index].x, sizes[index].y});
+            pages.emplace_back(size + padding);
+            best = 0;
+            best_y = 0;
+        }
+        auto const x = pages[page].segments[best].x;
+        pages[page].add(best, best_y, w, h);
+        // An image larger than `max_size` gets a page of its own
+        if (sizes[index].x > max_size || sizes[index].y > max_size) {
+            pages[page].fill();
+        }
+        placements[index] = {static_cast<int32_t>(page), x, best_y,
+                             sizes[index].x, sizes[index].y};
+    }
+
+    if (pages.empty() && !sizes.empty()) { pages.emplace_back(1); }
+    // At least 1x1, so there are no empty textures
+    page_sizes.assign(pages.size(), Vec2i{1, 1});
+    for (auto const& p : placements) {
+        auto& size = page_sizes[p.page];
+        size.x = std::max(size.x, p.x + p.width);
+        size.y = std::max(size.y, p.y + p.height);
+    }
+}
+
+Atlas::Atlas(std::vector<Image> const& images, int max_size, int padding)
+{
+    std::vector<Vec2i> sizes;
+    sizes.reserve(images.size());
+    for (auto const& image : images) {
+        sizes.emplace_back(image.width, image.height);
+    }
+    place(sizes, max_size, padding);
+
+    for (auto const& size : page_sizes) {
+        pixels.emplace_back(static_cast<size_t>(size.x) * size.y, 0);
+    }
+    for (size_t i = 0; i < images.size(); i++) {
+        auto const& p = placements[i];
+        auto const& size = page_sizes[p.page];
+        auto& target = pixels[p.page];
+        auto const stride = static_cast<size_t>(p.width) * 4;
+        // Textures are stored bottom row first
+        for (int y = 0; y < p.height; y++) {
+            auto row = static_cast<size_t>(size.y - 1 - (p.y + y));
+            std::memcpy(&target[row * size.x + p.x],
+                        images[i].ptr + y * stride, stride);
+        }
+    }
+}
+
+uint64_t Atlas::cache_key(std::vector<std::filesystem::path> const& files,
+                          int max_size, int padding)
+{
+    // FNV-1a
+    uint64_t hash = 0xcbf29ce484222325;
+    auto add = [&hash](char const* data, size_t size) {
+        for (size_t i = 0; i < size; i++) {
+            hash ^= static_cast<uint8_t>(data[i]);
+            hash *= 0x100000001b3;
+        }
+    };
+    std::array<int32_t, 2> const settings{max_size, padding};
+    add(reinterpret_cast<char const*>(settings.data()), sizeof(settings));
+    for (auto const& file_name : files) {
+        std::ifstream file{file_name, std::ios::binary};
+        std::string contents{std::istreambuf_iterator<char>{file}, {}};
+        uint64_t const size = contents.size();
+        add(reinterpret_cast<char const*>(&size), sizeof(size));
+        add(contents.data(), contents.size());
+    }
+    return hash;
+}
+
+std::optional<Atlas> Atlas::load(std::string const& file_name, uint64_t key)
+{
+    std::ifstream file{file_name, std::ios::binary | std::ios::ate};
+    if (!file) { return std::nullopt; }
+    std::vector<char> contents(file.tellg());
+    file.seekg(0);
+    file.read(contents.data(), static_cast<std::streamsize>(contents.size()));
+
+    CacheHeader header;
+    if (!file || contents.size() < sizeof(header)) { return std::nullopt; }
+    std::memcpy(&header, contents.data(), sizeof(header));
+    if (header.magic != CacheHeader{}.magic ||
+        header.version != CacheHeader{}.version || header.key != key ||
+        header.page_count < 0 || header.image_count < 0) {
+        return std::nullopt;
+    }
+
+    Atlas atlas;
+    atlas.page_sizes.resize(header.page_count);
+    atlas.placements.resize(header.image_count);
+    auto const sizes_bytes = atlas.page_sizes.size() * sizeof(Vec2i);
+    auto const placements_bytes =
+        atlas.placements.size() * sizeof(Placement);
+    auto offset = sizeof(header) + sizes_bytes + placements_bytes;
+    if (contents.size() < offset) { return std::nullopt; }
+    std::memcpy(atlas.page_sizes.data(), contents.data() + sizeof(header),
+                sizes_bytes);
+    std::memcpy(atlas.placements.data(),
+                contents.data() + sizeof(header) + sizes_bytes,
+                placements_bytes);
+    for (auto const& size : atlas.page_sizes) {
+        if (size.x < 0 || size.y < 0) { return std::nullopt; }
+        auto const count = static_cast<size_t>(size.x) * size.y;
+        if (contents.size() < offset + count * sizeof(uint32_t)) {
+            return std::nullopt;
+        }
+        auto& page = atlas.pixels.emplace_back(count);
+        std::memcpy(page.data(), contents.data() + offset,
+                    count * sizeof(uint32_t));
+        offset += count * sizeof(uint32_t);
+    }
+    if (offset != contents.size()) { return std::nullopt; }
+    for (auto const& p : atlas.placements) {
+        if (p.page < 0 || p.page >= header.page_count) { return std::nullopt; }
+    }
+    return atlas;
+}
+
+void Atlas::save(std::string const& file_name, uint64_t key) const
+{
+    std::error_code ec;
+    auto const dir = std::filesystem::path(file_name).parent_path();
+    if (!dir.empty()) { std::filesystem::create_directories(dir, ec); }
+    CacheHeader header{.key = key,
+                       .page_count = static_cast<int32_t>(page_sizes.size()),
+                       .image_count = static_cast<int32_t>(placements.size())};
+    // Write to a temporary file first, so a concurrent reader never sees a
+    // partially written cache
+    auto temp_name = file_name + ".tmp";
+    {
+        std::ofstream file{temp_name, std::ios::binary};
+        file.write(reinterpret_cast<const char*>(&header), sizeof(header));
+        file.write(reinterpret_cast<const char*>(page_sizes.data()),
+                   static_cast<std::streamsize>(page_sizes.size() *
+                                                sizeof(Vec2i)));
+        file.write(reinterpret_cast<const char*>(placements.data()),
+                   static_cast<std::streamsize>(placements.size() *
+                                                sizeof(Placement)));
+        for (auto const& page : pixels) {
+            file.write(reinterpret_cast<const char*>(page.data()),
+                       static_cast<std::streamsize>(page.size() *
+                                                    sizeof(uint32_t)));
+        }
+        if (!file) { return; }
+    }
+    std::filesystem::rename(temp_name, file_name, ec);
+}
+
+std::vector<ImageView> Atlas::upload() const
+{
+    std::vector<gl::TexRef> textures;
+    for (size_t i = 0; i < page_sizes.size(); i++) {
+        textures.emplace_back(std::make_shared<gl::Texture>(
+            page_sizes[i].x, page_sizes[i].y, pixels[i]));
+    }
+    std::vector<ImageView> images;
+    images.reserve(placements.size());
+    for (auto const& p : placements) {
+        images.emplace_back(
+            textures[p.page].crop(p.x, p.y, p.width, p.height));
+    }
+    return images;
+}
+
+} // namespace pix
@@ -0,0 +1,65 @@
+#pragma once
+
+#include "image.hpp"
+#include "image_view.hpp"
+#include "vec2.hpp"
+
+#include <cstdint>
+#include <filesystem>
+#include <optional>
+#include <string>
+#include <vector>
+
+namespace pix {
+
+// Many images packed into as few textures as possible, so that drawing
+// them does not need texture switches and can be batched.
+class Atlas
+{
+public:
+    struct Placement
+    {
+        int32_t page = 0;
+        int32_t x = 0;
+        int32_t y = 0;
+        int32_t width = 0;
+        int32_t height = 0;
+    };
+
+private:
+    std::vector<Vec2i> page_sizes;
+    // Where every image was placed, in the order they were given
+    std::vector<Placement> placements;
+    // RGBA pixels of every page, bottom row first like textures
+    std::vector<std::vector<uint32_t>> pixels;
+
+    Atlas() = default;
+    void place(std::vector<Vec2i> const& sizes, int max_size, int padding);
+
+public:
+    // Pack `images` (RGBA, top row first) onto pages of at most
+    // `max_size` x `max_size` pixels, with `padding` empty pixels between
+    // them. Images larger than that get a page of their own. Does not use
+    // the GPU.
+    Atlas(std::vector<Image> const& images, int max_size, int padding);
+
+    // A key for caching an atlas packed from `files` with these settings.
+    // Changes if the contents of any of the files change.
+    static uint64_t cache_key(std::vector<std::filesystem::path> const& files,
+                              int max_size, int padding);
+    // Load an atlas saved with the same key, or nothing if there is none
+    static std::optional<Atlas> load(std::string const& file_name,
+                                     uint64_t key);
+    void save(std::string const& file_name, uint64_t key) const;
+
+    [[nodiscard]] size_t page_count() const { return page_sizes.size(); }
+    [[nodiscard]] std::vector<Placement> const& get_placements() const
+    {
+        return placements;
+    }
+
+    // Upload the pages into textures, and return a view for every image
+    [[nodiscard]] std::vector<ImageView> upload() const;
+};
+
+} // namespace pix
@@ -1,11 +1,18 @@
 #include "context.hpp"
 #include "colors.hpp"
+#include "display_list.hpp"
 #include "gl/functions.hpp"
 #include "image_view.hpp"
+#include "mesh.hpp"
 #include "vec2.hpp"
 
+#include <algorithm>
 #include <cmath>
-#include <tesselator.h>
+#include <span>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
 
 static const std::string str(Vec2f const& v)
 {
@@ -26,6 +33,117 @@ void Context::set_color(gl::Color const& col)
     fg = col;
 }
 
+void Context::apply_state(BatchState const& state)
+{
+    glBindFramebuffer(GL_FRAMEBUFFER, state.target);
+    auto const& target_size = state.target_size;
+    auto const& view_size = state.view_size;
+    auto const& offset = state.offset;
+    auto const vpscale = state.vpscale;
+    gl::setViewport({target_size.x * vpscale, target_size.y * vpscale});
+    if (offset.x != 0 || view_size != target_size) {
+        glEnable(GL_SCISSOR_TEST);
+        glScissor(offset.x * vpscale,
+                  (target_size.y - offset.y - view_size.y) * vpscale,
+                  view_size.x * vpscale, view_size.y * vpscale);
+    } else {
+        glDisable(GL_SCISSOR_TEST);
+    }
+    glBlendFunc(state.blend_source, state.blend_dest);
+}
+
+void Context::flush_batch()
+{
+    if (batch.empty()) { return; }
+    apply_state(batch_state);
+    if (batch_state.primitive == gl::Primitive::Lines) {
+        glLineWidth(batch_state.size);
+    } else if (batch_state.primitive == gl::Primitive::Points) {
+        glPointSize(batch_state.size);
+    }
+    if (batch_vbo == nullptr) {
+        batch_vbo =
+            std::make_unique<gl::ArrayBuffer<GL_STREAM_DRAW>>(int64_t{0});
+    }
+    auto colored =
+        ProgramCache::get_instance().get_program<ProgramCache::Colored>();
+    colored->use();
+    colored->setUniform("in_transform", batch_state.transform);
+    auto pos = colored->getAttribute("in_pos");
+    auto col = colored->getAttribute("in_color");
+    pos.enable();
+    col.enable();
+    // Reallocating the storage every time lets the driver keep drawing
+    // from the old data
+    batch_vbo->bind();
+    batch_vbo->set(batch);
+    gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float, 6 * sizeof(GLfloat),
+                     0);
+    gl::vertexAttrib(col, gl::Size<4>{}, gl::Type::Float, 6 * sizeof(GLfloat),
+                     2 * sizeof(GLfloat));
+    gl::drawArrays(batch_state.primitive, 0,
+                   static_cast<int>(batch.size() / 6));
+    pos.disable();
+    col.disable();
+    batch.clear();
+}
+
+void Context::release_batch()
+{
+    batch.clear();
+    batch_vbo = nullptr;
+}
+
+void Context::flush_target_batch() const
+{
+    if (!batch.empty() && batch_state.target == target) { flush_batch(); }
+}
+
+void Context::add_to_batch(gl::Primitive primitive, std::span<float const> xy,
+                           gl::Color const& color, float size)
+{
+    if (xy.empty()) { return; }
+    if (recording != nullptr) {
+        recording->add_colored(primitive, size, xy, color);
+        return;
+    }
+    auto state = get_state(primitive, size);
+    if (!batch.empty() && !(state == batch_state)) { flush_batch(); }
+    batch_state = state;
+    for (size_t i = 0; i + 1 < xy.size(); i += 2) {
+        batch.insert(batch.end(), {xy[i], xy[i + 1], color.red, color.green,
+                                   color.blue, color.alpha});
+    }
+    if (batch.size() >= max_batch_size) { flush_batch(); }
+}
+
+void Context::add_triangle_fan(std::span<float const> xy)
+{
+    static std::vector<float> triangles;
+    triangles.clear();
+    auto const n = xy.size() / 2;
+    for (size_t i = 1; i + 1 < n; i++) {
+        triangles.insert(triangles.end(),
+                         {xy[0], xy[1], xy[i * 2], xy[i * 2 + 1],
+                          xy[i * 2 + 2], xy[i * 2 + 3]});
+    }
+    add_to_batch(gl::Primitive::Triangles, triangles, fg);
+}
+
+void Context::add_line_strip(std::span<float const> xy, bool closed)
+{
+    static std::vector<float> lines;
+    lines.clear();
+    auto const n = xy.size() / 2;
+    auto const segments = closed ? n : n - 1;
+    for (size_t i = 0; n > 1 && i < segments; i++) {
+        auto j = (i + 1) % n;
+        lines.insert(lines.end(),
+                     {xy[i * 2], xy[i * 2 + 1], xy[j * 2], xy[j * 2 + 1]});
+    }
+    add_to_batch(gl::Primitive::Lines, lines, fg, line_width);
+}
+
 void Context::set_blend_mode(uint32_t mode)
 {
     blend_source = (mode >> 16);
@@ -38,19 +156,132 @@ void add_to(std::vector<float>& target, Vec2<float> const& v)
     target.push_back(v.y);
 }
 
+namespace {
+
+constexpr int max_circle_segments = 2048;
+
+using Transform = Context::Transform;
+
+// Convert to a column major 4x4 matrix for the vertex shader, leaving z
+// alone
+std::array<float, 16> to_gl(Transform const& m)
+{
+    auto f = [&m](int i) { return static_cast<float>(m[i]); };
+    return {f(0), f(3), 0, f(6), f(1), f(4), 0, f(7),
+            0,    0,    1, 0,    f(2), f(5), 0, f(8)};
+}
+
+// Points on the unit circle at every 1/`segments` turn, starting and ending
+// at angle 0. Rings are created on first use and kept.
+std::span<Vec2<float> const> unit_circle(int segments)
+{
+    static std::vector<std::vector<Vec2<float>>> rings(
+        max_circle_segments / 4 + 1);
+    auto& ring = rings[segments / 4];
+    if (ring.empty()) {
+        ring.reserve(segments + 1);
+        for (int i = 0; i <= segments; i++) {
+            auto v = Vec2f::from_angle(M_PI * 2.0 * i / segments);
+            ring.emplace_back(static_cast<float>(v.x), static_cast<float>(v.y));
+        }
+    }
+    return ring;
+}
+
+} // namespace
+
+int Context::circle_segments(double radius)
+{
+    auto steps = M_PI * 1.5 / asin(sqrt(1.0 / std::max(radius, 1.0)));
+    return std::clamp(static_cast<int>(std::lround(steps / 4)) * 4, 8,
+                      max_circle_segments / 2);
+}
+
+Context::Transform Context::multiply(Transform const& a, Transform const& b)
+{
+    Transform res{};
+    for (int row = 0; row < 3; row++) {
+        for (int col = 0; col < 3; col++) {
+            for (int i = 0; i < 3; i++) {
+                res[row * 3 + col] += a[row * 3 + i] * b[i * 3 + col];
+            }
+        }
+    }
+    return res;
+}
+
+void Context::push_transform(Transform const& m)
+{
+    transform_stack.push_back(transform);
+    transform = multiply(transform, m);
+}
+
+bool Context::pop_transform()
+{
+    if (transform_stack.empty()) { return false; }
+    transform = transform_stack.back();
+    transform_stack.pop_back();
+    return true;
+}
+
+Context::Transform Context::to_clip() const
+{
+    auto const s = target_scale * Vec2f{2, -2} / target_size;
+    auto const o = offset * Vec2f{2, -2} / target_size + Vec2f{-1, 1};
+    return {s.x, 0, o.x, 0, s.y, o.y, 0, 0, 1};
+}
+
+Context::Transform Context::from_clip() const
+{
+    auto const s = target_scale * Vec2f{2, -2} / target_size;
+    auto const o = offset * Vec2f{2, -2} / target_size + Vec2f{-1, 1};
+    return {1 / s.x, 0, -o.x / s.x, 0, 1 / s.y, -o.y / s.y, 0, 0, 1};
+}
+
+std::array<float, 16> Context::clip_transform() const
+{
+    static auto const identity = to_gl(identity_transform);
+    if (transform == identity_transform) { return identity; }
+    // Go from clip space back to pixels, transform, and back to clip space
+    return to_gl(multiply(multiply(to_clip(), transform), from_clip()));
+}
+
+void Context::check_not_recording(char const* what) const
+{
+    if (recording != nullptr) {
+        throw std::runtime_error(std::string(what) +
+                                 " can not be recorded in a display list");
+    }
+}
+
+Vec2<float> Context::screen_scale() const
+{
+    auto const s = target_scale * Vec2f{2, -2} / target_size;
+    return {static_cast<float>(s.x), static_cast<float>(s.y)};
+}
+
+double Context::pixel_scale() const
+{
+    auto const& m = transform;
+    auto const det = std::abs(m[0] * m[4] - m[1] * m[3]);
+    return std::max(target_scale.x, target_scale.y) * vpscale * std::sqrt(det);
+}
+
 std::vector<float> Context::generate_circle(Vec2f center, float radius,
                                             bool include_center) const
 {
     if (radius < 1) { return {}; }
-    int steps = static_cast<int>(M_PI * 1.5 / asin(sqrt(1.0 / radius)));
+    auto const ring = unit_circle(circle_segments(radius * pixel_scale()));
+    auto const c = to_screen(center);
+    auto const scale = screen_scale() * radius;
 
     std::vector<float> vertexData;
-    vertexData.reserve(steps + 2);
+    vertexData.reserve(ring.size() * 2 + 2);
 
-    if (include_center) { add_to(vertexData, to_screen(center)); }
-    for (int i = 0; i <= steps; i++) {
-        auto v = Vec2f::from_angle(M_PI * 2.0 * i / steps) * radius + center;
-        add_to(vertexData, to_screen(v));
+    if (include_center) { add_to(vertexData, c); }
+    for (auto const& v : ring) {
+        vertexData.push_back(c.x + v.x * scale.x);
+        vertexData.push_back(c.y + v.y * scale.y);
     }
     return vertexData;
 }
@@ -58,28 +289,29 @@ std::vector<float> Context::generate_circle(Vec2f center, float radius,
 std::vector<float> Context::generate_line(Vec2f p0, float r0, Vec2f p1,
                                           float r1) const
 {
-    int t = static_cast<int>(M_PI * 1.5 / asin(sqrt(1.0 / r0)));
     std::vector<float> result;
-    result.reserve(t * 2);
-    auto n = (p1 - p0).norm();
-
-    auto n0 = n * r0;
-    for (int i = 0; i < t; i++) {
-        auto angle = (M_PI * 3 / 2) - (M_PI * i / t);
-        auto s = sinf(angle);
-        auto c = cosf(angle);
-        auto ab = Vec2f(n0.x * c - n0.y * s, n0.x * s + n0.y * c) + p0;
-        add_to(result, to_screen(ab));
-    }
-    auto n1 = n * r1;
-    t = static_cast<int>(M_PI * 1.5 / asin(sqrt(1.0 / r1)));
-    for (int i = 0; i < t; i++) {
-        auto angle = (M_PI / 2) - (M_PI * i / t);
-        auto s = sinf(angle);
-        auto c = cosf(angle);
-        auto ab = Vec2f(n1.x * c - n1.y * s, n1.x * s + n1.y * c) + p1;
-        add_to(result, to_screen(ab));
-    }
+    auto const n = (p1 - p0).norm();
+    auto const scale = screen_scale();
+
+    // Add a half circle around `p`, starting at a quarter turn `quarter`
+    // from `n` and going clockwise
+    auto add_cap = [&](Vec2f p, float r, int quarter) {
+        auto const t = circle_segments(r * pixel_scale());
+        auto const ring = unit_circle(t * 2);
+        auto const c = to_screen(p);
+        auto const nr = Vec2<float>{static_cast<float>(n.x * r),
+                                    static_cast<float>(n.y * r)};
+        auto const start = quarter * t / 2;
+        for (int i = 0; i < t; i++) {
+            auto const& v = ring[(start - i + t * 2) % (t * 2)];
+            auto const ab = Vec2<float>{nr.x * v.x - nr.y * v.y,
+                                        nr.x * v.y + nr.y * v.x};
+            result.push_back(c.x + ab.x * scale.x);
+            result.push_back(c.y + ab.y * scale.y);
+        }
+    };
+    add_cap(p0, r0, 3);
+    add_cap(p1, r1, 1);
     return result;
 }
 
@@ -157,7 +389,7 @@ void Context::filled_rect(Vec2f top_left, Vec2f size)
                 str(top_left).c_str(), str(size).c_str());
         fflush(log_fp);
     }
-    draw_filled(generate_quad(top_left, size), gl::Primitive::TriangleFan);
+    add_triangle_fan(generate_quad(top_left, size));
 }
 
 void Context::rect(Vec2f top_left, Vec2f size)
@@ -167,9 +399,7 @@ void Context::rect(Vec2f top_left, Vec2f size)
                 str(size).c_str());
         fflush(log_fp);
     }
-    glLineWidth(line_width);
-    draw_filled(generate_quad(top_left + Vec2f{0.5, 0.5}, size),
-                gl::Primitive::LineLoop);
+    add_line_strip(generate_quad(top_left + Vec2f{0.5, 0.5}, size), true);
 }
 
 void Context::line(Vec2f from, Vec2f to)
@@ -179,9 +409,9 @@ void Context::line(Vec2f from, Vec2f to)
                 str(to).c_str());
         fflush(log_fp);
     }
-    glLineWidth(line_width);
-    draw_filled(generate_line(from + Vec2f{0.5, 0.5}, to + Vec2f{0.5, 0.5}),
-                gl::Primitive::Lines);
+    add_to_batch(gl::Primitive::Lines,
+                 generate_line(from + Vec2f{0.5, 0.5}, to + Vec2f{0.5, 0.5}),
+                 fg, line_width);
     last_point = to;
     last_rad = 1;
 }
@@ -193,10 +423,10 @@ void Context::line(Vec2f to)
         fflush(log_fp);
     }
     if (last_rad > 0) {
-        glLineWidth(line_width);
-        draw_filled(
+        add_to_batch(
+            gl::Primitive::Lines,
             generate_line(last_point + Vec2f{0.5, 0.5}, to + Vec2f{0.5, 0.5}),
-            gl::Primitive::Lines);
+            fg, line_width);
     }
     last_point = to;
     last_rad = 1;
@@ -204,8 +434,6 @@ void Context::line(Vec2f to)
 
 void Context::lines(std::vector<Vec2f> const& points)
 {
-    glLineWidth(line_width);
-
     std::vector<float> result;
     result.reserve(points.size() * 2);
     for (auto&& p : points) {
@@ -213,7 +441,7 @@ void Context::lines(std::vector<Vec2f> const& points)
         result.push_back(p2.x);
         result.push_back(p2.y);
     }
-    draw_filled(result, gl::Primitive::LineStrip);
+    add_line_strip(result, false);
 }
 void Context::round_line(Vec2f from, float rad_from, Vec2f to, float rad_to)
 {
@@ -223,8 +451,7 @@ void Context::round_line(Vec2f from, float rad_from, Vec2f to, float rad_to)
                 str(from).c_str(), rad_from, str(to).c_str(), rad_to);
         fflush(log_fp);
     }
-    auto points = generate_line(from, rad_from, to, rad_to);
-    draw_filled(points, gl::Primitive::TriangleFan);
+    add_triangle_fan(generate_line(from, rad_from, to, rad_to));
 
     last_point = to;
     last_rad = rad_to;
@@ -238,8 +465,7 @@ void Context::round_line(Vec2f to, float radius)
         fflush(log_fp);
     }
     if (last_rad > 0) {
-        auto points = generate_line(last_point, last_rad, to, radius);
-        draw_filled(points, gl::Primitive::TriangleFan);
+        add_triangle_fan(generate_line(last_point, last_rad, to, radius));
     }
     last_point = to;
     last_rad = radius;
@@ -247,12 +473,12 @@ void Context::round_line(Vec2f to, float radius)
 
 void Context::circle(Vec2f const& v, float r)
 {
-    glLineWidth(line_width);
     if (log_fp) {
         fprintf(log_fp, "circle center=%s radius=%.1f\n", str(v).c_str(), r);
         fflush(log_fp);
     }
-    draw_filled(generate_circle(v, r, false), gl::Primitive::LineLoop);
+    // The last point is the same as the first
+    add_line_strip(generate_circle(v, r, false), false);
 }
 
 void Context::filled_circle(Vec2f const& v, float r)
@@ -262,7 +488,7 @@ void Context::filled_circle(Vec2f const& v, float r)
                 r);
         fflush(log_fp);
     }
-    draw_filled(generate_circle(v, r, true), gl::Primitive::TriangleFan);
+    add_triangle_fan(generate_circle(v, r, true));
 }
 
 void Context::blit(pix::ImageView const& tex, Vec2f pos, Vec2f size)
@@ -273,7 +499,6 @@ void Context::blit(pix::ImageView const& tex, Vec2f pos, Vec2f size)
                 str(pos).c_str(), str(size).c_str());
         fflush(log_fp);
     }
-    tex.bind();
     if (size.x == 0) {
         size = {static_cast<float>(tex.width()),
                 static_cast<float>(tex.height())};
@@ -281,7 +506,7 @@ void Context::blit(pix::ImageView const& tex, Vec2f pos, Vec2f size)
     // auto vdata = generate_quad_with_uvs(pos.x, pos.y, size.x, size.y);
     auto vdata = generate_quad_with_uvs(pos, size);
     std::copy(tex.uvs().begin(), tex.uvs().end(), vdata.begin() + 8);
-    draw_textured(vdata, gl::Primitive::TriangleFan);
+    draw_textured(tex.get_tex().tex, vdata, gl::Primitive::TriangleFan);
 }
 
 void Context::draw(pix::ImageView const& tex, Vec2f center, Vec2f size,
@@ -293,21 +518,100 @@ void Context::draw(pix::ImageView const& tex, Vec2f center, Vec2f size,
                 str(center).c_str(), str(size).c_str(), rot);
         fflush(log_fp);
     }
-    tex.bind();
     if (size.x == 0) {
         size = {static_cast<float>(tex.width()),
                 static_cast<float>(tex.height())};
     }
     auto vdata = rotated_quad_with_uvs(center, size, rot);
     std::copy(tex.uvs().begin(), tex.uvs().end(), vdata.begin() + 8);
-    draw_textured(vdata, gl::Primitive::TriangleFan);
+    draw_textured(tex.get_tex().tex, vdata, gl::Primitive::TriangleFan);
+}
+
+void Context::draw_many(std::span<pix::ImageView* const> images,
+                        std::span<float const> centers,
+                        std::span<float const> sizes,
+                        std::span<float const> rotations,
+                        std::span<uint32_t const> colors)
+{
+    check_not_recording("draw_many()");
+    auto const n = centers.size() / 2;
+    if (n == 0 || images.empty()) { return; }
+    if (log_fp) {
+        fprintf(log_fp, "draw_many count=%zu\n", n);
+        fflush(log_fp);
+    }
+
+    auto sprites = ProgramCache::get_instance()
+                       .get_program<ProgramCache::Colored,
+                                    ProgramCache::Textured>();
+    set_target();
+    sprites->use();
+    sprites->setUniform("in_transform", clip_transform());
+    auto pos = sprites->getAttribute("in_pos");
+    auto uv = sprites->getAttribute("in_uv");
+    auto col = sprites->getAttribute("in_color");
+    pos.enable();
+    uv.enable();
+    col.enable();
+
+    // Two triangles per image, with 8 floats (pos, uv, color) per vertex
+    static constexpr int stride = 8;
+    std::vector<float> vdata;
+    vdata.reserve(std::min<size_t>(n, 4096) * 6 * stride);
+    auto draw_batch = [&] {
+        if (vdata.empty()) { return; }
+        gl::ArrayBuffer<GL_STREAM_DRAW> vbo{vdata};
+        vbo.bind();
+        gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float,
+                         stride * sizeof(GLfloat), 0);
+        gl::vertexAttrib(uv, gl::Size<2>{}, gl::Type::Float,
+                         stride * sizeof(GLfloat), 2 * sizeof(GLfloat));
+        gl::vertexAttrib(col, gl::Size<4>{}, gl::Type::Float,
+                         stride * sizeof(GLfloat), 4 * sizeof(GLfloat));
+        gl::drawArrays(gl::Primitive::Triangles, 0,
+                       static_cast<GLint>(vdata.size() / stride));
+        vdata.clear();
+    };
+
+    gl::Texture const* current = nullptr;
+    for (size_t i = 0; i < n; i++) {
+        auto const& image = *images[images.size() == 1 ? 0 : i];
+        auto const* tex = image.get_tex().tex.get();
+        if (tex != current) {
+            draw_batch();
+            image.bind();
+            current = tex;
+        }
+        Vec2f const center{centers[i * 2], centers[i * 2 + 1]};
+        Vec2f size{static_cast<float>(image.width()),
+                   static_cast<float>(image.height())};
+        if (!sizes.empty()) {
+            auto j = sizes.size() == 2 ? 0 : i * 2;
+            size = {sizes[j], sizes[j + 1]};
+        }
+        auto const rot =
+            rotations.empty() ? 0.F
+                              : rotations[rotations.size() == 1 ? 0 : i];
+        auto const color =
+            colors.empty() ? fg
+                           : gl::Color(colors[colors.size() == 1 ? 0 : i]);
+        auto const quad = rotated_quad(center, size, rot);
+        auto const& uvs = image.uvs();
+        for (int k : {0, 1, 2, 0, 2, 3}) {
+            vdata.insert(vdata.end(),
+                         {quad[k * 2], quad[k * 2 + 1], uvs[k * 2],
+                          uvs[k * 2 + 1], color.red, color.green, color.blue,
+                          color.alpha});
+        }
+    }
+    draw_batch();
+    pos.disable();
+    uv.disable();
+    col.disable();
 }
 
 Context::Context(Context const& other)
     : fg{other.fg},
-      colored{
-          ProgramCache::get_instance()
-              .get_program<ProgramCache::Colored, ProgramCache::NoTransform>()},
       textured{ProgramCache::get_instance()
                    .get_program<ProgramCache::Textured>()}, // NOLINT
       filled{ProgramCache::get_instance().get_program<>()} // NOLINT
@@ -320,6 +624,7 @@ Context::Context(Context const& other)
     // clip_start = other.clip_start;
     // clip_size = other.clip_size;
     vpscale = other.vpscale;
+    transform = other.transform;
 
     backface_culling = other.backface_culling;
     line_width = other.line_width;
@@ -328,12 +633,14 @@ Context::Context(Context const& other)
     blend_dest = other.blend_dest;
 }
 
+Context::~Context()
+{
+    unflushed.erase(this);
+}
+
 Context::Context(Vec2f _offset, Vec2f _view_size, Vec2f _target_size, GLuint fb)
     : target{fb}, view_size{_view_size}, offset{_offset},
       target_size{_target_size}, fg{color::white},
-      colored{
-          ProgramCache::get_instance()
-              .get_program<ProgramCache::Colored, ProgramCache::NoTransform>()},
       textured{ProgramCache::get_instance()
                    .get_program<ProgramCache::Textured>()}, // NOLINT
       filled{ProgramCache::get_instance().get_program<>()} // NOLINT
@@ -357,10 +664,15 @@ Context::Context(float w, float h, GLuint fb)
 template <typename CO>
 void Context::draw_filled(const CO& container, gl::Primitive primitive)
 {
+    if (recording != nullptr) {
+        recording->add_filled(primitive, container, {}, false);
+        return;
+    }
     set_target();
 
     filled->use();
     filled->setUniform("frag_color", fg);
+    filled->setUniform("in_transform", clip_transform());
     auto pos = filled->getAttribute("in_pos");
     pos.enable();
     gl::ArrayBuffer<GL_STREAM_DRAW> vbo{container};
@@ -376,10 +688,15 @@ template <typename CO, typename T>
 void Context::draw_indexed(const CO& container, std::vector<T> indices,
                            gl::Primitive primitive)
 {
+    if (recording != nullptr) {
+        recording->add_filled(primitive, container, indices, false);
+        return;
+    }
     set_target();
 
     filled->use();
     filled->setUniform("frag_color", fg);
+    filled->setUniform("in_transform", clip_transform());
     auto pos = filled->getAttribute("in_pos");
     pos.enable();
     gl::ArrayBuffer<GL_STREAM_DRAW> vbo{container};
@@ -394,35 +711,6 @@ void Context::draw_indexed(const CO& container, std::vector<T> indices,
     pos.disable();
 }
 
-template <typename F, typename I>
-void Context::draw_indexed(F const* coords, size_t c_count, I const* indices,
-                           size_t i_count, gl::Primitive primitive)
-{
-    set_target();
-
-    filled->use();
-    filled->setUniform("frag_color", fg);
-    auto pos = filled->getAttribute("in_pos");
-    pos.enable();
-    gl::ArrayBuffer<GL_STREAM_DRAW> vbo{coords, c_count};
-    gl::ElementBuffer<GL_STREAM_DRAW> elements{indices, i_count};
-    vbo.bind();
-    elements.bind();
-    if constexpr (sizeof(F) == 4) {
-        gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float,
-                         0 * sizeof(GLfloat), 0);
-    } else {
-        gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Double,
-                         0 * sizeof(GLdouble), 0);
-    }
-    if constexpr (sizeof(I) == 2) {
-        gl::drawElements(primitive, i_count, gl::Type::UnsignedShort, 0);
-    } else {
-        gl::drawElements(primitive, i_count, gl::Type::UnsignedInt, 0);
-    }
-    pos.disable();
-}
-
 bool intersects(Vec2f v11, Vec2f v12, Vec2f v21, Vec2f v22)
 {
     // Convert vector 1 to a line (line 1) of infinite length.
@@ -475,146 +763,142 @@ bool intersects(Vec2f v11, Vec2f v12, Vec2f v21, Vec2f v22)
     return true;
 }
 
-double cross(Vec2f a, Vec2f b)
-{
-    return a.x * b.y - b.x * a.y;
-}
-
-bool same_side(Vec2f const& p1, Vec2f const& p2, Vec2f const& a, Vec2f const& b)
-{
-    Vec2f ab = {b.x - a.x, b.y - a.y};
-    Vec2f ap1 = {p1.x - a.x, p1.y - a.y};
-    Vec2f ap2 = {p2.x - a.x, p2.y - a.y};
-    auto cp1 = cross(ab, ap1);
-    auto cp2 = cross(ab, ap2);
-    return (cp1 * cp2 >= 0);
-}
-
-bool in_triangle(Vec2f const& p, Vec2f const& a, Vec2f const& b, Vec2f const& c)
-{
-    return same_side(p, a, b, c) && same_side(p, b, a, c) &&
-           same_side(p, c, a, b);
-}
-
-bool is_convex(Vec2f a, Vec2f b, Vec2f c)
+void Context::draw_complex_polygon(
+    std::vector<std::vector<Vec2f>> const& polygons)
 {
-    // Check if the triangle a-b-c is convex.
-    // Assuming a clockwise order of points, if the cross product
-    // of vectors (b - a) and (c - b) is positive, it is convex.
-    Vec2f ab = {b.x - a.x, b.y - a.y};
-    Vec2f bc = {c.x - b.x, c.y - b.y};
-    return cross(ab, bc) > 0;
+    std::vector<float> data;
+    std::vector<uint16_t> triangles;
+    tesselate(polygons, data, triangles);
+    if (triangles.empty()) { return; }
+    for (size_t i = 0; i < data.size(); i += 2) {
+        auto const v = to_screen(data[i], data[i + 1]);
+        data[i] = v.x;
+        data[i + 1] = v.y;
+    }
+    draw_indexed(data, triangles, gl::Primitive::Triangles);
 }
 
-bool is_ear(Vec2f a, Vec2f b, Vec2f c, Vec2f const* vertices, size_t count)
+void Context::draw_inconvex_polygon(Vec2f const* points, size_t count)
 {
-    if (!is_convex(a, b, c)) {
-        return false; // The triangle is not convex
-    }
-
+    auto triangles = ear_clip({points, count});
+    if (triangles.empty()) { return; }
+    std::vector<float> data;
+    data.reserve(count * 2);
     for (size_t i = 0; i < count; i++) {
-        auto p = vertices[i];
-        if (p != a && p != b && p != c && in_triangle(p, a, b, c)) {
-            return false; // Found a point inside the triangle
-        }
+        add_to(data, to_screen(points[i]));
     }
-
-    return true; // No points inside the triangle and it is convex
+    draw_indexed(data, triangles, gl::Primitive::Triangles);
 }
 
-void Context::draw_complex_polygon(
-    std::vector<std::vector<Vec2f>> const& polygons)
+void Context::draw(Mesh& mesh, Vec2f pos, Vec2f scale, float rot,
+                   gl::Color color)
 {
-    auto* tess = tessNewTess(nullptr);
-    for (auto const& vec : polygons) {
-        tessAddContour(tess, 2, vec.data(), 16, static_cast<int>(vec.size()));
-    }
-
-    tessTesselate(tess, TessWindingRule::TESS_WINDING_ODD,
-                  TessElementType::TESS_POLYGONS, 3, 2, nullptr);
-    auto* verts = tessGetVertices(tess);
-    auto* elems = tessGetElements(tess);
-    float f[8 * 1024];
-    const auto ec = tessGetElementCount(tess) * 3;
-    const auto vc = tessGetVertexCount(tess);
-    for (int i = 0; i < vc; i++) {
-        auto const v = to_screen(verts[i * 2], verts[i * 2 + 1]);
-        f[i * 2] = v.x;
-        f[i * 2 + 1] = v.y;
+    check_not_recording("Drawing a mesh");
+    if (mesh.index_count() == 0) { return; }
+    if (log_fp) {
+        fprintf(log_fp, "draw mesh pos=%s triangles=%zu\n", str(pos).c_str(),
+                mesh.index_count() / 3);
+        fflush(log_fp);
     }
-    draw_indexed(f, vc * 2, elems, ec, gl::Primitive::Triangles);
-    tessDeleteTess(tess);
+    // Scale and rotate in mesh coordinates, move to `pos`, apply the
+    // transform and map to clip space, all in the vertex shader
+    auto const ca = std::cos(static_cast<double>(rot));
+    auto const sa = std::sin(static_cast<double>(rot));
+    Transform const local{ca * scale.x, -sa * scale.y, pos.x,
+                          sa * scale.x, ca * scale.y,  pos.y,
+                          0,            0,             1};
+    auto const mat = to_gl(multiply(multiply(to_clip(), transform), local));
+    set_target();
+    filled->use();
+    filled->setUniform("frag_color", color);
+    filled->setUniform("in_transform", mat);
+    auto p = filled->getAttribute("in_pos");
+    p.enable();
+    mesh.bind();
+    gl::vertexAttrib(p, gl::Size<2>{}, gl::Type::Float, 0, 0);
+    gl::drawElements(gl::Primitive::Triangles,
+                     static_cast<GLsizei>(mesh.index_count()),
+                     gl::Type::UnsignedShort, 0);
+    p.disable();
 }
 
-void Context::draw_inconvex_polygon(Vec2f const* points, size_t count)
+void Context::replay(DisplayList& list, Vec2f offset)
 {
-    std::vector<uint16_t> triangles;
-    std::vector<uint16_t> indexes;
-    indexes.resize(count);
-    for (size_t i = 0; i < count; i++) {
-        indexes[i] = i;
-    }
-    std::vector<float> data;
-    int removed = 0;
-    double sum = 0;
-
-    for (unsigned i = 0; i < count - 1; i++) {
-        auto&& q = points[i];
-        auto&& p = points[i + 1];
-        sum += (p.x - q.x) * (p.y + q.y);
+    Transform const move{1, 0, offset.x, 0, 1, offset.y, 0, 0, 1};
+    if (recording != nullptr) {
+        recording->add_list(list, multiply(transform, move));
+        return;
     }
-    {
-        auto&& q = points[count - 1];
-        auto&& p = points[0];
-        sum += (p.x - q.x) * (p.y + q.y);
+    if (log_fp) {
+        fprintf(log_fp, "replay commands=%zu offset=%s\n",
+                list.get_commands().size(), str(offset).c_str());
+        fflush(log_fp);
     }
-
-    if (sum > 0) { return; }
-
-    for (unsigned i = 0; i < count; i++) {
-
-        auto&& p = to_screen(points[i]);
-        data.push_back(p.x);
-        data.push_back(p.y);
-    }
-    count -= removed;
-    while (indexes.size() > 3) {
-        bool ok = false;
-        for (size_t j = 0; j < indexes.size(); ++j) {
-            auto i0 = indexes[j];
-            auto i1 = indexes[(j + 1) % count];
-            auto i2 = indexes[(j + 2) % count];
-            auto&& a = points[i0];
-            auto&& b = points[i1];
-            auto&& c = points[i2];
-
-            if (is_ear(a, b, c, points, count)) {
-                triangles.push_back(i0);
-                triangles.push_back(i1);
-                triangles.push_back(i2);
-                // Remove the vertex 'b' from the list
-                indexes.erase(indexes.begin() + (j + 1) % count);
-                ok = true;
-                break;
+    // Images drawn by the list may have pixel writes that are not flushed
+    flush_all_pixels();
+    set_target();
+    auto const to_target = multiply(multiply(to_clip(), transform), move);
+    auto colored =
+        ProgramCache::get_instance().get_program<ProgramCache::Colored>();
+    for (auto& cmd : list.get_commands()) {
+        using Kind = DisplayList::Kind;
+        glBlendFunc(cmd.blend_source, cmd.blend_dest);
+        if (cmd.vbo == nullptr) {
+            cmd.vbo = std::make_shared<gl::ArrayBuffer<>>(cmd.vertices);
+            if (!cmd.indices.empty()) {
+                cmd.ibo = std::make_shared<gl::ElementBuffer<>>(cmd.indices);
             }
         }
-        if (!ok) {
-            triangles.push_back(indexes[0]);
-            triangles.push_back(indexes[1]);
-            triangles.push_back(indexes[2]);
-            indexes.erase(indexes.begin());
-            // fprintf(stderr, "BROKEN POLYGON\n");
-            // for (size_t j = 0; j < indexes.size(); ++j) {
-            //     auto&& p = points[indexes[j]];
-            //     fprintf(stderr, "X: %.3f Y: %.3f\n", p.x, p.y);
-            // }
-            // break;
+        auto const mat = to_gl(multiply(to_target, cmd.to_pixels));
+        auto const& program = cmd.kind == Kind::Colored    ? colored
+                              : cmd.kind == Kind::Textured ? textured
+                                                           : filled;
+        program->use();
+        program->setUniform("in_transform", mat);
+        auto pos = program->getAttribute("in_pos");
+        pos.enable();
+        cmd.vbo->bind();
+        if (cmd.kind == Kind::Colored) {
+            if (cmd.primitive == gl::Primitive::Lines) {
+                glLineWidth(cmd.size);
+            } else if (cmd.primitive == gl::Primitive::Points) {
+                glPointSize(cmd.size);
+            }
+            auto col = program->getAttribute("in_color");
+            col.enable();
+            gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float,
+                             6 * sizeof(GLfloat), 0);
+            gl::vertexAttrib(col, gl::Size<4>{}, gl::Type::Float,
+                             6 * sizeof(GLfloat), 2 * sizeof(GLfloat));
+            gl::drawArrays(cmd.primitive, 0,
+                           static_cast<int>(cmd.vertices.size() / 6));
+            col.disable();
+        } else if (cmd.kind == Kind::Textured) {
+            cmd.texture->bind();
+            program->setUniform("frag_color", cmd.color);
+            auto uv = program->getAttribute("in_uv");
+            uv.enable();
+            gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float,
+                             4 * sizeof(GLfloat), 0);
+            gl::vertexAttrib(uv, gl::Size<2>{}, gl::Type::Float,
+                             4 * sizeof(GLfloat), 2 * sizeof(GLfloat));
+            gl::drawArrays(cmd.primitive, 0,
+                           static_cast<int>(cmd.vertices.size() / 4));
+            uv.disable();
+        } else {
+            program->setUniform("frag_color", cmd.color);
+            if (cmd.culling) { glEnable(GL_CULL_FACE); }
+            cmd.ibo->bind();
+            gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float, 0, 0);
+            gl::drawElements(cmd.primitive,
+                             static_cast<int>(cmd.indices.size()),
+                             gl::Type::UnsignedShort, 0);
+            if (cmd.culling) { glDisable(GL_CULL_FACE); }
         }
+        pos.disable();
     }
-    triangles.push_back(indexes[0]);
-    triangles.push_back(indexes[1]);
-    triangles.push_back(indexes[2]);
-    draw_indexed(data, triangles, gl::Primitive::Triangles);
+    // Later draws expect the state of this canvas
+    apply_state(get_state(gl::Primitive::Triangles));
 }
 
 void Context::draw_polygon(Vec2f const* points, size_t count)
@@ -627,6 +911,11 @@ void Context::draw_polygon(Vec2f const* points, size_t count)
         data[(count - i - 1) * 2 + 1] = p.y;
     }
 
+    if (recording != nullptr) {
+        recording->add_filled(gl::Primitive::TriangleFan, data, {},
+                              backface_culling);
+        return;
+    }
     if (backface_culling) { glEnable(GL_CULL_FACE); }
     draw_filled(data, gl::Primitive::TriangleFan);
     if (backface_culling) { glDisable(GL_CULL_FACE); }
@@ -634,28 +923,25 @@ void Context::draw_polygon(Vec2f const* points, size_t count)
 
 void Context::set_target() const
 {
-    // printf("%f,%f / %f,%f / %f : %d\n", view_size.x, view_size.y,
-    // target_size.x, target_size.y, vpscale, target);
-    glBindFramebuffer(GL_FRAMEBUFFER, target);
-    gl::setViewport({target_size.x * vpscale, target_size.y * vpscale});
-    if (offset.x != 0 || view_size != target_size) {
-        glEnable(GL_SCISSOR_TEST);
-        glScissor(offset.x * vpscale,
-                  (target_size.y - offset.y - view_size.y) * vpscale,
-                  view_size.x * vpscale, view_size.y * vpscale);
-    } else {
-        glDisable(GL_SCISSOR_TEST);
-    }
-    glBlendFunc(blend_source, blend_dest);
+    if (recording != nullptr) { return; }
+    flush_batch();
+    apply_state(get_state(gl::Primitive::Triangles));
 }
 
 template <typename CO>
-void Context::draw_textured(const CO& container, gl::Primitive primitive)
+void Context::draw_textured(std::shared_ptr<gl::Texture> const& texture,
+                            CO const& container, gl::Primitive primitive)
 {
+    if (recording != nullptr) {
+        recording->add_textured(texture, primitive, container);
+        return;
+    }
     set_target();
 
+    texture->bind();
     textured->use();
     textured->setUniform("frag_color", fg);
+    textured->setUniform("in_transform", clip_transform());
     auto pos = textured->getAttribute("in_pos");
     pos.enable();
     auto uv = textured->getAttribute("in_uv");
@@ -675,6 +961,10 @@ void Context::draw_textured(const CO& container, gl::Primitive primitive)
 
 void Context::clear(const gl::Color& col) const
 {
+    if (recording != nullptr) {
+        recording->add_clear(col);
+        return;
+    }
     set_target();
     glClearColor(col.red, col.green, col.blue, col.alpha);
     glClear(GL_COLOR_BUFFER_BIT);
@@ -683,112 +973,108 @@ void Context::clear(const gl::Color& col) const
 void Context::plot(Vec2f point, gl::Color col)
 {
     auto p = to_screen(point);
-    point_cache.push_back(p.x);
-    point_cache.push_back(p.y);
-    point_cache.push_back(col.red);
-    point_cache.push_back(col.green);
-    point_cache.push_back(col.blue);
-    point_cache.push_back(col.alpha);
-
-    if (point_cache.size() > 32000) {
-        draw_points();
-        point_cache.clear();
-    }
-}
-
-void Context::draw_points()
-{
-    glBindFramebuffer(GL_FRAMEBUFFER, target);
-    gl::setViewport({target_size.x * vpscale, target_size.y * vpscale});
-
-    glPointSize(point_size);
-
-    colored->use();
-    auto pos = colored->getAttribute("in_pos");
-    auto cola = colored->getAttribute("in_color");
-    pos.enable();
-    cola.enable();
-    gl::ArrayBuffer<GL_STREAM_DRAW> vbo{point_cache};
-    vbo.bind();
-    gl::vertexAttrib(pos, gl::Size<2>{}, gl::Type::Float, 6 * sizeof(GLfloat),
-                     0);
-    gl::vertexAttrib(cola, gl::Size<4>{}, gl::Type::Float, 6 * sizeof(GLfloat),
-                     8);
-    int len = static_cast<int>(point_cache.size()) / 6;
-    gl::drawArrays(gl::Primitive::Points, 0, len);
-    pos.disable();
-    cola.disable();
+    add_to_batch(gl::Primitive::Points, std::array{p.x, p.y}, col,
+                 point_size);
 }
 
 void Context::flush()
 {
-    if (!point_cache.empty()) {
-        draw_points();
-        point_cache.clear();
-    }
+    if (recording != nullptr) { return; }
+    flush_batch();
     flush_pixels();
 }
 void Context::set_pixel(int x, int y, uint32_t col)
 {
+    check_not_recording("set_pixel()");
     col = (col & 0x0000FFFF) << 16 | (col & 0xFFFF0000) >> 16;
     col = (col & 0x00FF00FF) << 8 | (col & 0xFF00FF00) >> 8;
 
+    flush_target_batch();
     glBindFramebuffer(GL_FRAMEBUFFER, target);
     auto const width = static_cast<int>(view_size.x);
     auto const height = static_cast<int>(view_size.y);
+    if (x < 0 || x >= width || y < 0 || y >= height) { return; }
     if (pixels == nullptr) {
         pixels = std::unique_ptr<uint32_t[]>(new uint32_t[width * height]);
         glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE,
                      pixels.get());
     }
     dirty = true;
-    pixels[x + width * (height - y)] = col;
+    unflushed.insert(this);
+    pixels[x + width * (height - 1 - y)] = col;
 }
 
-void Context::flood_fill(int x, int y, uint32_t col)
+Rect Context::flood_fill(int x, int y, uint32_t col, int tolerance,
+                         ImageView* mask)
 {
+    check_not_recording("flood_fill()");
     col = (col & 0x0000FFFF) << 16 | (col & 0xFFFF0000) >> 16;
     col = (col & 0x00FF00FF) << 8 | (col & 0xFF00FF00) >> 8;
 
+    flush_target_batch();
     glBindFramebuffer(GL_FRAMEBUFFER, target);
     auto const width = static_cast<int>(view_size.x);
     auto const height = static_cast<int>(view_size.y);
 
-    if (x < 0 || x >= width || y < 0 || y >= height) { return; }
+    if (x < 0 || x >= width || y < 0 || y >= height) { return {x, y, x, y}; }
     if (pixels == nullptr) {
         pixels = std::unique_ptr<uint32_t[]>(new uint32_t[width * height]);
         glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE,
                      pixels.get());
     }
-
-    uint32_t target_color = pixels[x + width * (height - y)];
-    if (target_color == col) { return; }
-
-    std::vector<std::pair<int, int>> stack;
-    stack.push_back({x, y});
-
-    while (!stack.empty()) {
-        auto [px, py] = stack.back();
-        stack.pop_back();
-
-        if (px < 0 || px >= width || py < 0 || py >= height) { continue; }
-
-        if (pixels[px + width * (height - py)] != target_color) { continue; }
-
-        pixels[px + width * (height - py)] = col;
-
-        stack.push_back({px + 1, py});
-        stack.push_back({px - 1, py});
-        stack.push_back({px, py + 1});
-        stack.push_back({px, py - 1});
+    std::span<uint32_t> source{pixels.get(),
+                               static_cast<size_t>(width) * height};
+    // Rows are read bottom up, so fill upside down
+    auto flip = [height](Rect const& r) {
+        return Rect{r.x0, height - r.y1, r.x1, height - r.y0};
+    };
+
+    if (mask != nullptr) {
+        mask->flush();
+        auto& tex = mask->get_tex();
+        auto data = tex.read_pixels();
+        std::span<uint32_t> target{reinterpret_cast<uint32_t*>(data.data()),
+                                   source.size()};
+        auto area = scanline_fill(source, target, width, height, x,
+                                  height - 1 - y, col, tolerance);
+        if (!area.empty()) {
+            auto w = area.x1 - area.x0;
+            auto h = area.y1 - area.y0;
+            std::vector<uint32_t> rows(static_cast<size_t>(w) * h);
+            for (int r = 0; r < h; r++) {
+                std::copy_n(&target[static_cast<size_t>(area.y0 + r) * width +
+                                    area.x0],
+                            w, &rows[static_cast<size_t>(r) * w]);
+            }
+            auto tx = static_cast<int>(std::lround(tex.x()));
+            auto ty = static_cast<int>(std::lround(tex.y()));
+            tex.tex->update(tx + area.x0,
+                            tex.tex->height - ty - height + area.y0, w, h,
+                            rows.data());
+        }
+        release_pixels();
+        return flip(area);
     }
 
-    dirty = true;
-    flush_pixels();
+    auto area = flip(scanline_fill(source, source, width, height, x,
+                                   height - 1 - y, col, tolerance));
+    if (area.empty()) {
+        release_pixels();
+        return area;
+    }
+    if (dirty) {
+        // Pixels outside the filled area have also changed
+        flush_pixels();
+    } else {
+        flush_pixels(area);
+    }
+    return area;
 }
 
 pix::ImageView Context::to_image() const
 {
+    check_not_recording("to_image()");
+    flush_target_batch();
     glBindFramebuffer(GL_FRAMEBUFFER, target);
     auto const width = static_cast<int>(view_size.x);
     auto const height = static_cast<int>(view_size.y);
@@ -801,22 +1087,60 @@ pix::ImageView Context::to_image() const
     return pix::ImageView{gl::TexRef{tex}};
 }
 
+void Context::release_pixels()
+{
+    // The snapshot is only valid until something else is drawn, so it can
+    // only be kept while there are pixel writes left to flush
+    if (!dirty) { pixels = nullptr; }
+}
+
 void Context::flush_pixels()
 {
     if (dirty) {
-        // TODO: Better way of drawing to a FBO than creating a temporary
-        // texture and drawing a quad?
-        int width = view_size.x;
-        int height = view_size.y;
-        int x = offset.x;
-        int y = offset.y;
-        auto tex = std::make_shared<gl::Texture>(width, height, pixels.get());
-        auto oldfg = fg;
-        fg = 0xffffffff;
-        blit(pix::ImageView{gl::TexRef{tex}}, {0, 0}, view_size);
-        fg = oldfg;
-        dirty = false;
-        pixels = nullptr;
+        flush_pixels({0, 0, static_cast<int>(view_size.x),
+                      static_cast<int>(view_size.y)});
+    }
+}
+
+void Context::flush_pixels(Rect const& area)
+{
+    // TODO: Better way of drawing to a FBO than creating a temporary
+    // texture and drawing a quad?
+    auto const width = static_cast<int>(view_size.x);
+    auto const height = static_cast<int>(view_size.y);
+    auto w = area.x1 - area.x0;
+    auto h = area.y1 - area.y0;
+    // The cache is stored bottom up
+    auto const* first =
+        &pixels[static_cast<size_t>(height - area.y1) * width + area.x0];
+    std::vector<uint32_t> rows;
+    if (w != width) {
+        rows.resize(static_cast<size_t>(w) * h);
+        for (int y = 0; y < h; y++) {
+            std::copy_n(first + static_cast<size_t>(y) * width, w,
+                        &rows[static_cast<size_t>(y) * w]);
+        }
+        first = rows.data();
+    }
+    auto tex = std::make_shared<gl::Texture>(w, h, first);
+    auto oldfg = fg;
+    fg = 0xffffffff;
+    // Pixels are not transformed
+    auto old_transform = std::exchange(transform, identity_transform);
+    blit(pix::ImageView{gl::TexRef{tex}},
+         {static_cast<float>(area.x0), static_cast<float>(area.y0)},
+         {static_cast<float>(w), static_cast<float>(h)});
+    transform = old_transform;
+    fg = oldfg;
+    dirty = false;
+    unflushed.erase(this);
+    pixels = nullptr;
+}
+
+void Context::flush_all_pixels()
+{
+    while (!unflushed.empty()) {
+        (*unflushed.begin())->flush_pixels();
     }
 }
 
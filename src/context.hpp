@@ -1,5 +1,6 @@
 #pragma once
 
+#include "flood_fill.hpp"
 #include "gl/color.hpp"
 #include "gl/functions.hpp"
 #include "gl/program.hpp"
@@ -7,12 +8,19 @@
 
 #include "vec2.hpp"
 
+#include <array>
 #include <filesystem>
+#include <memory>
+#include <span>
+#include <unordered_set>
+#include <vector>
 namespace fs = std::filesystem;
 
 namespace pix {
 
+class DisplayList;
 class ImageView;
+class Mesh;
 
 class Context
 {
@@ -22,6 +30,12 @@ class Context
 protected:
     FILE* log_fp = nullptr;
 
+    // If set, everything drawn is added to this list instead
+    DisplayList* recording = nullptr;
+
+    // Canvases with pixel writes that are not flushed yet
+    static inline std::unordered_set<Context*> unflushed;
+
 public:
     void log_to(fs::path const& target)
     {
@@ -44,6 +58,12 @@ public:
 
     Vec2f target_scale{1, 1};
 
+    // Row major 3x3 matrix, mapping pixel coordinates to pixel coordinates
+    using Transform = std::array<double, 9>;
+    static constexpr Transform identity_transform{1, 0, 0, 0, 1, 0, 0, 0, 1};
+    // Applied to everything drawn, in the vertex shader
+    Transform transform = identity_transform;
+
     // Clip (scissor) area
     // Vec2i clip_start{0, 0};
     // Vec2i clip_size{0, 0};
@@ -63,13 +83,56 @@ public:
     unsigned blend_source = GL_SRC_ALPHA;
     unsigned blend_dest = GL_ONE_MINUS_SRC_ALPHA;
 
-    std::vector<float> point_cache;
-
 private:
+    std::vector<Transform> transform_stack;
+
     Vec2f last_point{0, 0};
     float last_rad = -1.0F;
 
-    std::shared_ptr<gl::Program> colored;
+    // Everything that affects how batched geometry is drawn
+    struct BatchState
+    {
+        GLuint target;
+        Vec2f offset;
+        Vec2f view_size;
+        Vec2f target_size;
+        float vpscale;
+        unsigned blend_source;
+        unsigned blend_dest;
+        gl::Primitive primitive;
+        // Line width or point size
+        float size;
+        // Shader matrix for the canvas transform
+        std::array<float, 16> transform;
+
+        bool operator==(BatchState const&) const = default;
+    };
+
+    // Solid color geometry (x, y, r, g, b, a per vertex) from all contexts.
+    // It is drawn with a single draw call when the state changes, or when
+    // anything else is drawn.
+    static inline std::vector<float> batch;
+    static inline BatchState batch_state{};
+    // The buffer the batch is drawn from, created on first use
+    static inline std::unique_ptr<gl::ArrayBuffer<GL_STREAM_DRAW>> batch_vbo;
+    static constexpr size_t max_batch_size = 6 * 16384;
+
+    [[nodiscard]] BatchState get_state(gl::Primitive primitive,
+                                       float size = 0) const
+    {
+        return {target,     offset,     view_size, target_size,
+                vpscale,    blend_source, blend_dest, primitive,
+                size,       clip_transform()};
+    }
+    static void apply_state(BatchState const& state);
+
+    // Add vertices to the batch, drawing the batch first if it was
+    // collected with a different state
+    void add_to_batch(gl::Primitive primitive, std::span<float const> xy,
+                      gl::Color const& color, float size = 0);
+    void add_triangle_fan(std::span<float const> xy);
+    void add_line_strip(std::span<float const> xy, bool closed);
+
     std::shared_ptr<gl::Program> textured;
     std::shared_ptr<gl::Program> filled;
 
@@ -80,9 +143,11 @@ private:
     void draw_indexed(CO const& container, std::vector<T> indices,
                       gl::Primitive primitive);
 
-    template <typename F, typename I>
-    void draw_indexed(F const* coords, size_t c_count, I const* indices,
-                      size_t i_count, gl::Primitive primitive);
+
+    // Scale from pixels to clip space
+    [[nodiscard]] Vec2<float> screen_scale() const;
+    // Scale from pixels to pixels on the display
+    [[nodiscard]] double pixel_scale() const;
 
     std::vector<float> generate_circle(Vec2f center, float radius,
                                        bool include_center = true) const;
@@ -91,18 +156,17 @@ private:
                                       int count) const;
     std::vector<float> generate_line(Vec2f p0, float r0, Vec2f p1,
                                      float r1) const;
-    std::array<float, 8> generate_quad(Vec2f top_left, Vec2f size) const;
     std::array<float, 8> rotated_quad(Vec2f center, Vec2f sz, float rot) const;
     std::array<float, 16> rotated_quad_with_uvs(Vec2f center, Vec2f sz,
                                                 float rot) const;
 
-    void draw_points();
-
 public:
+    std::array<float, 8> generate_quad(Vec2f top_left, Vec2f size) const;
     std::array<float, 16> generate_quad_with_uvs(Vec2f pos, Vec2f size) const;
 
     template <typename CO>
-    void draw_textured(CO const& container, gl::Primitive primitive);
+    void draw_textured(std::shared_ptr<gl::Texture> const& texture,
+                       CO const& container, gl::Primitive primitive);
 
     constexpr Vec2<float> to_screen(Vec2f const& v) const
     {
@@ -118,6 +182,7 @@ public:
     }
 
     Context(Context const& other);
+    ~Context();
     Context(float w, float h, GLuint fb = 0);
     Context(Vec2f _offset, Vec2f _view_size, Vec2f _target_size, GLuint fb = 0);
 
@@ -142,6 +207,34 @@ public:
 
     void set_target() const;
 
+    // Number of segments needed for a smooth circle with the given on screen
+    // radius. Rounded to a multiple of 4, so that circles of similar size
+    // share vertex rings, and so that a quarter of a ring is a whole number
+    // of segments.
+    static int circle_segments(double radius);
+
+    // The transform that applies `b` first and then `a`
+    static Transform multiply(Transform const& a, Transform const& b);
+    // Save the current transform, and combine it with `m`, so that `m` is
+    // applied first
+    void push_transform(Transform const& m);
+    // Go back to the transform before the last push. Returns false if
+    // there was nothing to pop.
+    bool pop_transform();
+    // The transform as a matrix for the vertex shader, for vertices that
+    // are already in clip space
+    [[nodiscard]] std::array<float, 16> clip_transform() const;
+    // Map between pixel coordinates and clip space
+    [[nodiscard]] Transform to_clip() const;
+    [[nodiscard]] Transform from_clip() const;
+
+    [[nodiscard]] bool is_recording() const { return recording != nullptr; }
+    [[nodiscard]] DisplayList* get_recording() const { return recording; }
+    // Throw if recording, for operations that can not be recorded
+    void check_not_recording(char const* what) const;
+    // Draw the commands in `list`, moved by `offset`
+    void replay(DisplayList& list, Vec2f offset = {0, 0});
+
     void resize(Vec2f size, float scale)
     {
         view_size = size;
@@ -149,9 +242,28 @@ public:
         vpscale = scale;
     }
     void set_pixel(int x, int y, uint32_t col);
-    void flood_fill(int x, int y, uint32_t col);
+    // Fill the area around `x`,`y` whose colors differ at most `tolerance`
+    // per channel from the start pixel. If `mask` is given, the area is
+    // filled in the mask instead. Returns the bounding box of the area.
+    Rect flood_fill(int x, int y, uint32_t col, int tolerance = 0,
+                    ImageView* mask = nullptr);
 
     void flush_pixels();
+    // Flush the pixel cache of every canvas
+    static void flush_all_pixels();
+
+    // Draw all batched geometry
+    static void flush_batch();
+    // Drop the batch and its GL buffer. Must be called while the GL context
+    // still exists.
+    static void release_batch();
+    // Draw all batched geometry if it is drawn to our target
+    void flush_target_batch() const;
+
+    // Draw the part of the pixel cache inside `area` to the target
+    void flush_pixels(Rect const& area);
+    // Drop the pixel cache, unless it has writes that are not flushed
+    void release_pixels();
 
     void set_color(gl::Color const& col);
     void set_blend_mode(uint32_t mode);
@@ -169,6 +281,16 @@ public:
               Vec2f size = {0, 0});
     void draw(pix::ImageView const& tex, Vec2f center, Vec2f size, float rot);
 
+    // Draw one image at each center, using one draw call for every run of
+    // images sharing the same texture. `images` holds one image per center
+    // or one image for all of them. `sizes` (x,y pairs), `rotations` and
+    // `colors` hold one value per center, one value for all or nothing.
+    void draw_many(std::span<pix::ImageView* const> images,
+                   std::span<float const> centers,
+                   std::span<float const> sizes,
+                   std::span<float const> rotations,
+                   std::span<uint32_t const> colors);
+
     void plot(Vec2f point, gl::Color col);
     void flush();
 
@@ -176,6 +298,8 @@ public:
     void draw_polygon(const Vec2f* points, size_t count);
     void draw_inconvex_polygon(const Vec2f* points, size_t count);
     void draw_complex_polygon(std::vector<std::vector<Vec2f>> const& points);
+    // Draw `mesh` scaled, rotated around its origin and moved to `pos`
+    void draw(Mesh& mesh, Vec2f pos, Vec2f scale, float rot, gl::Color color);
     pix::ImageView to_image() const;
 };
 
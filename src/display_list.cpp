@@ -0,0 +1,168 @@
+#include "display_list.hpp"
+
+#include <stdexcept>
+#include <utility>
+
+namespace pix {
+
+bool DisplayList::Command::same_state(Command const& other) const
+{
+    return kind == other.kind && primitive == other.primitive &&
+           size == other.size && blend_source == other.blend_source &&
+           blend_dest == other.blend_dest && culling == other.culling &&
+           to_pixels == other.to_pixels &&
+           color.to_rgba() == other.color.to_rgba() &&
+           texture == other.texture;
+}
+
+DisplayList::DisplayList(Context const& source) : Context(source)
+{
+    recording = this;
+}
+
+void DisplayList::add(Command&& cmd)
+{
+    if (finished) {
+        throw std::runtime_error("Can not draw into a finished display list");
+    }
+    if (std::this_thread::get_id() != thread) {
+        throw std::runtime_error(
+            "Display lists must be recorded on the thread that created them");
+    }
+    if (cmd.vertices.empty()) { return; }
+    if (commands.empty() || !commands.back().same_state(cmd)) {
+        commands.push_back(std::move(cmd));
+        return;
+    }
+    auto& last = commands.back();
+    // Upload again on the next replay
+    last.vbo = nullptr;
+    last.ibo = nullptr;
+    if (cmd.kind == Kind::Filled) {
+        // Indices are 16 bit, so only merge while they fit
+        auto const first = last.vertices.size() / 2;
+        if (first + cmd.vertices.size() / 2 > max_vertices) {
+            commands.push_back(std::move(cmd));
+            return;
+        }
+        for (auto i : cmd.indices) {
+            last.indices.push_back(static_cast<uint16_t>(first + i));
+        }
+    }
+    last.vertices.insert(last.vertices.end(), cmd.vertices.begin(),
+                         cmd.vertices.end());
+}
+
+DisplayList::Command DisplayList::make_command(Kind kind,
+                                               gl::Primitive primitive) const
+{
+    return {kind,
+            primitive,
+            0,
+            blend_source,
+            blend_dest,
+            false,
+            multiply(transform, from_clip()),
+            fg,
+            nullptr,
+            {},
+            {},
+            nullptr,
+            nullptr};
+}
+
+void DisplayList::add_colored(gl::Primitive primitive, float size,
+                              std::span<float const> xy,
+                              gl::Color const& color)
+{
+    auto cmd = make_command(Kind::Colored, primitive);
+    cmd.size = size;
+    // Colors are per vertex
+    cmd.color = gl::Color{0U};
+    cmd.vertices.reserve(xy.size() * 3);
+    for (size_t i = 0; i + 1 < xy.size(); i += 2) {
+        cmd.vertices.insert(cmd.vertices.end(),
+                            {xy[i], xy[i + 1], color.red, color.green,
+                             color.blue, color.alpha});
+    }
+    add(std::move(cmd));
+}
+
+void DisplayList::add_filled(gl::Primitive primitive,
+                             std::span<float const> xy,
+                             std::span<uint16_t const> indices, bool culling)
+{
+    auto cmd = make_command(Kind::Filled, gl::Primitive::Triangles);
+    cmd.culling = culling;
+    cmd.vertices.assign(xy.begin(), xy.end());
+    if (!indices.empty()) {
+        cmd.indices.assign(indices.begin(), indices.end());
+    } else if (primitive == gl::Primitive::TriangleFan) {
+        for (size_t i = 1; i + 1 < xy.size() / 2; i++) {
+            cmd.indices.insert(cmd.indices.end(),
+                               {0, static_cast<uint16_t>(i),
+                                static_cast<uint16_t>(i + 1)});
+        }
+    } else {
+        for (size_t i = 0; i < xy.size() / 2; i++) {
+            cmd.indices.push_back(static_cast<uint16_t>(i));
+        }
+    }
+    add(std::move(cmd));
+}
+
+void DisplayList::add_textured(std::shared_ptr<gl::Texture> const& texture,
+                               gl::Primitive primitive,
+                               std::span<float const> data)
+{
+    auto cmd = make_command(Kind::Textured, gl::Primitive::Triangles);
+    cmd.texture = texture;
+    auto const n = data.size() / 4;
+    auto const* xy = data.data();
+    auto const* uv = data.data() + n * 2;
+    auto add_vertex = [&](size_t i) {
+        cmd.vertices.insert(cmd.vertices.end(), {xy[i * 2], xy[i * 2 + 1],
+                                                 uv[i * 2], uv[i * 2 + 1]});
+    };
+    if (primitive == gl::Primitive::TriangleFan) {
+        for (size_t i = 1; i + 1 < n; i++) {
+            add_vertex(0);
+            add_vertex(i);
+            add_vertex(i + 1);
+        }
+    } else {
+        for (size_t i = 0; i < n; i++) {
+            add_vertex(i);
+        }
+    }
+    add(std::move(cmd));
+}
+
+void DisplayList::add_clear(gl::Color const& color)
+{
+    auto cmd = make_command(Kind::Filled, gl::Primitive::Triangles);
+    cmd.blend_source = GL_ONE;
+    cmd.blend_dest = GL_ZERO;
+    cmd.to_pixels = from_clip();
+    cmd.color = color;
+    auto const quad = generate_quad({0, 0}, view_size / target_scale);
+    cmd.vertices.assign(quad.begin(), quad.end());
+    cmd.indices = {0, 1, 2, 0, 2, 3};
+    add(std::move(cmd));
+}
+
+void DisplayList::add_list(DisplayList const& other, Transform const& m)
+{
+    if (&other == this) {
+        throw std::runtime_error("Can not replay a display list into itself");
+    }
+    for (auto cmd : other.commands) {
+        cmd.to_pixels = multiply(m, cmd.to_pixels);
+        cmd.vbo = nullptr;
+        cmd.ibo = nullptr;
+        add(std::move(cmd));
+    }
+    held.insert(held.end(), other.held.begin(), other.held.end());
+}
+
+} // namespace pix
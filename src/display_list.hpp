@@ -0,0 +1,110 @@
+#pragma once
+
+#include "gl/buffer.hpp"
+#include "gl/color.hpp"
+#include "gl/texture.hpp"
+
+#include "context.hpp"
+
+#include <cstdint>
+#include <memory>
+#include <span>
+#include <thread>
+#include <vector>
+
+namespace pix {
+
+// A canvas that records what is drawn into it as a list of commands, with
+// all geometry already generated. The list can then be drawn any number of
+// times using `Context::replay()`. Recording can still touch the GPU (when
+// flushing batches, uploading glyphs or freeing textures), so it must be
+// done on the thread that owns the GL context, which is the thread that
+// created the list.
+class DisplayList : public Context
+{
+public:
+    enum class Kind
+    {
+        // Lines, points or triangles with x,y,r,g,b,a per vertex
+        Colored,
+        // Triangles with x,y per vertex, drawn in one color
+        Filled,
+        // Triangles with x,y,u,v per vertex
+        Textured,
+    };
+
+    struct Command
+    {
+        Kind kind;
+        gl::Primitive primitive;
+        // Line width or point size
+        float size;
+        unsigned blend_source;
+        unsigned blend_dest;
+        bool culling;
+        // Maps the vertices to pixels on the recording canvas
+        Transform to_pixels;
+        gl::Color color;
+        std::shared_ptr<gl::Texture> texture;
+
+        std::vector<float> vertices;
+        std::vector<uint16_t> indices;
+
+        // Created on the first replay
+        std::shared_ptr<gl::ArrayBuffer<>> vbo;
+        std::shared_ptr<gl::ElementBuffer<>> ibo;
+
+        // True if the commands can be drawn as one
+        [[nodiscard]] bool same_state(Command const& other) const;
+    };
+
+    // Max number of vertices in a filled command, since indices are 16 bit
+    static constexpr size_t max_vertices = 0x10000;
+
+private:
+    std::vector<Command> commands;
+    bool finished = false;
+    std::thread::id thread = std::this_thread::get_id();
+    // Things the recorded commands depend on, released with the list
+    std::vector<std::shared_ptr<void>> held;
+
+    // A command using the current state of the canvas
+    [[nodiscard]] Command make_command(Kind kind,
+                                       gl::Primitive primitive) const;
+
+    // Add the command, or merge it into the last command if they have the
+    // same state
+    void add(Command&& cmd);
+
+public:
+    // Start recording, with the same settings as `source`
+    explicit DisplayList(Context const& source);
+
+    [[nodiscard]] std::vector<Command>& get_commands() { return commands; }
+    [[nodiscard]] bool is_finished() const { return finished; }
+    // Stop recording. Drawing after this is an error.
+    void finish() { finished = true; }
+    // Keep `resource` until the list is destroyed. Used to keep glyphs that
+    // are drawn by the commands from being evicted.
+    void hold(std::shared_ptr<void> resource)
+    {
+        held.push_back(std::move(resource));
+    }
+
+    void add_colored(gl::Primitive primitive, float size,
+                     std::span<float const> xy, gl::Color const& color);
+    // `xy` is drawn as `primitive`, either `Triangles` or `TriangleFan`
+    void add_filled(gl::Primitive primitive, std::span<float const> xy,
+                    std::span<uint16_t const> indices, bool culling);
+    // `data` holds all x,y pairs followed by all u,v pairs, drawn as
+    // `primitive`, either `Triangles` or `TriangleFan`
+    void add_textured(std::shared_ptr<gl::Texture> const& texture,
+                      gl::Primitive primitive, std::span<float const> data);
+    // Fill the whole canvas with `color`, like `clear()`
+    void add_clear(gl::Color const& color);
+    // Add the commands from `other`, with `m` applied after their own
+    // transforms
+    void add_list(DisplayList const& other, Transform const& m);
+};
+
+} // namespace pix
@@ -0,0 +1,123 @@
+#pragma once
+
+#include "vec2.hpp"
+
+#include <algorithm>
+#include <cstdint>
+#include <cstdlib>
+#include <span>
+#include <vector>
+
+namespace pix {
+
+// Rectangle [x0, x1) x [y0, y1) in pixels
+struct Rect
+{
+    int x0;
+    int y0;
+    int x1;
+    int y1;
+
+    [[nodiscard]] bool empty() const { return x0 >= x1 || y0 >= y1; }
+    [[nodiscard]] Vec2i pos() const { return {x0, y0}; }
+    [[nodiscard]] Vec2i size() const { return {x1 - x0, y1 - y0}; }
+};
+
+// True if every 8-bit channel of `a` and `b` differ by at most `tolerance`
+inline bool colors_match(uint32_t a, uint32_t b, int tolerance)
+{
+    if (tolerance <= 0) { return a == b; }
+    for (int shift = 0; shift < 32; shift += 8) {
+        auto ca = static_cast<int>((a >> shift) & 0xff);
+        auto cb = static_cast<int>((b >> shift) & 0xff);
+        if (std::abs(ca - cb) > tolerance) { return false; }
+    }
+    return true;
+}
+
+// Scanline flood fill of a `width` * `height` grid of pixels, starting at
+// `x`,`y`. Pixels connected to the start pixel that match its color in
+// `source` are set to `color` in `target`, which can be the same buffer as
+// `source`, or a separate mask of the same size. Only runs of pixels are
+// kept on the stack, so memory use stays small even for large areas.
+// Returns the bounding box of the filled pixels.
+inline Rect scanline_fill(std::span<uint32_t const> source,
+                          std::span<uint32_t> target, int width, int height,
+                          int x, int y, uint32_t color, int tolerance = 0)
+{
+    Rect area{x, y, x, y};
+    if (x < 0 || y < 0 || x >= width || y >= height) { return area; }
+    auto index = [width](int px, int py) {
+        return static_cast<size_t>(py) * width + px;
+    };
+    auto target_color = source[index(x, y)];
+    bool in_place = source.data() == target.data();
+    if (in_place && tolerance <= 0 && target_color == color) { return area; }
+
+    // Only needed when filled pixels can still match the target color
+    std::vector<bool> filled;
+    if (!in_place || colors_match(color, target_color, tolerance)) {
+        filled.resize(static_cast<size_t>(width) * height);
+    }
+
+    auto inside = [&](int px, int py) {
+        if (px < 0 || px >= width || py < 0 || py >= height) { return false; }
+        auto i = index(px, py);
+        if (!filled.empty() && filled[i]) { return false; }
+        return colors_match(source[i], target_color, tolerance);
+    };
+    auto set = [&](int px, int py) {
+        auto i = index(px, py);
+        target[i] = color;
+        if (!filled.empty()) { filled[i] = true; }
+    };
+
+    area = {x, y, x + 1, y + 1};
+    // A run of pixels [x0, x1] on row y to scan, and the row it came from
+    // is y - dy
+    struct Span
+    {
+        int x0;
+        int x1;
+        int y;
+        int dy;
+    };
+    std::vector<Span> stack{{x, x, y, 1}, {x, x, y - 1, -1}};
+
+    while (!stack.empty()) {
+        auto [x0, x1, sy, dy] = stack.back();
+        stack.pop_back();
+        if (sy < 0 || sy >= height) { continue; }
+        auto sx = x0;
+        if (inside(sx, sy)) {
+            // Extend the run to the left
+            while (inside(sx - 1, sy)) {
+                set(sx - 1, sy);
+                sx--;
+            }
+            if (sx < x0) { stack.push_back({sx, x0 - 1, sy - dy, -dy}); }
+        }
+        while (x0 <= x1) {
+            while (inside(x0, sy)) {
+                set(x0, sy);
+                x0++;
+            }
+            if (x0 > sx) {
+                area.x0 = std::min(area.x0, sx);
+                area.x1 = std::max(area.x1, x0);
+                area.y0 = std::min(area.y0, sy);
+                area.y1 = std::max(area.y1, sy + 1);
+                stack.push_back({sx, x0 - 1, sy + dy, dy});
+            }
+            if (x0 - 1 > x1) { stack.push_back({x1 + 1, x0 - 1, sy - dy, -dy}); }
+            x0++;
+            while (x0 < x1 && !inside(x0, sy)) {
+                x0++;
+            }
+            sx = x0;
+        }
+    }
+    return area;
+}
+
+} // namespace pix
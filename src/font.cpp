@@ -3,6 +3,9 @@
 #include "unscii-16.h"
 #include "utf8.h"
 
+#include <fstream>
+#include <iterator>
+
 std::shared_ptr<FreetypeFont> FreetypeFont::unscii{
     std::make_shared<FreetypeFont>(data_unscii_16_ttf, data_unscii_16_ttf_len,
                                    16)};
@@ -10,6 +13,49 @@ std::shared_ptr<FreetypeFont> FreetypeFont::unscii{
 void FreetypeFont::set_pixel_size(int h)
 {
     FT_Set_Pixel_Sizes(face, 0, h);
+    pixel_size = h;
+}
+
+FreetypeFont::Glyph const& FreetypeFont::get_glyph(char32_t c)
+{
+    auto& glyphs = metrics[pixel_size].glyphs;
+    auto it = glyphs.find(c);
+    if (it != glyphs.end()) { return it->second; }
+    Glyph glyph{FT_Get_Char_Index(face, c), 0};
+    if (FT_Load_Glyph(face, glyph.index, FT_LOAD_DEFAULT) == 0) {
+        glyph.advance = static_cast<int>(face->glyph->advance.x >> 6);
+    }
+    return glyphs.emplace(c, glyph).first->second;
+}
+
+int FreetypeFont::get_kerning(FT_UInt left, FT_UInt right)
+{
+    if (!FT_HAS_KERNING(face) || left == 0 || right == 0) { return 0; }
+    auto& kerning = metrics[pixel_size].kerning;
+    auto key = (static_cast<uint64_t>(left) << 32) | right;
+    auto it = kerning.find(key);
+    if (it != kerning.end()) { return it->second; }
+    FT_Vector delta{};
+    FT_Get_Kerning(face, left, right, FT_KERNING_DEFAULT, &delta);
+    auto k = static_cast<int>(delta.x >> 6);
+    kerning[key] = k;
+    return k;
+}
+
+std::vector<int> FreetypeFont::prefix_widths(std::u32string_view text32)
+{
+    std::vector<int> widths;
+    widths.reserve(text32.size() + 1);
+    widths.push_back(0);
+    int pen_x = 0;
+    FT_UInt prev = 0;
+    for (auto const c : text32) {
+        auto const& glyph = get_glyph(c);
+        pen_x += get_kerning(prev, glyph.index) + glyph.advance;
+        prev = glyph.index;
+        widths.push_back(pen_x);
+    }
+    return widths;
 }
 
 template <typename T>
@@ -45,10 +91,13 @@ std::pair<int, int> FreetypeFont::render_text(std::string_view txt, T* target,
 
     auto const text32 = utf8::utf8_decode(txt);
 
+    FT_UInt prev = 0;
     for (auto const c : text32) {
         auto const error = FT_Load_Char(face, c, FT_LOAD_RENDER);
         FT_GlyphSlot const slot = face->glyph;
         if (error) { continue; } /* ignore errors */
+        pen_x += get_kerning(prev, slot->glyph_index);
+        prev = slot->glyph_index;
         // fmt::print("{}x{} pixels to y={}\n", slot->bitmap.width,
         // slot->bitmap.rows, delta - face->glyph->bitmap_top);
         if (target) {
@@ -69,7 +118,9 @@ std::pair<int, int> FreetypeFont::get_mono_size() const
 
 std::pair<int, int> FreetypeFont::text_size(std::string_view txt)
 {
-    return render_text(txt, static_cast<uint8_t*>(nullptr), 0, 0, 0, 0);
+    auto const delta = face->size->metrics.ascender / 64;
+    auto const low = face->size->metrics.descender / 64;
+    return {prefix_widths(utf8::utf8_decode(txt)).back(), delta - low};
 }
 
 template <typename T> int FreetypeFont::render_char(char32_t c, T* target,
@@ -106,6 +157,7 @@ FreetypeFont::render_text(std::string_view txt, uint32_t* target,
 
 FreetypeFont::FreetypeFont(const unsigned char* data, size_t data_size,
                            int size)
+    : font_data{data}, font_data_size{data_size}
 {
     using namespace std::string_literals;
     FT_Init_FreeType(&library);
@@ -126,7 +178,29 @@ FreetypeFont::FreetypeFont(const unsigned char* data, size_t data_size,
     if (size >= 0) { set_pixel_size(size); }
 }
 
-FreetypeFont::FreetypeFont(const char* name, int size)
+FreetypeFont::FreetypeFont(std::vector<unsigned char>&& data, int size)
+    : owned_data{std::move(data)}
+{
+    font_data = owned_data.data();
+    font_data_size = owned_data.size();
+    if (library == nullptr) { FT_Init_FreeType(&library); }
+    auto rc = FT_New_Memory_Face(library, font_data,
+                                 static_cast<FT_Long>(font_data_size), 0,
+                                 &face);
+    if (rc != 0) { throw font_exception("Could not load font from memory"); }
+
+    if (size >= 0) { set_pixel_size(size); }
+}
+
+std::vector<unsigned char> FreetypeFont::read_file(const char* name)
+{
+    using namespace std::string_literals;
+    std::ifstream file{name, std::ios::binary};
+    if (!file) { throw font_exception("Could not load font:"s + name); }
+    return {std::istreambuf_iterator<char>{file}, {}};
+}
+
+FreetypeFont::FreetypeFont(const char* name, int size) : file_name{name}
 {
     using namespace std::string_literals;
     if (library == nullptr) { FT_Init_FreeType(&library); }
@@ -136,6 +210,26 @@ FreetypeFont::FreetypeFont(const char* name, int size)
     if (size >= 0) { set_pixel_size(size); }
 }
 
+uint64_t FreetypeFont::get_hash()
+{
+    if (hash != 0) { return hash; }
+    std::string contents;
+    if (font_data == nullptr) {
+        std::ifstream file{file_name, std::ios::binary};
+        contents.assign(std::istreambuf_iterator<char>{file}, {});
+    } else {
+        contents.assign(reinterpret_cast<const char*>(font_data),
+                        font_data_size);
+    }
+    // FNV-1a
+    hash = 0xcbf29ce484222325;
+    for (auto c : contents) {
+        hash ^= static_cast<uint8_t>(c);
+        hash *= 0x100000001b3;
+    }
+    return hash;
+}
+
 std::pair<int, int> FreetypeFont::get_size(char32_t c) const
 {
 
@@ -6,6 +6,8 @@
 #include <cstdint>
 #include <memory>
 #include <string>
+#include <unordered_map>
+#include <vector>
 
 #include FT_FREETYPE_H
 #include FT_SIZES_H
@@ -28,15 +30,53 @@ class FreetypeFont
     static inline FT_Library library = nullptr;
     FT_Face face = nullptr;
     bool mono = false;
+    // Where the font was loaded from, used by `get_hash()`
+    std::string file_name;
+    const unsigned char* font_data = nullptr;
+    size_t font_data_size = 0;
+    // Font data owned by this font, if it was loaded into memory
+    std::vector<unsigned char> owned_data;
+    uint64_t hash = 0;
+
+    int pixel_size = 0;
+    struct Glyph
+    {
+        FT_UInt index;
+        int advance;
+    };
+    // Glyph advances and kerning, cached per pixel size
+    struct Metrics
+    {
+        std::unordered_map<char32_t, Glyph> glyphs;
+        std::unordered_map<uint64_t, int> kerning;
+    };
+    std::unordered_map<int, Metrics> metrics;
+
+    Glyph const& get_glyph(char32_t c);
+    int get_kerning(FT_UInt left, FT_UInt right);
     //std::pair<int, int> size;
 
+    static inline uint32_t next_id = 0;
+
 public:
     static std::shared_ptr<FreetypeFont> unscii;
 
+    // Unique for every font, for use in cache keys
+    uint32_t const id = next_id++;
+
     FreetypeFont(const char* name, int size = 0);
     FreetypeFont(FreetypeFont const&&) = delete;
     FreetypeFont& operator=(FreetypeFont const&) = delete;
     FreetypeFont(const unsigned char* data, size_t data_size, int size = 0);
+    // Create a font from the contents of a font file
+    explicit FreetypeFont(std::vector<unsigned char>&& data, int size = 0);
+
+    // Read a font file, without creating the font. Can be called from any
+    // thread.
+    static std::vector<unsigned char> read_file(const char* name);
+
+    // Hash of the font file contents, for identifying the font in caches
+    uint64_t get_hash();
 
     std::pair<int, int> get_mono_size() const;
     //std::pair<int, int> get_size() const { return size; }
@@ -51,6 +91,9 @@ public:
                                     uint32_t color, int stride, int width,
                                     int height);
     std::pair<int, int> text_size(std::string_view txt);
+    // Get the width of every prefix of `text32`, so that element `i` is the
+    // width of the first `i` characters. Measured without rendering.
+    std::vector<int> prefix_widths(std::u32string_view text32);
     template <typename T>
     int render_char(char32_t c, T* target, uint32_t color, int stride,
                     int width, int height);
@@ -188,6 +188,7 @@ void FullConsole::set_cursor_color(uint32_t col)
 
 void FullConsole::render2(pix::Context* context, Vec2f xy, Vec2f sz)
 {
+    context->check_not_recording("Drawing a console");
     if (reading_line) { refresh(); }
 
     if (sz.x <= 0) {
@@ -197,6 +198,7 @@ void FullConsole::render2(pix::Context* context, Vec2f xy, Vec2f sz)
     context->set_target();
     auto const xy0 = context->to_screen(xy);
     auto const xy1 = context->to_screen(xy + sz);
+    console->set_transform(context->clip_transform());
     console->render(xy0, xy1);
     if (cursor_on) {
         auto cw = sz.x / cols;
@@ -207,7 +209,7 @@ void FullConsole::render2(pix::Context* context, Vec2f xy, Vec2f sz)
         context->filled_rect(xy, {cw, ch});
         auto const c =
             console->get_char(cursor.x + xpos - scroll_pos, cursor.y);
-        auto const tex = console->get_texture_for_char(c);
+        auto const tex = console->get_tile_image(c);
         gl::ProgramCache::get_instance()
             .get_program<gl::ProgramCache::Textured>()
             ->use();
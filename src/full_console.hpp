@@ -54,10 +54,20 @@ public:
     Vec2i get_pixel_size() const;
 
     std::vector<uint32_t> get_tiles() { return console->get_tiles(); }
-    void set_tiles(std::vector<uint32_t> const& data)
+    void set_tiles(std::span<const uint32_t> data)
     {
         console->set_tiles(data);
     }
+    uint32_t* get_cells() { return console->get_cells(); }
+    void mark_dirty() { console->mark_dirty(); }
+    // Views of the cells keep their rows in order while they are alive
+    void add_cell_view() { console->cell_views++; }
+    void release_cell_view() { console->cell_views--; }
+    [[nodiscard]] bool has_cell_views() const
+    {
+        return console->cell_views > 0;
+    }
+    size_t get_bytes_uploaded() const { return console->bytes_uploaded; }
 
     void read_line();
 
@@ -79,6 +89,16 @@ public:
     {
         console->put(pos.x, pos.y, fg_.value_or(fg), bg_.value_or(bg), c);
     }
+    void put_row(int x, int y, std::span<const uint32_t> tiles,
+                 std::span<const uint32_t> fg_, std::span<const uint32_t> bg_)
+    {
+        console->put_row(x, y, tiles, fg_, bg_);
+    }
+    void set_region(int x, int y, int w, int h,
+                    std::span<const uint32_t> data)
+    {
+        console->set_region(x, y, w, h, data);
+    }
     void text(Vec2i pos, std::string const& txt)
     {
         console->text(pos.x, pos.y, txt, fg, bg);
@@ -111,6 +131,8 @@ public:
 
     void clear() { console->fill(fg, bg); }
 
+    void scroll(int dy, int dx) { console->scroll(dy, dx); }
+
     pix::ImageView get_texture_for_char(int32_t c)
     {
         return console->get_texture_for_char(c);
@@ -153,8 +153,12 @@ template <typename T> inline T get(GLenum what)
     }
 }
 
+// Number of draw calls made, reset by the owner of the frame
+inline int draw_calls = 0;
+
 inline void drawArrays(Primitive p, GLint offset, int count)
 {
+    draw_calls++;
     glDrawArrays(to_glenum(p), offset, count);
     gl_check("glDrawArrays");
 }
@@ -166,6 +170,7 @@ template <typename T> void* to_ptr(T t)
 
 inline void drawElements(Primitive p, int count, Type t, uintptr_t offset)
 {
+    draw_calls++;
     glDrawElements(to_glenum(p), count, to_glenum(t), to_ptr(offset));
     gl_check("glDrawElements");
 }
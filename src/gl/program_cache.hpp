@@ -35,7 +35,7 @@ struct ProgramCache
             gl_Position = vec4(in_pos.x, in_pos.y, 0, 1);
 #else
             vec4 v = in_transform * vec4(in_pos, 0, 1);
-            gl_Position = vec4( v.x, v.y, 0, 1 );
+            gl_Position = vec4( v.x, v.y, 0, v.w );
 #endif
             #ifdef TEXTURED
               out_uv = in_uv;
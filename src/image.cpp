@@ -69,7 +69,11 @@ pix::ImageView load_png(fs::path const& file_name)
 {
     auto image = pix::load_png_image(file_name);
     image.flip();
+    return upload_image(image);
+}
 
+pix::ImageView upload_image(Image const& image)
+{
     auto tex = std::make_shared<gl::Texture>(
         image.width, image.height, image.ptr, GL_RGBA, image.format);
     return pix::ImageView{gl::TexRef{tex}};
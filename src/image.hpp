@@ -57,6 +57,10 @@ struct Image
 };
 
 pix::ImageView load_png(std::filesystem::path const& name);
+// Decode a png file into RGBA pixels, top row first, without using the GPU
+Image load_png_image(std::filesystem::path const& name);
+// Create a texture from `image`, which must be stored bottom row first
+pix::ImageView upload_image(Image const& image);
 Image load_jpg(std::filesystem::path const& name);
 void save_png(Image const& image, std::string_view name);
 
@@ -18,13 +18,19 @@ public:
     explicit ImageView(gl::TexRef const& tr) : Context{tr}, tex{tr} {}
     ImageView(int w, int h) : ImageView{gl::TexRef(w, h)} {}
     ImageView() : ImageView{gl::TexRef()} {}
+    // Geometry batched for this image must be drawn while it still exists
+    ~ImageView() { flush_target_batch(); }
 
     void bind() const { tex.bind(); }
 
     const auto& uvs() const { return tex.uvs(); }
 
     void set_texture_filter(bool min, bool max) { tex.set_texture_filter(min, max); }
-    void copy_from(ImageView const& src) const { tex.copy_from(src.tex); }
+    void copy_from(ImageView const& src) const
+    {
+        flush_batch();
+        tex.copy_from(src.tex);
+    }
     void copy_to(ImageView const& target) const { target.copy_from(*this); }
     double width() const { return tex.width(); }
     double height() const { return tex.height(); }
@@ -0,0 +1,110 @@
+#include "loader.hpp"
+
+#include <algorithm>
+
+namespace pix {
+
+Loader::~Loader()
+{
+    stop_threads();
+}
+
+void Loader::stop_threads()
+{
+    {
+        std::scoped_lock lock{mutex};
+        quit = true;
+    }
+    job_added.notify_all();
+    for (auto& thread : threads) {
+        thread.join();
+    }
+    threads.clear();
+    quit = false;
+}
+
+void Loader::run()
+{
+    std::unique_lock lock{mutex};
+    while (true) {
+        job_added.wait(lock, [this] { return quit || !jobs.empty(); });
+        if (quit) { return; }
+        auto job = std::move(jobs.front());
+        jobs.pop_front();
+        running++;
+        lock.unlock();
+        auto finish = job();
+        // Drop the job here, since what it holds is kept alive by `finish`
+        // and must only be released on the main thread
+        job = nullptr;
+        lock.lock();
+        finished.push_back(std::move(finish));
+        running--;
+        job_done.notify_all();
+    }
+}
+
+void Loader::add(Job job)
+{
+    {
+        std::scoped_lock lock{mutex};
+        if (threads.empty()) {
+            auto const count =
+                std::clamp(std::thread::hardware_concurrency(), 2U, 5U) - 1;
+            for (unsigned i = 0; i < count; i++) {
+                threads.emplace_back([this] { run(); });
+            }
+        }
+        jobs.push_back(std::move(job));
+    }
+    job_added.notify_one();
+}
+
+void Loader::poll()
+{
+    std::vector<Finish> done;
+    {
+        std::scoped_lock lock{mutex};
+        if (finished.empty()) { return; }
+        std::swap(done, finished);
+    }
+    for (auto& finish : done) {
+        finish();
+    }
+}
+
+bool Loader::wait()
+{
+    {
+        std::unique_lock lock{mutex};
+        job_done.wait(lock, [this] {
+            return !finished.empty() || (jobs.empty() && running == 0);
+        });
+        if (finished.empty()) { return false; }
+    }
+    poll();
+    return true;
+}
+
+void Loader::clear()
+{
+    // Jobs that are running finish first, so the threads must be stopped
+    // before `finished` can be emptied
+    stop_threads();
+    std::deque<Job> dropped_jobs;
+    std::vector<Finish> dropped;
+    {
+        std::scoped_lock lock{mutex};
+        std::swap(dropped_jobs, jobs);
+        std::swap(dropped, finished);
+    }
+    job_done.notify_all();
+}
+
+Loader& Loader::get_instance()
+{
+    static Loader loader;
+    return loader;
+}
+
+} // namespace pix
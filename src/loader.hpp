@@ -0,0 +1,126 @@
+#pragma once
+
+#include <atomic>
+#include <condition_variable>
+#include <deque>
+#include <exception>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <stdexcept>
+#include <thread>
+#include <utility>
+#include <vector>
+
+namespace pix {
+
+// Runs jobs on a pool of background threads. A job does the slow part of
+// loading something, like decoding a file, and returns a function that
+// finishes it on the main thread, like creating a texture. Those are
+// called by `poll()`.
+class Loader
+{
+public:
+    using Finish = std::function<void()>;
+    using Job = std::function<Finish()>;
+
+private:
+    std::mutex mutex;
+    std::condition_variable job_added;
+    std::condition_variable job_done;
+    std::deque<Job> jobs;
+    std::vector<Finish> finished;
+    std::vector<std::thread> threads;
+    size_t running = 0;
+    bool quit = false;
+
+    void run();
+    void stop_threads();
+
+public:
+    Loader() = default;
+    Loader(Loader const&) = delete;
+    Loader& operator=(Loader const&) = delete;
+    ~Loader();
+
+    // Add a job. Threads are started on first use.
+    void add(Job job);
+    // Call the finish functions of all jobs that are done. Main thread only.
+    void poll();
+    // Wait until at least one more job is done, then `poll()`. Returns
+    // false if there is nothing left to wait for.
+    bool wait();
+    // Stop the threads and drop all jobs, including the finish functions
+    // of jobs that are done. Their results are never set. Main thread only.
+    void clear();
+
+    static Loader& get_instance();
+};
+
+// The result of loading something in the background. It becomes done on
+// the main thread, when its job has been finished by `Loader::poll()`.
+template <typename T>
+class Pending
+{
+    std::optional<T> value;
+    std::exception_ptr error;
+    // Can be read from any thread, and makes the value visible when set
+    std::atomic<bool> done = false;
+
+public:
+    [[nodiscard]] bool is_done() const
+    {
+        return done.load(std::memory_order_acquire);
+    }
+
+    void set(T&& v)
+    {
+        value.emplace(std::move(v));
+        done.store(true, std::memory_order_release);
+    }
+    void fail(std::exception_ptr e)
+    {
+        error = std::move(e);
+        done.store(true, std::memory_order_release);
+    }
+
+    // Wait until done, then return the value or throw the load error.
+    // Main thread only.
+    T get()
+    {
+        while (!is_done() && Loader::get_instance().wait()) {}
+        if (!is_done()) { throw std::runtime_error("Loading was cancelled"); }
+        if (error) { std::rethrow_exception(error); }
+        return *value;
+    }
+};
+
+// Run `decode` in the background, and then `finish` with its result on the
+// main thread. Neither may touch Python objects. Returns the pending result
+// of `finish`.
+template <typename T, typename Decode, typename Finish>
+std::shared_ptr<Pending<T>> load_async(Decode decode, Finish finish)
+{
+    auto pending = std::make_shared<Pending<T>>();
+    Loader::get_instance().add([pending, decode, finish]() -> Loader::Finish {
+        try {
+            // Shared, since std::function must be copyable
+            auto data = std::make_shared<decltype(decode())>(decode());
+            return [pending, data, finish] {
+                try {
+                    pending->set(finish(std::move(*data)));
+                } catch (...) {
+                    pending->fail(std::current_exception());
+                }
+            };
+        } catch (...) {
+            return [pending, error = std::current_exception()] {
+                pending->fail(error);
+            };
+        }
+    });
+    return pending;
+}
+
+} // namespace pix
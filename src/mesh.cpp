@@ -0,0 +1,163 @@
+#include "mesh.hpp"
+
+#include <tesselator.h>
+
+namespace pix {
+
+namespace {
+
+double cross(Vec2f a, Vec2f b)
+{
+    return a.x * b.y - b.x * a.y;
+}
+
+bool same_side(Vec2f const& p1, Vec2f const& p2, Vec2f const& a, Vec2f const& b)
+{
+    Vec2f ab = {b.x - a.x, b.y - a.y};
+    Vec2f ap1 = {p1.x - a.x, p1.y - a.y};
+    Vec2f ap2 = {p2.x - a.x, p2.y - a.y};
+    auto cp1 = cross(ab, ap1);
+    auto cp2 = cross(ab, ap2);
+    return (cp1 * cp2 >= 0);
+}
+
+bool in_triangle(Vec2f const& p, Vec2f const& a, Vec2f const& b, Vec2f const& c)
+{
+    return same_side(p, a, b, c) && same_side(p, b, a, c) &&
+           same_side(p, c, a, b);
+}
+
+bool is_convex(Vec2f a, Vec2f b, Vec2f c)
+{
+    // Check if the triangle a-b-c is convex.
+    // Assuming a clockwise order of points, if the cross product
+    // of vectors (b - a) and (c - b) is positive, it is convex.
+    Vec2f ab = {b.x - a.x, b.y - a.y};
+    Vec2f bc = {c.x - b.x, c.y - b.y};
+    return cross(ab, bc) > 0;
+}
+
+bool is_ear(Vec2f a, Vec2f b, Vec2f c, std::span<Vec2f const> vertices)
+{
+    if (!is_convex(a, b, c)) {
+        return false; // The triangle is not convex
+    }
+
+    for (auto const& p : vertices) {
+        if (p != a && p != b && p != c && in_triangle(p, a, b, c)) {
+            return false; // Found a point inside the triangle
+        }
+    }
+
+    return true; // No points inside the triangle and it is convex
+}
+
+} // namespace
+
+std::vector<uint16_t> ear_clip(std::span<Vec2f const> points)
+{
+    std::vector<uint16_t> triangles;
+    auto const count = points.size();
+    if (count < 3) { return triangles; }
+
+    double sum = 0;
+    for (size_t i = 0; i < count; i++) {
+        auto&& q = points[i];
+        auto&& p = points[(i + 1) % count];
+        sum += (p.x - q.x) * (p.y + q.y);
+    }
+    // Clip counter clockwise polygons by walking the points backwards
+    std::vector<uint16_t> indexes(count);
+    for (size_t i = 0; i < count; i++) {
+        indexes[i] = static_cast<uint16_t>(sum > 0 ? count - 1 - i : i);
+    }
+    triangles.reserve((count - 2) * 3);
+
+    while (indexes.size() > 3) {
+        auto const n = indexes.size();
+        bool ok = false;
+        for (size_t j = 0; j < n; ++j) {
+            auto i0 = indexes[j];
+            auto i1 = indexes[(j + 1) % n];
+            auto i2 = indexes[(j + 2) % n];
+
+            if (is_ear(points[i0], points[i1], points[i2], points)) {
+                triangles.insert(triangles.end(), {i0, i1, i2});
+                // Remove the vertex 'b' from the list
+                indexes.erase(indexes.begin() +
+                              static_cast<std::ptrdiff_t>((j + 1) % n));
+                ok = true;
+                break;
+            }
+        }
+        if (!ok) {
+            // Broken polygon, cut off the first corner and go on
+            triangles.insert(triangles.end(),
+                             {indexes[0], indexes[1], indexes[2]});
+            indexes.erase(indexes.begin());
+        }
+    }
+    triangles.insert(triangles.end(), {indexes[0], indexes[1], indexes[2]});
+    return triangles;
+}
+
+void tesselate(std::vector<std::vector<Vec2f>> const& contours,
+               std::vector<float>& vertices, std::vector<uint16_t>& indices)
+{
+    auto* tess = tessNewTess(nullptr);
+    for (auto const& vec : contours) {
+        tessAddContour(tess, 2, vec.data(), sizeof(Vec2f),
+                       static_cast<int>(vec.size()));
+    }
+
+    if (tessTesselate(tess, TessWindingRule::TESS_WINDING_ODD,
+                      TessElementType::TESS_POLYGONS, 3, 2, nullptr) != 0) {
+        auto const* verts = tessGetVertices(tess);
+        auto const* elems = tessGetElements(tess);
+        auto const vc = tessGetVertexCount(tess);
+        auto const ec = tessGetElementCount(tess) * 3;
+        auto const first = static_cast<int>(vertices.size() / 2);
+        for (int i = 0; i < vc * 2; i++) {
+            vertices.push_back(static_cast<float>(verts[i]));
+        }
+        for (int i = 0; i < ec; i++) {
+            if (elems[i] == TESS_UNDEF) { continue; }
+            indices.push_back(static_cast<uint16_t>(first + elems[i]));
+        }
+    }
+    tessDeleteTess(tess);
+}
+
+Mesh::Mesh(std::span<Vec2f const> points, bool convex)
+{
+    vertices.reserve(points.size() * 2);
+    for (auto const& p : points) {
+        vertices.push_back(static_cast<float>(p.x));
+        vertices.push_back(static_cast<float>(p.y));
+    }
+    if (!convex) {
+        indices = ear_clip(points);
+        return;
+    }
+    for (size_t i = 1; i + 1 < points.size(); i++) {
+        indices.insert(indices.end(), {0, static_cast<uint16_t>(i),
+                                       static_cast<uint16_t>(i + 1)});
+    }
+}
+
+Mesh::Mesh(std::vector<std::vector<Vec2f>> const& contours)
+{
+    tesselate(contours, vertices, indices);
+}
+
+void Mesh::bind()
+{
+    if (vbo == nullptr) {
+        vbo = std::make_unique<gl::ArrayBuffer<>>(vertices);
+        ibo = std::make_unique<gl::ElementBuffer<>>(indices);
+    }
+    vbo->bind();
+    ibo->bind();
+}
+
+} // namespace pix
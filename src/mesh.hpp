@@ -0,0 +1,54 @@
+#pragma once
+
+#include "gl/buffer.hpp"
+
+#include "vec2.hpp"
+
+#include <cstdint>
+#include <memory>
+#include <span>
+#include <vector>
+
+namespace pix {
+
+// Split a simple polygon into triangles using ear clipping. Returns three
+// indices into `points` per triangle. The points can be in either order.
+std::vector<uint16_t> ear_clip(std::span<Vec2f const> points);
+
+// Split polygons consisting of one or more contours into triangles, using
+// the odd winding rule so inner contours become holes. Adds x,y pairs to
+// `vertices` and three indices into them per triangle to `indices`.
+void tesselate(std::vector<std::vector<Vec2f>> const& contours,
+               std::vector<float>& vertices, std::vector<uint16_t>& indices);
+
+// Filled polygon geometry that is triangulated once, and kept in GPU
+// buffers so it can be drawn many times without being uploaded again.
+class Mesh
+{
+    // x,y pairs in mesh coordinates
+    std::vector<float> vertices;
+    std::vector<uint16_t> indices;
+
+    // Created on the first draw
+    std::unique_ptr<gl::ArrayBuffer<>> vbo;
+    std::unique_ptr<gl::ElementBuffer<>> ibo;
+
+public:
+    // Max number of vertices, since indices are 16 bit
+    static constexpr size_t max_vertices = 0x10000;
+
+    // Create a mesh from the points of a polygon. If `convex` is true the
+    // polygon is made into a triangle fan, otherwise it is triangulated
+    // using ear clipping.
+    explicit Mesh(std::span<Vec2f const> points, bool convex = false);
+    // Create a mesh from polygon contours that can contain holes
+    explicit Mesh(std::vector<std::vector<Vec2f>> const& contours);
+
+    [[nodiscard]] size_t vertex_count() const { return vertices.size() / 2; }
+    [[nodiscard]] size_t index_count() const { return indices.size(); }
+
+    // Bind the vertex and index buffers, uploading them first if needed
+    void bind();
+};
+
+} // namespace pix
@@ -11,10 +11,11 @@ std::string PixConsole::vertex_shader{R"gl(
     #endif
         attribute vec2 in_pos;
         attribute vec2 in_uv;
+        uniform mat4 in_transform;
         varying vec2 out_uv;
         void main() {
-            vec4 v = vec4(in_pos, 0, 1);
-            gl_Position = vec4( v.x, v.y, 0, 1 );
+            vec4 v = in_transform * vec4(in_pos, 0, 1);
+            gl_Position = vec4( v.x, v.y, 0, v.w );
             out_uv = in_uv;
         })gl"};
 
@@ -28,11 +29,13 @@ std::string PixConsole::fragment_shader{R"gl(
 
         uniform vec2 console_size;
         uniform vec2 uv_scale;
+        uniform float row_offset;
         varying vec2 out_uv;
 
         void main() {
-              vec4 up = texture2D(uv_tex, out_uv);
-              vec4 color = texture2D(col_tex, out_uv);
+              vec2 cell_uv = vec2(out_uv.x, fract(out_uv.y + row_offset));
+              vec4 up = texture2D(uv_tex, cell_uv);
+              vec4 color = texture2D(col_tex, cell_uv);
               vec3 fg_color = vec3(up.wz, color.a);
               vec3 bg_color = color.rgb;
               vec2 ux = (up.xy * 255.0) / 256.0;
@@ -43,15 +46,26 @@ std::string PixConsole::fragment_shader{R"gl(
         })gl"};
 
 PixConsole::PixConsole(int _cols, int _rows, std::shared_ptr<TileSet> const& _tile_set)
-    : tile_set{_tile_set},  cols{_cols}, rows{_rows}
+    : tile_set{_tile_set}, cols{_cols}, rows{_rows}
 {
     init();
 }
 
+PixConsole::~PixConsole()
+{
+    for (auto uv : uvdata) {
+        tile_set->release(uv);
+    }
+}
+
 void PixConsole::init()
 {
-    uvdata.resize(cols * rows);
+    // Every cell holds a reference to the tile it shows, starting with space
+    auto const space = tile_set->get_offset(' ');
+    uvdata.resize(cols * rows, space);
+    tile_set->add_ref(space, uvdata.size());
     coldata.resize(cols * rows);
+    celldata.resize(cols * rows * 3);
     fill(0xffffffff, 0);
     uv_texture = gl::Texture{cols, rows, uvdata};
     col_texture = gl::Texture{cols, rows, coldata};
@@ -68,6 +82,8 @@ void PixConsole::init()
 
     program.setUniform("console_size", std::pair<float, float>(cols, rows));
     program.setUniform("uv_scale", tile_set->get_uvscale());
+    program.setUniform("row_offset", 0.0F);
+    set_transform({1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1});
 
     uv_texture.update(uvdata.data());
     col_texture.update(coldata.data());
@@ -100,151 +116,265 @@ std::pair<int, int> PixConsole::text(int x, int y, std::u32string const& text32,
                                      uint32_t fg, uint32_t bg)
 {
     if (x < 0 || x >= cols || y < 0 || y >= rows) { return {x, y}; }
-    auto [w0, w1] = make_col(fg, bg);
+    auto start_y = y;
     for (auto c : text32) {
+        if (y >= rows) { break; }
         if (c == 10) {
             x = 0;
             y++;
             continue;
         }
 
-        uvdata[x + cols * y] = tile_set->get_offset(c) | w0;
-        coldata[x + cols * y] = w1;
+        write_cell(x + row_offset(y), c, fg, bg);
         x++;
         if (x >= cols) {
             x = 0;
             y++;
         }
-        if(y >= rows) { break; }
     }
-    uv_dirty = col_dirty = true;
+    set_dirty(start_y, std::min(y + 1, rows));
     return {x, y};
 }
 
 void PixConsole::put_char(int x, int y, char32_t c)
 {
     if (x < 0 || x >= cols || y < 0 || y >= rows) { return; }
-    uv_dirty = col_dirty = true;
-    auto& u = uvdata[x + cols * y];
-    u = (u & 0xffff0000) | tile_set->get_offset(c);
+    set_dirty(y);
+    auto offs = x + row_offset(y);
+    set_uv(offs, use_tile(c));
+    celldata[offs * 3] = c;
 }
 
 void PixConsole::put(int x, int y, uint32_t fg, uint32_t bg, char32_t c)
 {
     if (x < 0 || x >= cols || y < 0 || y >= rows) { return; }
-    uv_dirty = col_dirty = true;
-    auto [w0, w1] = make_col(fg, bg);
-    uvdata[x + cols * y] = tile_set->get_offset(c) | w0;
-    coldata[x + cols * y] = w1;
+    set_dirty(y);
+    write_cell(x + row_offset(y), c, fg, bg);
 }
 
 uint32_t PixConsole::get_char(int x, int y)
 {
     if (x < 0 || x >= cols || y < 0 || y >= rows) { return 0; }
-    uint32_t uv = uvdata[x + cols * y] & 0xffff;
-    return tile_set->get_char_from_uv(uv);
+    return celldata[(x + row_offset(y)) * 3];
 }
 
 std::vector<uint32_t> PixConsole::get_tiles()
 {
-    std::vector<uint32_t> result(cols*rows*3);
-    for(int i=0; i<cols*rows; i++) {
-        uint32_t uv = uvdata[i] & 0xffff;
-        auto fg = ((coldata[i] & 0xff000000)>>16) | (uvdata[i] & 0xffff0000);
-        auto bg = coldata[i] & 0xffffff;
-        result[i*3] = tile_set->get_char_from_uv(uv);
-        result[i*3+1] = fg;
-        result[i*3+2] = bg;
-    }
-    return result;
+    normalize();
+    return celldata;
+}
+
+uint32_t* PixConsole::get_cells()
+{
+    normalize();
+    return celldata.data();
 }
 
-void PixConsole::set_tiles(std::vector<uint32_t> const& data)
+void PixConsole::set_tiles(std::span<const uint32_t> data)
 {
-    size_t size = cols*rows;
-    if (size > data.size() * 3) {
-        size = data.size() * 3;
+    normalize();
+    auto size = std::min(celldata.size(), data.size()) / 3;
+    for (size_t i = 0; i < size; i++) {
+        write_cell(i, data[i * 3], data[i * 3 + 1], data[i * 3 + 2]);
     }
-    for(size_t i=0; i<size; i++) {
-        auto [w0,w1] = make_col(data[i*3+1], data[i*3+2]);
-        uvdata[i] = tile_set->get_offset(data[i*3]) | w0;
+    set_dirty();
+}
+
+void PixConsole::mark_dirty()
+{
+    missing_tiles = false;
+    for (size_t i = 0; i < uvdata.size(); i++) {
+        auto const* cell = &celldata[i * 3];
+        auto [w0, w1] = make_col(cell[1], cell[2]);
+        // Take the new reference first, so an unchanged tile is never
+        // released
+        set_uv(i, use_tile(cell[0]));
+        uvdata[i] = (uvdata[i] & 0xffff) | w0;
         coldata[i] = w1;
     }
-    uv_dirty = true;
-    col_dirty = true;
+    tile_releases = tile_set->releases;
+    set_dirty();
+}
+
+void PixConsole::retry_missing_tiles()
+{
+    missing_tiles = false;
+    auto const missing = tile_set->missing_offset();
+    for (size_t i = 0; i < uvdata.size(); i++) {
+        auto const tile = celldata[i * 3];
+        if ((uvdata[i] & 0xffff) != missing || tile == '?') { continue; }
+        auto uv = use_tile(tile);
+        set_uv(i, uv);
+        if (uv != missing) {
+            // Physical row to visible row
+            auto y = (static_cast<int>(i) / cols - origin + rows) % rows;
+            set_dirty(y);
+        }
+    }
+    tile_releases = tile_set->releases;
 }
 
 void PixConsole::put_color(int x, int y, uint32_t fg, uint32_t bg)
 {
     if (x < 0 || x >= cols || y < 0 || y >= rows) { return; }
-    uv_dirty = col_dirty = true;
+    set_dirty(y);
     auto [w0, w1] = make_col(fg, bg);
-    uvdata[x + cols * y] = (uvdata[x + cols * y] & 0xffff) | w0;
-    coldata[x + cols * y] = w1;
+    auto offs = x + row_offset(y);
+    uvdata[offs] = (uvdata[offs] & 0xffff) | w0;
+    coldata[offs] = w1;
+    celldata[offs * 3 + 1] = fg;
+    celldata[offs * 3 + 2] = bg;
+}
+
+void PixConsole::put_row(int x, int y, std::span<const uint32_t> tiles,
+                         std::span<const uint32_t> fg,
+                         std::span<const uint32_t> bg)
+{
+    if (y < 0 || y >= rows || fg.empty() || bg.empty()) { return; }
+    size_t fg_step = fg.size() == 1 ? 0 : 1;
+    size_t bg_step = bg.size() == 1 ? 0 : 1;
+    set_dirty(y);
+    for (size_t i = 0; i < tiles.size(); i++) {
+        auto xx = x + static_cast<int>(i);
+        if (xx < 0) { continue; }
+        if (xx >= cols) { break; }
+        write_cell(xx + row_offset(y), tiles[i], fg[i * fg_step],
+                   bg[i * bg_step]);
+    }
+}
+
+void PixConsole::set_region(int x, int y, int w, int h,
+                            std::span<const uint32_t> data)
+{
+    set_dirty(y, y + h);
+    for (int yy = 0; yy < h; yy++) {
+        auto row = data.subspan(static_cast<size_t>(yy) * w * 3, w * 3);
+        if (y + yy < 0) { continue; }
+        if (y + yy >= rows) { break; }
+        for (int xx = 0; xx < w; xx++) {
+            if (x + xx < 0) { continue; }
+            if (x + xx >= cols) { break; }
+            write_cell((x + xx) + row_offset(y + yy), row[xx * 3],
+                       row[xx * 3 + 1], row[xx * 3 + 2]);
+        }
+    }
 }
 
 void PixConsole::fill(uint32_t fg, uint32_t bg)
 {
-    uv_dirty = col_dirty = true;
+    set_dirty();
     auto [w0, w1] = make_col(fg, bg);
-    w0 |= tile_set->char_uvs[' '];
+    auto const space = tile_set->get_offset(' ');
+    tile_set->add_ref(space, uvdata.size());
+    w0 |= space;
     for (size_t i = 0; i < uvdata.size(); i++) {
+        tile_set->release(uvdata[i]);
         uvdata[i] = w0;
         coldata[i] = w1;
+        celldata[i * 3] = ' ';
+        celldata[i * 3 + 1] = fg;
+        celldata[i * 3 + 2] = bg;
     }
 }
 
 void PixConsole::fill(uint32_t bg)
 {
-    uv_dirty = col_dirty = true;
+    set_dirty();
     auto [w0, w1] = make_col(0, bg);
-    for (auto& c : coldata) {
-        c = (c & 0xff000000) | w1;
+    for (size_t i = 0; i < coldata.size(); i++) {
+        coldata[i] = (coldata[i] & 0xff000000) | w1;
+        celldata[i * 3 + 2] = bg;
     }
 }
 
 void PixConsole::clear_area(int32_t x, int32_t y, int32_t w, int32_t h,
                             uint32_t fg, uint32_t bg)
 {
-    uv_dirty = col_dirty = true;
     if (w == -1) { w = cols; }
     if (h == -1) { h = rows; }
+    auto x1 = std::min(x + w, cols);
+    auto y1 = std::min(y + h, rows);
+    x = std::max(x, 0);
+    y = std::max(y, 0);
+    set_dirty(y, y1);
     auto [w0, w1] = make_col(fg, bg);
-    w0 |= tile_set->char_uvs[' '];
-    for (int32_t yy = 0; yy < h; yy++) {
-        for (int32_t xx = 0; xx < w; xx++) {
-            auto offs = (xx + x) + (yy + y) * cols;
+    auto const space = tile_set->get_offset(' ');
+    w0 |= space;
+    for (int32_t yy = y; yy < y1; yy++) {
+        for (int32_t xx = x; xx < x1; xx++) {
+            auto offs = xx + row_offset(yy);
+            tile_set->add_ref(space);
+            tile_set->release(uvdata[offs]);
             uvdata[offs] = w0;
             coldata[offs] = w1;
+            celldata[offs * 3] = ' ';
+            celldata[offs * 3 + 1] = fg;
+            celldata[offs * 3 + 2] = bg;
         }
     }
 }
 
 void PixConsole::scroll(int dy, int dx)
 {
-    uv_dirty = col_dirty = true;
-    // TODO: Optimize
-    auto uc = uvdata;
-    auto cc = coldata;
-    for (int32_t y = 0; y < rows; y++) {
-        auto ty = y + dy;
-        if (ty >= 0 && ty < rows) {
-            for (int32_t x = 0; x < cols; x++) {
-                auto tx = x + dx;
-                if (tx < cols && ty < rows) {
-                    uvdata[tx + ty * cols] = uc[x + y * cols];
-                    coldata[tx + ty * cols] = cc[x + y * cols];
-                }
-            }
+    // Rows are scrolled by moving the row origin, which the shader applies
+    // when reading the textures, so nothing needs to be copied or uploaded.
+    origin = ((origin - dy) % rows + rows) % rows;
+
+    dx = (dx % cols + cols) % cols;
+    if (dx != 0) {
+        for (int32_t y = 0; y < rows; y++) {
+            auto offs = row_offset(y);
+            auto uv = uvdata.begin() + offs;
+            std::rotate(uv, uv + cols - dx, uv + cols);
+            auto col = coldata.begin() + offs;
+            std::rotate(col, col + cols - dx, col + cols);
+            auto cell = celldata.begin() + offs * 3;
+            std::rotate(cell, cell + (cols - dx) * 3, cell + cols * 3);
         }
+        set_dirty();
     }
+    // Views of the cells expect the first row first
+    if (cell_views > 0) { normalize(); }
+}
+
+void PixConsole::normalize()
+{
+    if (origin == 0) { return; }
+    std::rotate(uvdata.begin(), uvdata.begin() + origin * cols, uvdata.end());
+    std::rotate(coldata.begin(), coldata.begin() + origin * cols,
+                coldata.end());
+    std::rotate(celldata.begin(), celldata.begin() + origin * cols * 3,
+                celldata.end());
+    origin = 0;
+    dirty_y0 = 0;
+    dirty_y1 = rows;
+}
+
+void PixConsole::set_transform(std::array<float, 16> const& mat)
+{
+    program.setUniform("in_transform", mat);
 }
 
 void PixConsole::render(float x0, float y0, float x1, float y1)
 {
-    if (uv_dirty) { uv_texture.update(uvdata.data()); }
-    if (col_dirty) { col_texture.update(coldata.data()); }
-    uv_dirty = col_dirty = false;
+    if (missing_tiles && tile_set->releases != tile_releases) {
+        // Glyphs that did not fit before may fit now
+        retry_missing_tiles();
+    }
+    if (origin != uploaded_origin) {
+        program.setUniform("row_offset", static_cast<float>(origin) / rows);
+        uploaded_origin = origin;
+    }
+    // Only upload the rows that changed
+    bytes_uploaded = 0;
+    if (dirty_y1 > dirty_y0) {
+        auto h = dirty_y1 - dirty_y0;
+        auto offs = dirty_y0 * cols;
+        uv_texture.update(0, dirty_y0, cols, h, &uvdata[offs]);
+        col_texture.update(0, dirty_y0, cols, h, &coldata[offs]);
+        bytes_uploaded = static_cast<size_t>(cols) * h * sizeof(uint32_t) * 2;
+        dirty_y0 = dirty_y1 = 0;
+    }
     glDisable(GL_BLEND);
     col_texture.bind(2);
     uv_texture.bind(1);
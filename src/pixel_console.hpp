@@ -9,6 +9,9 @@
 #include "gl/program.hpp"
 #include "gl/texture.hpp"
 
+#include <algorithm>
+#include <array>
+#include <span>
 #include <string>
 #include <tuple>
 #include <unordered_map>
@@ -21,6 +24,10 @@ class PixConsole
     gl::Program program;
 
     std::shared_ptr<TileSet> tile_set;
+    // Some cells show `missing_offset()` since their glyph did not fit in
+    // the tile set. They are retried when `tile_set->releases` changes.
+    bool missing_tiles = false;
+    uint32_t tile_releases = 0;
 
     int cols;
     int rows;
@@ -30,9 +37,52 @@ class PixConsole
 
     std::vector<uint32_t> uvdata;
     std::vector<uint32_t> coldata;
+    // [tile, fg, bg] for every cell. This is the source of truth that
+    // uvdata and coldata are generated from.
+    std::vector<uint32_t> celldata;
 
-    bool uv_dirty = false;
-    bool col_dirty = false;
+    // Physical row of the first visible row. Scrolling vertically only
+    // moves this, the rows are used as a ring buffer.
+    int origin = 0;
+    int uploaded_origin = 0;
+
+    [[nodiscard]] int row_offset(int y) const
+    {
+        return ((y + origin) % rows) * cols;
+    }
+
+    // Make the first visible row the first row in memory again
+    void normalize();
+
+    // Physical rows [dirty_y0, dirty_y1) have changed since the last upload
+    int dirty_y0 = 0;
+    int dirty_y1 = 0;
+
+    // Mark visible rows [y0, y1) as changed
+    void set_dirty(int y0, int y1)
+    {
+        y0 = std::max(y0, 0);
+        y1 = std::min(y1, rows);
+        if (y0 >= y1) { return; }
+        auto p0 = (y0 + origin) % rows;
+        if (p0 + (y1 - y0) > rows) {
+            // Wraps around the end of the ring buffer
+            y0 = 0;
+            y1 = rows;
+        } else {
+            y1 = p0 + (y1 - y0);
+            y0 = p0;
+        }
+        if (dirty_y0 == dirty_y1) {
+            dirty_y0 = y0;
+            dirty_y1 = y1;
+            return;
+        }
+        dirty_y0 = std::min(dirty_y0, y0);
+        dirty_y1 = std::max(dirty_y1, y1);
+    }
+    void set_dirty(int y) { set_dirty(y, y + 1); }
+    void set_dirty() { set_dirty(0, rows); }
 
     static constexpr std::pair<uint32_t, uint32_t> make_col(uint32_t fg,
                                                             uint32_t bg)
@@ -44,12 +94,61 @@ class PixConsole
     }
 
     void init();
+    void retry_missing_tiles();
+
+    // Get the tile offset of `tile` and hold a reference to it, so it stays
+    // in the tile set while a cell shows it
+    uint32_t use_tile(uint32_t tile)
+    {
+        auto uv = tile_set->find_offset(tile);
+        if (!uv) {
+            missing_tiles = true;
+            uv = tile_set->missing_offset();
+        }
+        tile_set->add_ref(*uv);
+        return *uv;
+    }
+
+    // Show `uv` in cell `offs` instead of what it showed before
+    void set_uv(size_t offs, uint32_t uv)
+    {
+        tile_set->release(uvdata[offs]);
+        uvdata[offs] = (uvdata[offs] & 0xffff0000) | uv;
+    }
+
+    void write_cell(size_t offs, uint32_t tile, uint32_t fg, uint32_t bg)
+    {
+        auto [w0, w1] = make_col(fg, bg);
+        set_uv(offs, use_tile(tile));
+        uvdata[offs] = (uvdata[offs] & 0xffff) | w0;
+        coldata[offs] = w1;
+        auto* cell = &celldata[offs * 3];
+        cell[0] = tile;
+        cell[1] = fg;
+        cell[2] = bg;
+    }
 
 public:
     PixConsole(int _cols, int _rows, std::shared_ptr<TileSet> const& _tile_set);
+    PixConsole(PixConsole const&) = delete;
+    PixConsole& operator=(PixConsole const&) = delete;
+    ~PixConsole();
 
     std::vector<uint32_t> get_tiles();
-    void set_tiles(std::vector<uint32_t> const& data);
+    void set_tiles(std::span<const uint32_t> data);
+
+    // Direct access to the [tile, fg, bg] cells. Call `mark_dirty()` after
+    // writing to them. Scrolling invalidates the row order, so call this
+    // again after `scroll()`, unless `cell_views` is set.
+    uint32_t* get_cells();
+    void mark_dirty();
+
+    // Number of views of the cells that are alive. While there are any,
+    // `scroll()` keeps the rows in order in memory.
+    int cell_views = 0;
+
+    // Number of bytes uploaded to textures by the last render()
+    size_t bytes_uploaded = 0;
 
     [[nodiscard]] std::pair<int, int> get_size() const { return {cols, rows}; }
     template <typename T = int> std::pair<T, T> get_char_size() const;
@@ -65,6 +164,11 @@ public:
         return tile_set->get_texture_for_char(c);
     }
 
+    [[nodiscard]] pix::ImageView get_tile_image(char32_t c) const
+    {
+        return tile_set->get_tile_image(c);
+    }
+
     std::pair<int, int> text(int x, int y, std::string const& t,
                              uint32_t fg = 0xffffffff, uint32_t bg = 0);
     std::pair<int, int> text(int x, int y, std::u32string const& t,
@@ -80,6 +184,16 @@ public:
 
     void put_color(int x, int y, uint32_t fg, uint32_t bg);
 
+    // Put a row of tiles starting at x,y. `fg` and `bg` hold either one
+    // color for all tiles, or one color per tile.
+    void put_row(int x, int y, std::span<const uint32_t> tiles,
+                 std::span<const uint32_t> fg, std::span<const uint32_t> bg);
+
+    // Set a w*h rectangle of tiles from `data`, holding [tile, fg, bg]
+    // triplets.
+    void set_region(int x, int y, int w, int h,
+                    std::span<const uint32_t> data);
+
     void fill(uint32_t fg, uint32_t bg);
 
     void fill(uint32_t bg);
@@ -89,6 +203,10 @@ public:
 
     void scroll(int dy, int dx);
 
+    // Set the matrix that the corners given to render() are transformed
+    // with
+    void set_transform(std::array<float, 16> const& mat);
+
     void render(float x0 = -1, float y0 = 1, float x1 = 1, float y1 = -1);
 
     template <typename F, typename S>
@@ -0,0 +1,120 @@
+#include "pixel_surface.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <memory>
+#include <utility>
+
+namespace pix {
+
+namespace {
+
+std::vector<uint32_t> read_image(ImageView const& source, int w, int h)
+{
+    std::vector<uint32_t> pixels(static_cast<size_t>(w) * h);
+    auto data = source.get_tex().read_pixels();
+    std::memcpy(pixels.data(), data.data(), pixels.size() * 4);
+    return pixels;
+}
+
+} // namespace
+
+PixelSurface::PixelSurface(int w, int h, uint32_t color)
+    : width(w), height(h),
+      pixels(static_cast<size_t>(w) * h, swap_bytes(color)),
+      image{gl::TexRef{std::make_shared<gl::Texture>(w, h, pixels)}}
+{
+}
+
+PixelSurface::PixelSurface(ImageView const& source)
+    : width(static_cast<int>(std::lround(source.width()))),
+      height(static_cast<int>(std::lround(source.height()))),
+      pixels(read_image(source, width, height)),
+      image{gl::TexRef{std::make_shared<gl::Texture>(width, height, pixels)}}
+{
+}
+
+void PixelSurface::mark_dirty(Rect const& rect)
+{
+    auto merge = [](Rect const& a, Rect const& b) {
+        return Rect{std::min(a.x0, b.x0), std::min(a.y0, b.y0),
+                    std::max(a.x1, b.x1), std::max(a.y1, b.y1)};
+    };
+    for (auto& r : dirty_rects) {
+        // Grow a rectangle that the new one overlaps or touches
+        if (rect.x0 <= r.x1 && rect.x1 >= r.x0 && rect.y0 <= r.y1 &&
+            rect.y1 >= r.y0) {
+            r = merge(r, rect);
+            return;
+        }
+    }
+    if (dirty_rects.size() < max_dirty_rects) {
+        dirty_rects.push_back(rect);
+        return;
+    }
+    auto all = rect;
+    for (auto const& r : dirty_rects) {
+        all = merge(all, r);
+    }
+    dirty_rects.assign(1, all);
+}
+
+void PixelSurface::set_pixel(int x, int y, uint32_t color)
+{
+    if (x < 0 || y < 0 || x >= width || y >= height) { return; }
+    pixels[index(x, y)] = swap_bytes(color);
+    mark_dirty({x, y, x + 1, y + 1});
+}
+
+uint32_t PixelSurface::get_pixel(int x, int y) const
+{
+    if (x < 0 || y < 0 || x >= width || y >= height) { return 0; }
+    return swap_bytes(pixels[index(x, y)]);
+}
+
+Rect PixelSurface::flood_fill(int x, int y, uint32_t color, int tolerance,
+                              PixelSurface* mask)
+{
+    auto* target = mask != nullptr ? mask : this;
+    // Rows are stored bottom up, so fill upside down
+    auto area = scanline_fill(pixels, target->pixels, width, height, x,
+                              height - 1 - y, swap_bytes(color), tolerance);
+    area = {area.x0, height - area.y1, area.x1, height - area.y0};
+    if (!area.empty()) { target->mark_dirty(area); }
+    return area;
+}
+
+void PixelSurface::clear(uint32_t color)
+{
+    std::fill(pixels.begin(), pixels.end(), swap_bytes(color));
+    dirty_rects.clear();
+    mark_dirty({0, 0, width, height});
+}
+
+void PixelSurface::upload()
+{
+    auto const& tex = image.get_tex().tex;
+    for (auto const& r : dirty_rects) {
+        auto w = r.x1 - r.x0;
+        auto h = r.y1 - r.y0;
+        // Texture rows are stored bottom up
+        auto first_row = height - r.y1;
+        auto const* src = &pixels[static_cast<size_t>(first_row) * width];
+        if (w == width) {
+            tex->update(0, first_row, w, h, src);
+        } else {
+            // GLES2 can not upload part of a row, so copy the rectangle
+            scratch.resize(static_cast<size_t>(w) * h);
+            for (int y = 0; y < h; y++) {
+                std::copy_n(src + static_cast<size_t>(y) * width + r.x0, w,
+                            &scratch[static_cast<size_t>(y) * w]);
+            }
+            tex->update(r.x0, first_row, w, h, scratch.data());
+        }
+        bytes_uploaded += static_cast<size_t>(w) * h * 4;
+    }
+    dirty_rects.clear();
+}
+
+} // namespace pix
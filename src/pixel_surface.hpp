@@ -0,0 +1,82 @@
+#pragma once
+
+#include "flood_fill.hpp"
+#include "image_view.hpp"
+
+#include <cstdint>
+#include <vector>
+
+namespace pix {
+
+// An image kept in CPU memory, so pixels can be read and written without
+// touching the GPU. Changed areas are tracked as rectangles and only those
+// are uploaded to the texture when the image is needed.
+class PixelSurface
+{
+public:
+    // More dirty rectangles than this are merged into one
+    static constexpr size_t max_dirty_rects = 16;
+
+private:
+    int width;
+    int height;
+
+    // RGBA bytes, stored like the texture with the bottom row first
+    std::vector<uint32_t> pixels;
+    std::vector<Rect> dirty_rects;
+    std::vector<uint32_t> scratch;
+
+    ImageView image;
+
+    [[nodiscard]] size_t index(int x, int y) const
+    {
+        return static_cast<size_t>(x) +
+               static_cast<size_t>(height - 1 - y) * width;
+    }
+
+    // Convert between 0xRRGGBBAA and how colors are stored in memory
+    static constexpr uint32_t swap_bytes(uint32_t col)
+    {
+        col = (col & 0x0000FFFF) << 16 | (col & 0xFFFF0000) >> 16;
+        return (col & 0x00FF00FF) << 8 | (col & 0xFF00FF00) >> 8;
+    }
+
+    void mark_dirty(Rect const& rect);
+
+public:
+    PixelSurface(int w, int h, uint32_t color = 0);
+    // Create a surface holding a copy of the pixels in `source`
+    explicit PixelSurface(ImageView const& source);
+
+    [[nodiscard]] int get_width() const { return width; }
+    [[nodiscard]] int get_height() const { return height; }
+
+    // Number of bytes uploaded to the texture so far
+    size_t bytes_uploaded = 0;
+
+    void set_pixel(int x, int y, uint32_t color);
+    [[nodiscard]] uint32_t get_pixel(int x, int y) const;
+    // Fill the area around `x`,`y` whose colors differ at most `tolerance`
+    // per channel from the start pixel. If `mask` is given, the area is
+    // filled in the mask instead. Returns the bounding box of the area.
+    Rect flood_fill(int x, int y, uint32_t color, int tolerance = 0,
+                    PixelSurface* mask = nullptr);
+    void clear(uint32_t color);
+
+    [[nodiscard]] std::vector<Rect> const& get_dirty_rects() const
+    {
+        return dirty_rects;
+    }
+
+    // Upload all dirty rectangles to the texture
+    void upload();
+
+    // The surface as an image, with all changes uploaded
+    ImageView& get_image()
+    {
+        upload();
+        return image;
+    }
+};
+
+} // namespace pix
@@ -1,7 +1,12 @@
+#include "python/class_atlas.hpp"
 #include "python/class_canvas.hpp"
 #include "python/class_console.hpp"
+#include "python/class_display_list.hpp"
 #include "python/class_font.hpp"
 #include "python/class_image.hpp"
+#include "python/class_mesh.hpp"
+#include "python/class_pending.hpp"
+#include "python/class_pixel_surface.hpp"
 #include "python/class_screen.hpp"
 #include "python/class_tileset.hpp"
 #include "python/class_vec2.hpp"
@@ -15,9 +20,11 @@
 #include "context.hpp"
 #include "font.hpp"
 #include "image.hpp"
+#include "loader.hpp"
 #include "machine.hpp"
 #include "screen.hpp"
 #include "system.hpp"
+#include "text_cache.hpp"
 #include "vec2.hpp"
 
 #include <cstdlib>
@@ -74,6 +81,8 @@ void init()
             Adder::adders.clear();
             m.events.clear();
             m.listeners.clear();
+            TextImageCache::instance().clear();
+            pix::Loader::get_instance().clear();
             m.counter = 0;
             auto screen = pix::Screen::instance;
             if (screen != nullptr &&
@@ -85,6 +94,9 @@ void init()
                     std::this_thread::sleep_for(std::chrono::milliseconds(10));
                 }
             }
+            // The buffer is recreated if anything is drawn, so release it
+            // last
+            pix::Context::release_batch();
             log("Done");
         }));
     }
@@ -178,6 +190,7 @@ std::shared_ptr<pix::Screen> open_display2(Vec2i size, bool full_screen,
 
 void save_png(pix::ImageView const& image, fs::path const& file_name)
 {
+    pix::Context::flush_batch();
     auto const& tex = image.get_tex();
     auto pixels = tex.read_pixels();
     pix::Image img{static_cast<int>(tex.width()),
@@ -255,9 +268,14 @@ PYBIND11_EMBEDDED_MODULE(_pixpy, mod)
     auto con_class = add_console_class(mod);
     auto ctx = add_canvas_class(mod);
     auto tc = add_image_class(mod, ctx);
+    add_pixel_surface_class(mod);
+    add_mesh_class(mod);
+    add_display_list_class(mod);
+    add_atlas_class(mod);
 
     add_canvas_functions(ctx);
     add_font_class(mod);
+    add_pending_classes(mod);
 
     add_console_functions(con_class);
 
@@ -365,6 +383,8 @@ PYBIND11_EMBEDDED_MODULE(_pixpy, mod)
                 throw pix::pix_exception("Recursive call to run_loop()");
             }
             m.in_pix++;
+            // Upload anything that finished loading in the background
+            pix::Loader::get_instance().poll();
             auto t = to_sec(clk::now() - start_t);
             Tween::update_all(t);
             Adder::update_all(t);
@@ -426,6 +446,13 @@ PYBIND11_EMBEDDED_MODULE(_pixpy, mod)
             "Load a TTF font.");
     mod.def("allow_break", &set_allow_break, "on"_a,
             "Allow Ctrl-C to break out of run loop");
+    mod.def(
+        "set_tileset_cache",
+        [](fs::path const& directory) {
+            TileSet::cache_dir = directory.string();
+        },
+        "directory"_a,
+        "Cache the pre-rendered glyphs of new TileSets in `directory`, so creating the same TileSet again is fast. An empty string turns the cache off.");
     mod.def(
         "inside_polygon",
         [](std::vector<Vec2f> const& points, Vec2f point) {
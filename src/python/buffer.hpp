@@ -0,0 +1,98 @@
+#pragma once
+
+#include <pybind11/pybind11.h>
+
+#include <cstdint>
+#include <span>
+#include <string>
+#include <type_traits>
+#include <vector>
+
+namespace py = pybind11;
+
+// Read access to a python buffer (`bytes`, `array`, numpy etc) of numbers as
+// `T`. Buffers that already hold `T` are used directly, other number types
+// are converted. Integer `T`s only accept integer buffers.
+template <typename T> class NumberBuffer
+{
+    py::buffer_info info;
+    std::vector<T> converted;
+
+    template <typename S> void convert()
+    {
+        auto const* ptr = static_cast<S const*>(info.ptr);
+        converted.assign(ptr, ptr + info.size);
+        data = converted;
+    }
+
+public:
+    std::span<const T> data;
+
+    NumberBuffer(NumberBuffer const&) = delete;
+    NumberBuffer& operator=(NumberBuffer const&) = delete;
+
+    explicit NumberBuffer(py::buffer const& buffer) : info(buffer.request())
+    {
+        auto expected = info.itemsize;
+        for (auto i = info.ndim - 1; i >= 0; i--) {
+            if (info.shape[i] > 1 && info.strides[i] != expected) {
+                throw py::value_error("Buffer must be contiguous");
+            }
+            expected *= info.shape[i];
+        }
+        auto format = info.format.back();
+        bool is_signed = format == 'b' || format == 'h' || format == 'i' ||
+                         format == 'l' || format == 'q';
+        bool is_unsigned = format == 'B' || format == 'H' || format == 'I' ||
+                           format == 'L' || format == 'Q' || format == 'c';
+        bool is_float = format == 'f' || format == 'd';
+        if constexpr (std::is_floating_point_v<T>) {
+            if (!is_signed && !is_unsigned && !is_float) {
+                throw py::value_error("Buffer must hold numbers, not '" +
+                                      info.format + "'");
+            }
+        } else {
+            if (!is_signed && !is_unsigned) {
+                throw py::value_error("Buffer must hold integers, not '" +
+                                      info.format + "'");
+            }
+        }
+        if (is_float) {
+            if (info.itemsize == sizeof(T) && std::is_floating_point_v<T>) {
+                data = {static_cast<T const*>(info.ptr),
+                        static_cast<size_t>(info.size)};
+            } else if (info.itemsize == 4) {
+                convert<float>();
+            } else {
+                convert<double>();
+            }
+            return;
+        }
+        if (info.itemsize == sizeof(T) && !std::is_floating_point_v<T>) {
+            data = {static_cast<T const*>(info.ptr),
+                    static_cast<size_t>(info.size)};
+            return;
+        }
+        switch (info.itemsize) {
+        case 1:
+            is_signed ? convert<int8_t>() : convert<uint8_t>();
+            break;
+        case 2:
+            is_signed ? convert<int16_t>() : convert<uint16_t>();
+            break;
+        case 4:
+            is_signed ? convert<int32_t>() : convert<uint32_t>();
+            break;
+        case 8:
+            is_signed ? convert<int64_t>() : convert<uint64_t>();
+            break;
+        default:
+            throw py::value_error("Unsupported buffer item size");
+        }
+    }
+
+    [[nodiscard]] size_t size() const { return data.size(); }
+};
+
+using UIntBuffer = NumberBuffer<uint32_t>;
+using FloatBuffer = NumberBuffer<float>;
@@ -0,0 +1,89 @@
+#pragma once
+
+#include "../atlas.hpp"
+#include "../image.hpp"
+#include "image_view.hpp"
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/stl/filesystem.h>
+
+#include <cmath>
+#include <cstring>
+#include <filesystem>
+#include <optional>
+#include <variant>
+#include <vector>
+
+namespace py = pybind11;
+
+// Read back the pixels of `view` from the GPU, top row first
+inline pix::Image read_image(pix::ImageView& view)
+{
+    view.flush();
+    auto const& tex = view.get_tex();
+    auto w = static_cast<int>(std::lround(tex.width()));
+    auto h = static_cast<int>(std::lround(tex.height()));
+    auto pixels = tex.tex->read_pixels(static_cast<int>(std::lround(tex.x())),
+                                       static_cast<int>(std::lround(tex.y())),
+                                       w, h);
+    pix::Image image{w, h};
+    auto stride = static_cast<size_t>(w) * 4;
+    for (int y = 0; y < h; y++) {
+        std::memcpy(image.ptr + y * stride, &pixels[(h - 1 - y) * stride],
+                    stride);
+    }
+    return image;
+}
+
+inline void add_atlas_class(py::module_ const& mod)
+{
+    using namespace pybind11::literals;
+    using pix::Atlas;
+    namespace fs = std::filesystem;
+    using Source = std::variant<pix::ImageView*, fs::path>;
+
+    auto c = py::class_<Atlas>(mod, "Atlas").def_static(
+        "pack",
+        [](std::vector<Source> const& sources, int max_size, int padding,
+           std::optional<fs::path> const& cache) {
+            if (max_size <= 0 || padding < 0) {
+                throw py::value_error(
+                    "max_size must be positive and padding not negative");
+            }
+            uint64_t key = 0;
+            if (cache) {
+                std::vector<fs::path> files;
+                for (auto const& source : sources) {
+                    if (auto const* path = std::get_if<fs::path>(&source)) {
+                        files.push_back(*path);
+                    } else {
+                        throw py::value_error(
+                            "Only images loaded from files can be cached");
+                    }
+                }
+                key = Atlas::cache_key(files, max_size, padding);
+                if (auto atlas = Atlas::load(cache->string(), key)) {
+                    return atlas->upload();
+                }
+            }
+            std::vector<pix::Image> images;
+            images.reserve(sources.size());
+            for (auto const& source : sources) {
+                if (auto const* path = std::get_if<fs::path>(&source)) {
+                    images.push_back(pix::load_png_image(*path));
+                } else {
+                    images.push_back(
+                        read_image(*std::get<pix::ImageView*>(source)));
+                }
+            }
+            Atlas atlas{images, max_size, padding};
+            if (cache) { atlas.save(cache->string(), key); }
+            return atlas.upload();
+        },
+        "images"_a, "max_size"_a = 2048, "padding"_a = 1,
+        "cache"_a = std::nullopt,
+        "Pack `images`, given as png file names or `Image`s, into as few textures of at most `max_size` x `max_size` pixels as possible, with `padding` empty pixels between them. Returns a new `Image` for each image, in the same order, so images from different files can be drawn without switching textures. If `cache` is given, the packed textures are saved to that file, and loaded from it the next time the same files are packed with the same settings. Only file names can be cached.");
+    c.doc() =
+        "Packs many images into a few large textures. Drawing images that share a texture is faster, since they can be batched together.";
+}
@@ -3,15 +3,104 @@
 #include "../colors.hpp"
 #include "../machine.hpp"
 #include "../vec2.hpp"
+#include "buffer.hpp"
+#include "display_list.hpp"
 #include "full_console.hpp"
 #include "image_view.hpp"
+#include "mesh.hpp"
+#include "pixel_surface.hpp"
+#include "threads.hpp"
 
+#include <cmath>
 #include <optional>
+#include <span>
+#include <string>
+#include <vector>
 #include <pybind11/detail/common.h>
 #include <pybind11/pybind11.h>
 
 namespace py = pybind11;
 
+inline void draw_image(pix::Context& self, pix::ImageView& image,
+                       std::optional<Vec2f> const& xy,
+                       std::optional<Vec2f> const& center, Vec2f const& size,
+                       float rot)
+{
+    image.flush();
+    if (center) {
+        self.draw(image, *center, size, rot);
+    } else if (xy) {
+        self.blit(image, *xy, size);
+    } else {
+        self.blit(image, {0, 0}, size);
+    }
+}
+
+// Read a 2x3 affine or 3x3 projective matrix, given row by row as a flat
+// sequence of numbers or as a sequence of rows
+inline pix::Context::Transform to_transform(py::object const& matrix)
+{
+    std::vector<double> m;
+    for (auto const& item : matrix) {
+        if (py::isinstance<py::sequence>(item)) {
+            for (auto const& v : item) {
+                m.push_back(v.cast<double>());
+            }
+        } else {
+            m.push_back(item.cast<double>());
+        }
+    }
+    if (m.size() == 6) { return {m[0], m[1], m[2], m[3], m[4], m[5], 0, 0, 1}; }
+    if (m.size() == 9) {
+        return {m[0], m[1], m[2], m[3], m[4], m[5], m[6], m[7], m[8]};
+    }
+    throw py::value_error("Matrix must have 6 (2x3) or 9 (3x3) values");
+}
+
+inline void draw_many(pix::Context& self,
+                      std::span<pix::ImageView* const> images,
+                      py::buffer const& centers,
+                      std::optional<py::buffer> const& sizes,
+                      std::optional<py::buffer> const& rotations,
+                      std::optional<py::buffer> const& colors)
+{
+    FloatBuffer center_data{centers};
+    auto n = center_data.size() / 2;
+    if (center_data.size() % 2 != 0) {
+        throw py::value_error("`centers` must hold x,y pairs");
+    }
+    if (images.size() != 1 && images.size() != n) {
+        throw py::value_error("Need one image, or one image per center");
+    }
+    auto check = [n](size_t size, size_t per_item, char const* name) {
+        if (size != 0 && size != per_item && size != n * per_item) {
+            throw py::value_error(std::string("Wrong number of values in `") +
+                                  name + "`");
+        }
+    };
+    std::optional<FloatBuffer> size_data;
+    std::optional<FloatBuffer> rotation_data;
+    std::optional<UIntBuffer> color_data;
+    if (sizes) { size_data.emplace(*sizes); }
+    if (rotations) { rotation_data.emplace(*rotations); }
+    if (colors) { color_data.emplace(*colors); }
+    std::span<float const> size_span;
+    std::span<float const> rotation_span;
+    std::span<uint32_t const> color_span;
+    if (size_data) { size_span = size_data->data; }
+    if (rotation_data) { rotation_span = rotation_data->data; }
+    if (color_data) { color_span = color_data->data; }
+    check(size_span.size(), 2, "sizes");
+    check(rotation_span.size(), 1, "rotations");
+    check(color_span.size(), 1, "colors");
+
+    for (auto* image : images) {
+        image->flush();
+    }
+    self.draw_many(images, center_data.data, size_span, rotation_span,
+                   color_span);
+}
+
 inline auto add_canvas_class(py::module_ const& mod)
 {
     using namespace pybind11::literals;
@@ -89,6 +178,20 @@ inline void add_canvas_functions(auto& cls)
     cls.def(
         "plot",
         [](Context& self, py::object const& points, py::object const& colors) {
+            if (py::isinstance<py::buffer>(points) &&
+                py::isinstance<py::buffer>(colors)) {
+                // Fast path, read the buffers directly
+                FloatBuffer xy{points};
+                UIntBuffer cols{colors};
+                if (xy.size() < cols.size() * 2) {
+                    throw py::value_error("Need two coordinates per color");
+                }
+                for (size_t i = 0; i < cols.size(); i++) {
+                    self.plot(Vec2f(xy.data[i * 2], xy.data[i * 2 + 1]),
+                              gl::Color(cols.data[i]));
+                }
+                return;
+            }
             auto sz = py::len(colors);
             auto&& fn = points.attr("__getitem__");
             auto&& cfn = colors.attr("__getitem__");
@@ -100,7 +203,24 @@ inline void add_canvas_functions(auto& cls)
             }
         },
         py::arg("points"), py::arg("colors"),
-        "Draw `n` points given by the array like objects. `points` should n*2 floats and `colors` should contain `n` unsigned ints.");
+        "Draw `n` points given by the array like objects. `points` should n*2 floats and `colors` should contain `n` unsigned ints. Objects supporting the buffer protocol (like `array` or numpy arrays) are read directly, which is much faster.");
+    cls.def(
+        "plot_xy",
+        [](Context& self, py::buffer const& xs, py::buffer const& ys,
+           py::buffer const& colors) {
+            FloatBuffer x{xs};
+            FloatBuffer y{ys};
+            UIntBuffer cols{colors};
+            if (x.size() != cols.size() || y.size() != cols.size()) {
+                throw py::value_error(
+                    "`xs`, `ys` and `colors` must have the same length");
+            }
+            for (size_t i = 0; i < cols.size(); i++) {
+                self.plot(Vec2f(x.data[i], y.data[i]), gl::Color(cols.data[i]));
+            }
+        },
+        "xs"_a, "ys"_a, "colors"_a,
+        "Draw `n` points, with the coordinates given as separate arrays of `n` x and `n` y values. All arguments should support the buffer protocol (like `array` or numpy arrays).");
     cls.def(
         "rect",
         [](Context& self, Vec2f const& xy, Vec2f const& size) {
@@ -115,22 +235,54 @@ inline void add_canvas_functions(auto& cls)
         },
         "top_left"_a, "size"_a, "Draw a filled rectangle.");
 
+    cls.def("draw", &draw_image, "image"_a, "top_left"_a = std::nullopt,
+            "center"_a = std::nullopt, "size"_a = Vec2f{0, 0}, "rot"_a = 0,
+            "Render an image. The image can either be aligned to its top left corner, or centered, in which case it can also be rotated.");
     cls.def(
         "draw",
-        [](Context& self, pix::ImageView& tr, std::optional<Vec2f> xy,
-           std::optional<Vec2f> center, Vec2f size, float rot) {
-            tr.flush();
-            if (center) {
-                self.draw(tr, *center, size, rot);
-            } else if (xy) {
-                self.blit(tr, *xy, size);
-            } else {
-                self.blit(tr, {0, 0}, size);
-            }
+        [](Context& self, pix::PixelSurface& surface,
+           std::optional<Vec2f> const& xy, std::optional<Vec2f> const& center,
+           Vec2f const& size, float rot) {
+            self.check_not_recording("Drawing a pixel surface");
+            draw_image(self, surface.get_image(), xy, center, size, rot);
         },
-        "image"_a, "top_left"_a = std::nullopt, "center"_a = std::nullopt,
+        "surface"_a, "top_left"_a = std::nullopt, "center"_a = std::nullopt,
         "size"_a = Vec2f{0, 0}, "rot"_a = 0,
-        "Render an image. The image can either be aligned to its top left corner, or centered, in which case it can also be rotated.");
+        "Render a pixel surface, uploading any changed areas first.");
+    cls.def(
+        "draw",
+        [](Context& self, pix::Mesh& mesh, Vec2f const& pos,
+           Vec2f const& scale, float rot,
+           std::optional<uint32_t> const& color) {
+            self.draw(mesh, pos, scale, rot,
+                      color ? gl::Color(*color) : self.fg);
+        },
+        "mesh"_a, "pos"_a = Vec2f{0, 0}, "scale"_a = Vec2f{1, 1}, "rot"_a = 0,
+        "color"_a = std::nullopt,
+        "Draw a mesh scaled and rotated around its origin, with the origin at `pos`. Uses the current draw color unless `color` is given.");
+    cls.def(
+        "draw_many",
+        [](Context& self, pix::ImageView& image, py::buffer const& centers,
+           std::optional<py::buffer> const& sizes,
+           std::optional<py::buffer> const& rotations,
+           std::optional<py::buffer> const& colors) {
+            auto* ptr = &image;
+            draw_many(self, {&ptr, 1}, centers, sizes, rotations, colors);
+        },
+        "image"_a, "centers"_a, "sizes"_a = std::nullopt,
+        "rotations"_a = std::nullopt, "colors"_a = std::nullopt,
+        "Draw `image` centered at every x,y pair in `centers`, using a single draw call. `sizes` can hold one x,y pair for all images or one per image, and `rotations` and `colors` one value for all images or one per image. All arguments are buffers, like `array` or numpy arrays.");
+    cls.def(
+        "draw_many",
+        [](Context& self, std::vector<pix::ImageView*> const& images,
+           py::buffer const& centers, std::optional<py::buffer> const& sizes,
+           std::optional<py::buffer> const& rotations,
+           std::optional<py::buffer> const& colors) {
+            draw_many(self, images, centers, sizes, rotations, colors);
+        },
+        "images"_a, "centers"_a, "sizes"_a = std::nullopt,
+        "rotations"_a = std::nullopt, "colors"_a = std::nullopt,
+        "Draw one image from `images` centered at each x,y pair in `centers`. Images that share a texture, like frames from `split()`, are drawn using a single draw call.");
     cls.def(
         "draw",
         [](Context& self, FullConsole& con, Vec2f const& xy,
@@ -175,11 +327,54 @@ inline void add_canvas_functions(auto& cls)
         "pos"_a, "color"_a, "Write a pixel into the image.");
     cls.def(
         "flood_fill",
-        [](Context& self, Vec2i pos, uint32_t color) {
-            self.flood_fill(pos.x, pos.y, color);
+        [](Context& self, Vec2i pos, uint32_t color, int tolerance,
+           pix::ImageView* mask) {
+            if (mask != nullptr &&
+                (std::lround(mask->width()) != std::lround(self.view_size.x) ||
+                 std::lround(mask->height()) !=
+                     std::lround(self.view_size.y))) {
+                throw py::value_error("Mask must be the same size as the canvas");
+            }
+            auto area = self.flood_fill(pos.x, pos.y, color, tolerance, mask);
+            return std::pair{area.pos(), area.size()};
+        },
+        "pos"_a, "color"_a, "tolerance"_a = 0, "mask"_a = nullptr,
+        "Flood fill starting from the given position with the specified color. Pixels whose color channels differ at most `tolerance` from the start pixel are filled. If `mask` is given, the area is filled in the mask image instead. Returns the top left corner and size of the filled area.");
+    cls.def(
+        "push_transform",
+        [](Context& self, std::optional<py::object> const& matrix,
+           Vec2f const& translate, float rotate, Vec2f const& scale) {
+            auto const ca = std::cos(static_cast<double>(rotate));
+            auto const sa = std::sin(static_cast<double>(rotate));
+            pix::Context::Transform m{ca * scale.x, -sa * scale.y, translate.x,
+                                      sa * scale.x, ca * scale.y,  translate.y,
+                                      0,            0,             1};
+            if (matrix) { m = pix::Context::multiply(m, to_transform(*matrix)); }
+            self.push_transform(m);
+        },
+        "matrix"_a = std::nullopt, "translate"_a = Vec2f{0, 0},
+        "rotate"_a = 0, "scale"_a = Vec2f{1, 1},
+        "Save the current transform and combine it with a new one. Everything drawn is first transformed by `matrix`, then scaled, rotated (in radians) and translated, and then transformed by the previous transform. `matrix` is a 2x3 affine or 3x3 projective matrix, given row by row.");
+    cls.def(
+        "pop_transform",
+        [](Context& self) {
+            if (!self.pop_transform()) {
+                throw py::index_error("pop_transform() without push_transform()");
+            }
+        },
+        "Go back to the transform that was current before the last `push_transform()`.");
+    cls.def(
+        "record",
+        [](Context const& self) {
+            check_main_thread("record()");
+            return std::make_shared<pix::DisplayList>(self);
         },
-        "pos"_a, "color"_a, "Flood fill starting from the given position with the specified color.");
-    cls.def("flush", &Context::flush, "Flush pixel operations");
+        "Create a display list with the same size and settings as this canvas, for use in a `with` statement. Shapes, polygons, images and text drawn into it are recorded instead of drawn, and can then be drawn any number of times using `replay()`. Recording must be done in the main thread.");
+    cls.def("replay", &Context::replay, "display_list"_a,
+            "offset"_a = Vec2f{0, 0},
+            "Draw everything recorded in `display_list`, moved by `offset`.");
+    cls.def("flush", &Context::flush,
+            "Draw everything that is waiting in pixel and shape batches");
     cls.def("to_image", &Context::to_image,
             "Create a new image from this canvas");
     cls.def(
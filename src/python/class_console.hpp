@@ -3,17 +3,20 @@
 #include "../full_console.hpp"
 #include "../machine.hpp"
 #include "../vec2.hpp"
+#include "buffer.hpp"
 
 #include "utf8.h"
 
 #include <optional>
 #include <pybind11/detail/common.h>
 #include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
 
 #include <filesystem>
 #include <memory>
 #include <string>
 #include <utility>
+#include <variant>
 
 namespace py = pybind11;
 namespace fs = std::filesystem;
@@ -51,11 +54,104 @@ make_console2(int32_t cols, int32_t rows,
     return fcon;
 }
 
+// A single color, or a buffer with one color per tile
+using ColorArg = std::variant<uint32_t, py::buffer>;
+
+inline void put_row(FullConsole& con, int y, int x, py::buffer const& tiles,
+                    std::optional<ColorArg> const& fg,
+                    std::optional<ColorArg> const& bg)
+{
+    UIntBuffer tile_data{tiles};
+    std::optional<UIntBuffer> fg_data;
+    std::optional<UIntBuffer> bg_data;
+    uint32_t fg_color = con.fg;
+    uint32_t bg_color = con.bg;
+
+    auto get_colors = [&](std::optional<ColorArg> const& arg,
+                          std::optional<UIntBuffer>& data,
+                          uint32_t& color) -> std::span<const uint32_t> {
+        if (arg.has_value()) {
+            if (auto const* c = std::get_if<uint32_t>(&*arg)) {
+                color = *c;
+            } else {
+                data.emplace(std::get<py::buffer>(*arg));
+                if (data->size() < tile_data.size()) {
+                    throw py::value_error(
+                        "Color buffer must have one color per tile");
+                }
+                return data->data;
+            }
+        }
+        return {&color, 1};
+    };
+    auto fgs = get_colors(fg, fg_data, fg_color);
+    auto bgs = get_colors(bg, bg_data, bg_color);
+    con.put_row(x, y, tile_data.data, fgs, bgs);
+}
+
+inline void set_region(FullConsole& con, int x, int y, int w, int h,
+                       py::buffer const& data)
+{
+    if (w <= 0 || h <= 0) { return; }
+    UIntBuffer tiles{data};
+    if (tiles.size() < static_cast<size_t>(w) * h * 3) {
+        throw py::value_error("Buffer must hold w * h * 3 values");
+    }
+    con.set_region(x, y, w, h, tiles.data);
+}
+
+// Exports the cells of a console. Views of a console are views of one of
+// these, so it lives as long as they do, and the console can tell that
+// views of it are alive.
+class ConsoleCells
+{
+    std::shared_ptr<FullConsole> console;
+
+public:
+    explicit ConsoleCells(std::shared_ptr<FullConsole> con)
+        : console{std::move(con)}
+    {
+        console->add_cell_view();
+    }
+    ConsoleCells(ConsoleCells const&) = delete;
+    ConsoleCells& operator=(ConsoleCells const&) = delete;
+    ~ConsoleCells() { console->release_cell_view(); }
+
+    [[nodiscard]] py::buffer_info buffer_info() const
+    {
+        auto [cols, rows] = console->get_size();
+        return {console->get_cells(),
+                sizeof(uint32_t),
+                py::format_descriptor<uint32_t>::format(),
+                3,
+                {rows, cols, 3},
+                {sizeof(uint32_t) * 3 * cols, sizeof(uint32_t) * 3,
+                 sizeof(uint32_t)}};
+    }
+};
+
+inline py::buffer_info console_buffer(FullConsole& con)
+{
+    auto self = py::cast(&con).cast<std::shared_ptr<FullConsole>>();
+    auto cells = py::cast(new ConsoleCells(self),
+                          py::return_value_policy::take_ownership);
+    // The returned info releases the view of `cells` when the view of the
+    // console is released
+    auto* view = new Py_buffer();
+    if (PyObject_GetBuffer(cells.ptr(), view, PyBUF_RECORDS) != 0) {
+        delete view;
+        throw py::error_already_set();
+    }
+    return py::buffer_info(view);
+}
+
 inline auto add_console_class(py::module_ const& mod)
 {
+    py::class_<ConsoleCells>(mod, "_ConsoleCells", py::buffer_protocol())
+        .def_buffer(&ConsoleCells::buffer_info);
     // Console
-    return py::class_<FullConsole, std::shared_ptr<FullConsole>>(mod,
-                                                                 "Console");
+    return py::class_<FullConsole, std::shared_ptr<FullConsole>>(
+        mod, "Console", py::buffer_protocol());
 }
 
 inline void add_console_functions(auto& cls)
@@ -73,6 +169,13 @@ inline void add_console_functions(auto& cls)
             "put", &FullConsole::put, "pos"_a, "tile"_a, "fg"_a = std::nullopt,
             "bg"_a = std::nullopt,
             "Put `tile` at given position, optionally setting a specific foreground and/or background color")
+        .def(
+            "put_row", &put_row, "y"_a, "x"_a, "tiles"_a, "fg"_a = std::nullopt,
+            "bg"_a = std::nullopt,
+            "Put a row of tiles starting at column `x` of row `y`, in one call. `tiles` can be any buffer of integers (`array`, `bytes`, numpy array etc). `fg` and `bg` can be a single color, or a buffer holding one color per tile. If not given, the current colors are used. Tiles outside the console are ignored.")
+        .def(
+            "set_region", &set_region, "x"_a, "y"_a, "w"_a, "h"_a, "tiles"_a,
+            "Set all tiles in the given rectangle from a buffer of integers, in the same `[tile0, fg0, bg0, tile1, fg1, bg1 ...]` format as `get_tiles()`, row by row.")
         .def("get", &FullConsole::get, "Get tile at position")
         .def_readwrite("cursor_color", &FullConsole::cursor_color, "Cursor color.")
         .def_readwrite("fg_color", &FullConsole::fg, "Foreground color.")
@@ -90,11 +193,41 @@ inline void add_console_functions(auto& cls)
         .def(
             "get_tiles", &FullConsole::get_tiles,
             "Get all the tiles and colors as an array of ints. Format is: `[tile0, fg0, bg0, tile1, fg1, bg1 ...]` etc.")
-        .def("set_tiles", &FullConsole::set_tiles, "tiles"_a,
-             "Set tiles from an array of ints.")
+        .def(
+            "set_tiles",
+            [](FullConsole& con, py::buffer const& tiles) {
+                UIntBuffer data{tiles};
+                con.set_tiles(data.data);
+            },
+            "tiles"_a,
+            "Set tiles from a buffer of ints, in the same format as `get_tiles()`.")
+        .def(
+            "set_tiles",
+            [](FullConsole& con, std::vector<uint32_t> const& tiles) {
+                con.set_tiles(tiles);
+            },
+            "tiles"_a, "Set tiles from an array of ints.")
+        .def_buffer(&console_buffer)
+        .def(
+            "mark_dirty", &FullConsole::mark_dirty,
+            "Update the console after its tiles were changed through the buffer protocol.")
         .def("clear", &FullConsole::clear, "Clear the console.")
+        .def(
+            "scroll",
+            [](FullConsole& con, int dy, int dx) {
+                if (con.has_cell_views()) {
+                    throw py::buffer_error(
+                        "Can not scroll while views of the console exist");
+                }
+                con.scroll(dy, dx);
+            },
+            "dy"_a, "dx"_a = 0,
+            "Move the contents of the console `dy` rows down and `dx` columns right. Negative values scroll up/left. Scrolling wraps around, so tiles scrolled out on one edge come back in on the opposite edge. Vertical scrolling only moves the start row, and does not copy or upload any tiles. Raises `BufferError` while views from the buffer protocol exist.")
         .def("set_color", &FullConsole::set_color, "fg"_a, "bg"_a,
              "Set the default colors used when putting/writing to the console.")
+        .def_property_readonly(
+            "bytes_uploaded", &FullConsole::get_bytes_uploaded,
+            "Number of bytes uploaded to the GPU the last time the console was drawn. Only rows that changed are uploaded.")
         .def_property_readonly("grid_size", &FullConsole::get_size,
                                "Get number cols and rows.")
         .def_property_readonly("tile_size", &FullConsole::get_tile_size,
@@ -142,5 +275,6 @@ inline void add_console_functions(auto& cls)
         .def(
             "colorize_section", &FullConsole::colorize, "x"_a, "y"_a, "width"_a,
             "Colorize the given area with the current foreground and background color, without changing the characters")
-        .doc() = "A console is a 2D grid of tiles that can be rendered.";
+        .doc() =
+        "A console is a 2D grid of tiles that can be rendered.\n\nThe console supports the buffer protocol, so `memoryview(console)` or `numpy.asarray(console)` gives direct access to the tiles as a `rows * cols * 3` array of `[tile, fg, bg]` values. Call `mark_dirty()` after modifying it. Views stay valid when writing scrolls the console, but `scroll()` raises `BufferError` while a view exists.";
 }
@@ -0,0 +1,39 @@
+#pragma once
+
+#include "../display_list.hpp"
+#include "threads.hpp"
+
+#include <pybind11/pybind11.h>
+
+#include <memory>
+
+namespace py = pybind11;
+
+inline void add_display_list_class(py::module_ const& mod)
+{
+    using namespace pybind11::literals;
+    using pix::DisplayList;
+
+    auto c =
+        py::class_<DisplayList, pix::Context, std::shared_ptr<DisplayList>>(
+            mod, "DisplayList")
+            .def(py::init([](pix::Context const& canvas) {
+                     check_main_thread("DisplayList()");
+                     return std::make_shared<DisplayList>(canvas);
+                 }),
+                 "canvas"_a,
+                 "Start recording, with the same size and settings as `canvas`.")
+            .def("__enter__", [](DisplayList& self) -> DisplayList& {
+                return self;
+            }, py::return_value_policy::reference)
+            .def("__exit__",
+                 [](DisplayList& self, py::args const&) { self.finish(); })
+            .def("finish", &DisplayList::finish,
+                 "Stop recording. Drawing into the list after this is an error.")
+            .def_property_readonly(
+                "command_count",
+                [](DisplayList& self) { return self.get_commands().size(); },
+                "Number of draw calls needed to replay the list.");
+    c.doc() =
+        "A canvas that records what is drawn into it, so it can be drawn any number of times using `Canvas.replay()`. Geometry is generated while recording, and uploaded to the GPU on the first replay. Recording must be done in the main thread. Shapes, polygons, images, text from a `TileSet`, `clear()` and other display lists can be recorded; drawing meshes, consoles or pixel surfaces and reading or writing pixels raise an exception.";
+}
@@ -3,13 +3,17 @@
 #include "../font.hpp"
 #include "../gl/texture.hpp"
 #include "../image.hpp"
+#include "../text_cache.hpp"
+#include "../utf8.h"
 #include "../vec2.hpp"
 
 // #include <pybind11/detail/common.h>
 #include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
 
 #include <memory>
 #include <string>
+#include <vector>
 
 namespace py = pybind11;
 
@@ -20,20 +24,47 @@ inline Vec2f text_size(FreetypeFont& font, std::string const& text, int size)
     return Vec2f(w, h);
 }
 
-inline pix::ImageView text_to_image(FreetypeFont& font, std::string const& text,
-                                    int size, uint32_t color)
+inline std::vector<int> prefix_widths(FreetypeFont& font,
+                                      std::string const& text, int size)
+{
+    font.set_pixel_size(size);
+    return font.prefix_widths(utf8::utf8_decode(text));
+}
+
+inline std::pair<pix::ImageView, size_t>
+render_text_image(FreetypeFont& font, std::string const& text, int size,
+                  uint32_t color)
 {
     font.set_pixel_size(size);
     auto [w, h] = font.text_size(text);
     pix::Image img(w, h);
-    color = ((color & 0x0000ff00) << 16) | (color & 0xff0000) |
-            ((color & 0xff000000) >> 16);
-    font.render_text(text, reinterpret_cast<uint32_t*>(img.ptr), color,
-                     img.width, img.width, img.height);
+    auto c = ((color & 0x0000ff00) << 16) | (color & 0xff0000) |
+             ((color & 0xff000000) >> 16);
+    font.render_text(text, reinterpret_cast<uint32_t*>(img.ptr), c, img.width,
+                     img.width, img.height);
     img.flip();
     auto tex = std::make_shared<gl::Texture>(img.width, img.height, img.ptr,
                                              GL_RGBA, img.format);
-    return pix::ImageView{gl::TexRef{tex}};
+    return {pix::ImageView{gl::TexRef{tex}}, static_cast<size_t>(w) * h * 4};
+}
+
+inline pix::ImageView text_to_image(FreetypeFont& font, std::string const& text,
+                                    int size, uint32_t color, bool cached)
+{
+    // Cached images share their texture, so only hand them out on request
+    if (!cached) { return render_text_image(font, text, size, color).first; }
+    return TextImageCache::instance().get(
+        {font.id, size, color, text},
+        [&] { return render_text_image(font, text, size, color); });
+}
+
+inline py::dict image_cache_info()
+{
+    using namespace pybind11::literals;
+    auto const& cache = TextImageCache::instance();
+    return py::dict("hits"_a = cache.hits, "misses"_a = cache.misses,
+                    "images"_a = cache.size(), "bytes"_a = cache.bytes,
+                    "max_bytes"_a = cache.max_bytes);
 }
 
 inline std::shared_ptr<FreetypeFont> make_font(std::string const& font_name)
@@ -49,9 +80,24 @@ inline auto add_font_class(py::module_ const& mod)
              "Create a font from a TTF file.")
         .def("text_size", &text_size, py::arg("text"), "size"_a,
              "Return the size (bounding rectangle) of the given text.")
+        .def("prefix_widths", &prefix_widths, "text"_a, "size"_a,
+             "Return the width of every prefix of `text`, so that element `i` is the width of `text[:i]`. Much faster than calling `text_size()` repeatedly.")
         .def("make_image", &text_to_image, py::arg("text"), "size"_a,
-             "color"_a = 0xffffffff,
-             "Create an image containing the given text.")
+             "color"_a = 0xffffffff, "cached"_a = false,
+             "Create an image containing the given text. If `cached` is true, the image is kept in a cache and calling this again with the same arguments returns the same image, so do not draw into it.")
+        .def_static(
+            "set_image_cache_size",
+            [](size_t max_bytes) {
+                TextImageCache::instance().set_max_bytes(max_bytes);
+            },
+            "max_bytes"_a,
+            "Set the maximum number of bytes used by cached text images. Set to 0 to turn off caching.")
+        .def_static(
+            "clear_image_cache", [] { TextImageCache::instance().clear(); },
+            "Remove all cached text images.")
+        .def_static(
+            "image_cache_info", &image_cache_info,
+            "Get a dict with `hits`, `misses`, `images`, `bytes` and `max_bytes` for the text image cache.")
         .def_readonly_static("UNSCII_FONT", &FreetypeFont::unscii,
                              "Get a reference to the built in unscii font.")
         .doc() =
@@ -7,6 +7,8 @@
 // #include <pybind11/detail/common.h>
 #include <pybind11/pybind11.h>
 
+#include <cmath>
+#include <cstring>
 #include <memory>
 
 namespace py = pybind11;
@@ -14,16 +16,18 @@ namespace py = pybind11;
 inline std::vector<pix::ImageView> split_wh(pix::ImageView img, int cols,
                                             int rows, int w, int h)
 {
-    if (cols < 0) { cols = static_cast<int>(img.width() / w); }
-    if (rows < 0) { rows = static_cast<int>(img.height() / h); }
+    // UVs are floats, so the size of a view into a large texture can be a
+    // tiny bit off
+    if (cols < 0) { cols = static_cast<int>(img.width() / w + 0.001); }
+    if (rows < 0) { rows = static_cast<int>(img.height() / h + 0.001); }
     return img.split(cols, rows);
 }
 
 inline std::vector<pix::ImageView> split_size(pix::ImageView img,
                                               Vec2f const& size)
 {
-    auto cols = img.width() / size.x;
-    auto rows = img.height() / size.y;
+    auto cols = img.width() / size.x + 0.001;
+    auto rows = img.height() / size.y + 0.001;
     return img.split(static_cast<int>(cols), static_cast<int>(rows));
 }
 
@@ -52,6 +56,65 @@ inline pix::ImageView crop(pix::ImageView img, std::optional<Vec2f> xy_,
     return img.crop(xy.x, xy.y, size.x, size.y);
 }
 
+// Read the pixels of the image into a (height, width, 4) RGBA memoryview,
+// top row first.
+inline py::object read_pixels(pix::ImageView& img)
+{
+    img.flush();
+    auto const& tex = img.get_tex();
+    auto w = static_cast<size_t>(std::lround(tex.width()));
+    auto h = static_cast<size_t>(std::lround(tex.height()));
+    auto pixels = tex.tex->read_pixels(
+        static_cast<int>(std::lround(tex.x())),
+        static_cast<int>(std::lround(tex.y())), static_cast<int>(w),
+        static_cast<int>(h));
+    auto stride = w * 4;
+    py::bytearray result{nullptr, h * stride};
+    auto* target = PyByteArray_AsString(result.ptr());
+    // Texture rows are stored bottom up
+    for (size_t y = 0; y < h; y++) {
+        std::memcpy(target + y * stride, &pixels[(h - 1 - y) * stride],
+                    stride);
+    }
+    return py::memoryview(result).attr("cast")("B", py::make_tuple(h, w, 4));
+}
+
+// Upload a (height, width, 4) RGBA buffer into the image at `xy`. Rows may be
+// strided, so slices of larger arrays can be uploaded directly.
+inline void write_pixels(pix::ImageView& img, py::buffer const& pixels,
+                         Vec2i const& xy)
+{
+    auto info = pixels.request();
+    if (info.ndim != 3 || info.shape[2] != 4 || info.itemsize != 1) {
+        throw py::value_error(
+            "Pixels must be a (height, width, 4) buffer of bytes");
+    }
+    if (info.strides[2] != 1 || info.strides[1] != 4) {
+        throw py::value_error("Pixel rows must be contiguous");
+    }
+    auto h = static_cast<int>(info.shape[0]);
+    auto w = static_cast<int>(info.shape[1]);
+    if (xy.x < 0 || xy.y < 0 || xy.x + w > std::lround(img.width()) ||
+        xy.y + h > std::lround(img.height())) {
+        throw py::value_error("Pixels do not fit inside the image");
+    }
+    if (w == 0 || h == 0) { return; }
+    img.flush();
+
+    auto stride = static_cast<size_t>(w) * 4;
+    std::vector<uint32_t> flipped(static_cast<size_t>(w) * h);
+    auto const* source = static_cast<char const*>(info.ptr);
+    auto* target = reinterpret_cast<char*>(flipped.data());
+    for (int y = 0; y < h; y++) {
+        std::memcpy(target + (h - 1 - y) * stride,
+                    source + y * info.strides[0], stride);
+    }
+    auto const& tex = img.get_tex();
+    auto x = static_cast<int>(std::lround(tex.x())) + xy.x;
+    auto y = static_cast<int>(std::lround(tex.y())) + xy.y;
+    tex.tex->update(x, tex.tex->height - y - h, w, h, flipped.data());
+}
+
 inline auto add_image_class(py::module_ const& mod, auto ctx_class)
 {
     using namespace pybind11::literals;
@@ -79,10 +142,16 @@ inline auto add_image_class(py::module_ const& mod, auto ctx_class)
                                                           &length)) {
                         throw std::runtime_error("Failed to extract bytes");
                     }
+                    img.flush();
                     img.get_tex().tex->update((uint32_t*)buffer);
                 },
                 "pixels"_a,
                 "Update the texture with a raw buffer that must fit the texture format.")
+            .def("read_pixels", &read_pixels,
+                 "Read the pixels of the image into a (height, width, 4) memoryview of RGBA bytes. Wrap with `numpy.asarray()` to get an array without copying.")
+            .def("write_pixels", &write_pixels, "pixels"_a,
+                 "xy"_a = Vec2i{0, 0},
+                 "Write a (height, width, 4) buffer of RGBA bytes (like a numpy uint8 array) into the image, with its top left corner at `xy`.")
             .def("set_texture_filter", &pix::ImageView::set_texture_filter,
                  "min"_a, "max"_a,
                  "Set whether the texture should apply linear filtering.")
@@ -0,0 +1,50 @@
+#pragma once
+
+#include "../mesh.hpp"
+#include "../vec2.hpp"
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+#include <memory>
+#include <vector>
+
+namespace py = pybind11;
+
+inline void add_mesh_class(py::module_ const& mod)
+{
+    using namespace pybind11::literals;
+    using pix::Mesh;
+
+    auto check_size = [](size_t count) {
+        if (count > Mesh::max_vertices) {
+            throw py::value_error("Mesh can have at most 65536 vertices");
+        }
+    };
+
+    auto c =
+        py::class_<Mesh, std::shared_ptr<Mesh>>(mod, "Mesh")
+            .def(py::init([check_size](std::vector<Vec2f> const& points,
+                                       bool convex) {
+                     check_size(points.size());
+                     return std::make_shared<Mesh>(points, convex);
+                 }),
+                 "points"_a, "convex"_a = false,
+                 "Create a mesh from the points of a polygon. If convex is `true` the polygon is used as a simple triangle fan, otherwise it is split into triangles using the ear-clipping method.")
+            .def(py::init([check_size](
+                              std::vector<std::vector<Vec2f>> const& contours) {
+                     // Tesselating can add vertices where edges cross, so
+                     // check the result
+                     auto mesh = std::make_shared<Mesh>(contours);
+                     check_size(mesh->vertex_count());
+                     return mesh;
+                 }),
+                 py::kw_only(), "contours"_a,
+                 "Create a mesh from a complex polygon that can consist of holes.")
+            .def_property_readonly(
+                "triangle_count",
+                [](Mesh const& self) { return self.index_count() / 3; },
+                "Number of triangles in the mesh.");
+    c.doc() =
+        "Filled polygon geometry that is split into triangles once and kept on the GPU, so it can be drawn many times at different positions, scales and rotations.";
+}
@@ -0,0 +1,96 @@
+#pragma once
+
+#include "../font.hpp"
+#include "../image.hpp"
+#include "../loader.hpp"
+#include "threads.hpp"
+
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+#include <pybind11/stl/filesystem.h>
+
+#include <filesystem>
+#include <memory>
+#include <string>
+#include <vector>
+
+namespace py = pybind11;
+
+template <typename T>
+void add_pending_class(py::module_ const& mod, char const* name,
+                       char const* what)
+{
+    using Pending = pix::Pending<T>;
+    auto c = py::class_<Pending, std::shared_ptr<Pending>>(mod, name)
+                 .def("done", &Pending::is_done,
+                      ("True when the " + std::string(what) +
+                       " is ready, which happens in `run_loop()` after it "
+                       "has been loaded.")
+                          .c_str())
+                 .def(
+                     "result",
+                     [](Pending& self) {
+                         // Waiting finishes loads, which needs the GL context
+                         check_main_thread("result()");
+                         py::gil_scoped_release release;
+                         return self.get();
+                     },
+                     ("Get the " + std::string(what) +
+                      ", first waiting for it to load if it is not ready. "
+                      "Raises the error if loading failed. Main thread only, "
+                      "use `done()` to check for it from other threads.")
+                         .c_str());
+    c.doc() = ("A " + std::string(what) +
+               " that is being loaded in the background. Loading does not "
+               "block the main thread until `result()` is called.")
+                  .c_str();
+}
+
+inline std::shared_ptr<pix::Pending<pix::ImageView>>
+load_png_async(std::filesystem::path const& file_name)
+{
+    return pix::load_async<pix::ImageView>(
+        [file_name] {
+            auto image = pix::load_png_image(file_name);
+            image.flip();
+            return image;
+        },
+        [](pix::Image const& image) { return pix::upload_image(image); });
+}
+
+inline std::shared_ptr<pix::Pending<std::shared_ptr<FreetypeFont>>>
+load_font_async(std::filesystem::path const& name, int size)
+{
+    return pix::load_async<std::shared_ptr<FreetypeFont>>(
+        [name] { return FreetypeFont::read_file(name.string().c_str()); },
+        [size](std::vector<unsigned char>&& data) {
+            return std::make_shared<FreetypeFont>(std::move(data), size);
+        });
+}
+
+inline void add_pending_classes(py::module_& mod)
+{
+    using namespace pybind11::literals;
+    namespace fs = std::filesystem;
+
+    add_pending_class<pix::ImageView>(mod, "PendingImage", "image");
+    add_pending_class<std::shared_ptr<FreetypeFont>>(mod, "PendingFont",
+                                                     "font");
+
+    mod.def("load_png_async", &load_png_async, "file_name"_a,
+            "Start loading a png file in the background. The image is decoded in another thread, and uploaded to the GPU in the next `run_loop()`.");
+    mod.def(
+        "load_images",
+        [](std::vector<fs::path> const& file_names) {
+            std::vector<std::shared_ptr<pix::Pending<pix::ImageView>>> result;
+            result.reserve(file_names.size());
+            for (auto const& file_name : file_names) {
+                result.push_back(load_png_async(file_name));
+            }
+            return result;
+        },
+        "file_names"_a,
+        "Start loading png files in the background, decoding them in parallel. Returns a `PendingImage` for every file.");
+    mod.def("load_font_async", &load_font_async, "name"_a, "size"_a = 0,
+            "Start loading a TTF font in the background. The font becomes ready in the next `run_loop()`.");
+}
@@ -0,0 +1,83 @@
+#pragma once
+
+#include "../pixel_surface.hpp"
+#include "../vec2.hpp"
+
+#include <pybind11/pybind11.h>
+
+#include <memory>
+#include <utility>
+
+namespace py = pybind11;
+
+inline void add_pixel_surface_class(py::module_ const& mod)
+{
+    using namespace pybind11::literals;
+    using pix::PixelSurface;
+    const char* doc;
+
+    auto c =
+        py::class_<PixelSurface, std::shared_ptr<PixelSurface>>(mod,
+                                                               "PixelSurface")
+            .def(py::init<int, int, uint32_t>(), "width"_a, "height"_a,
+                 "color"_a = 0,
+                 doc = "Create a surface of the given size, filled with `color`.")
+            .def(py::init([](Vec2i const& size, uint32_t color) {
+                     return std::make_shared<PixelSurface>(size.x, size.y,
+                                                           color);
+                 }),
+                 "size"_a, "color"_a = 0, doc)
+            .def(py::init([](pix::ImageView& image) {
+                     image.flush();
+                     return std::make_shared<PixelSurface>(image);
+                 }),
+                 "image"_a, "Create a surface holding a copy of `image`.")
+            .def(
+                "set_pixel",
+                [](PixelSurface& self, Vec2i const& pos, uint32_t color) {
+                    self.set_pixel(pos.x, pos.y, color);
+                },
+                "pos"_a, "color"_a, "Set the color of a pixel.")
+            .def(
+                "get_pixel",
+                [](PixelSurface const& self, Vec2i const& pos) {
+                    return self.get_pixel(pos.x, pos.y);
+                },
+                "pos"_a,
+                "Get the color of a pixel. Pixels outside the surface are 0.")
+            .def(
+                "flood_fill",
+                [](PixelSurface& self, Vec2i const& pos, uint32_t color,
+                   int tolerance, PixelSurface* mask) {
+                    if (mask != nullptr &&
+                        (mask->get_width() != self.get_width() ||
+                         mask->get_height() != self.get_height())) {
+                        throw py::value_error(
+                            "Mask must be the same size as the surface");
+                    }
+                    auto area = self.flood_fill(pos.x, pos.y, color,
+                                                tolerance, mask);
+                    return std::pair{area.pos(), area.size()};
+                },
+                "pos"_a, "color"_a, "tolerance"_a = 0, "mask"_a = nullptr,
+                "Fill the area of same colored pixels around `pos` with `color`. Pixels whose color channels differ at most `tolerance` from the start pixel are filled. If `mask` is given, the area is filled in the mask instead. Returns the top left corner and size of the filled area.")
+            .def("clear", &PixelSurface::clear, "color"_a = 0,
+                 "Fill the whole surface with `color`.")
+            .def_property_readonly(
+                "image", &PixelSurface::get_image,
+                py::return_value_policy::reference_internal,
+                "The surface as an image. Changed areas are uploaded to the texture first.")
+            .def_property_readonly("bytes_uploaded",
+                                   [](PixelSurface const& self) {
+                                       return self.bytes_uploaded;
+                                   },
+                                   "Number of bytes uploaded to the texture so far.")
+            .def_property_readonly(
+                "size",
+                [](PixelSurface const& self) {
+                    return Vec2i(self.get_width(), self.get_height());
+                },
+                "Size of the surface in pixels.");
+    c.doc() =
+        "A CPU side image for fast pixel access. Changes are kept in memory, and only the changed areas are uploaded to the GPU when the surface is drawn.";
+}
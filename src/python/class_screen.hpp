@@ -38,6 +38,8 @@ inline auto add_screen_class(py::module_ const& mod, auto ctx_class)
     screen.def_property_readonly(
         "frame_counter",
         [](pix::Screen const& screen) { return screen.frame_counter(); });
+    screen.def_readonly("draw_calls", &pix::Screen::draw_calls,
+                        "Number of draw calls made during the last frame.");
     screen.def_property_readonly(
         "seconds",
         [](pix::Screen const& screen) { return screen.get_time().seconds; },
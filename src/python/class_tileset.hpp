@@ -42,18 +42,16 @@ inline pix::ImageView get_image_for(std::shared_ptr<TileSet> self, int32_t tile)
     return self->get_texture_for_char(tile);
 }
 
-inline void render_chars(std::shared_ptr<TileSet> self,
-                         std::shared_ptr<pix::Screen> screen,
+inline void render_chars(std::shared_ptr<TileSet> self, pix::Context& screen,
                          std::string const& text, Vec2f pos, Vec2f size)
 {
-    self->render_chars(*screen, text, pos, size);
+    self->render_chars(screen, text, pos, size);
 };
 
-inline void render_chars2(std::shared_ptr<TileSet> self,
-                          std::shared_ptr<pix::Screen> screen,
+inline void render_chars2(std::shared_ptr<TileSet> self, pix::Context& screen,
                           std::string const& text, std::vector<Vec2f> points)
 {
-    self->render_chars(*screen, text, points);
+    self->render_chars(screen, text, points);
 };
 
 template <typename T>
@@ -93,8 +91,8 @@ inline void add_tileset_class(py::module_ const& mod)
             "Get the entire tileset image. Typically used with `save_png()` to check generated tileset.")
         .def(
             "get_image_for", &get_image_for, "tile"_a,
-            "Get the image for a specific tile. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. Will throw an exception if there is no room."
-            "for the new tile in the tile texture.")
+            "Get the image for a specific tile. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. The tile will never be evicted from the tileset. Will throw an exception if "
+            "there is no room for the new tile in the tile texture.")
         .def(
             "render_text", &render_chars, "screen"_a, "text"_a, "pos"_a,
             "size"_a = Vec2f{0, 0},
@@ -104,10 +102,10 @@ inline void add_tileset_class(py::module_ const& mod)
             "Render characters from the TileSet, each character using the next position from `points`, using the default tile size.")
         .def(
             "get_image_for", &TileSet::get_texture_for_char, "character"_a,
-            "Get the image for a specific character. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. Will throw an exception if there is no room for the new tile in the tile texture.")
+            "Get the image for a specific character. Use `copy_to()` on the image to redefine that tile with new graphics. Will allocate a new tile if necessary. The tile will never be evicted from the tileset. Will throw an exception if there is no room for the new tile in the tile texture.")
         .def_property_readonly("tile_size", [](TileSet const& ts) {
             return Vec2i(ts.char_width, ts.char_height);
         });
     ts.doc() =
-        "A tileset is a texture split up into tiles for rendering. It is used by the `Console` class but can also be used directly.";
+        "A tileset is a texture split up into tiles for rendering. It is used by the `Console` class but can also be used directly. Glyphs are rendered into the texture when first used, and when it is full the least recently used glyph is evicted to make room.";
 }
@@ -46,10 +46,45 @@ inline void add_treesitter_module(py::module_ const& mod)
     auto ts =
         py::class_<TreeSitter, std::shared_ptr<TreeSitter>>(mod, "TreeSitter")
             .def(py::init<>(), "Create an empty treesitter object.")
-            .def("set_source", &TreeSitter::set_source_utf8)
-            .def("set_source_utf16", &TreeSitter::set_source_utf16)
+            .def("set_source", &TreeSitter::set_source_utf8,
+                 "Parse UTF8 source. If `edit()` has been called since the "
+                 "last parse, only the edited parts are reparsed.")
+            .def("set_source_utf16",
+                 py::overload_cast<std::vector<uint16_t> const&>(
+                     &TreeSitter::set_source_utf16),
+                 "Parse UTF16 source. If `edit()` has been called since the "
+                 "last parse, only the edited parts are reparsed.")
+            .def(
+                "set_source_utf16",
+                [](TreeSitter& self, py::bytes const& source) {
+                    self.set_source_utf16(std::string(source));
+                },
+                "Parse UTF16 (little endian) source from a bytes object.")
+            .def("edit", &TreeSitter::edit, "start_byte"_a, "old_end_byte"_a,
+                 "new_end_byte"_a, "start"_a, "old_end"_a, "new_end"_a,
+                 "Tell the parser that the source has been edited, so the "
+                 "next `set_source` call can reuse the old tree. Points are "
+                 "`(column, row)` with columns in bytes, same as in "
+                 "`get_highlights()`.")
             .def("set_format", &TreeSitter::set_format)
             .def("dump_tree", &TreeSitter::dump_tree)
             .def("find_node", &TreeSitter::find_node)
-            .def("get_highlights", &TreeSitter::get_highlights);
+            .def("get_highlights",
+                 py::overload_cast<>(&TreeSitter::get_highlights))
+            .def(
+                "get_highlights",
+                [](TreeSitter& self, uint32_t row_start, uint32_t row_end) {
+                    auto result = self.get_highlights(row_start, row_end);
+                    auto array =
+                        py::module_::import("array").attr("array")("I");
+                    array.attr("frombytes")(py::bytes(
+                        reinterpret_cast<const char*>(result.data()),
+                        result.size() * sizeof(uint32_t)));
+                    return array;
+                },
+                "row_start"_a, "row_end"_a,
+                "Get highlights for nodes intersecting rows `row_start` to "
+                "`row_end` (exclusive). Only the part of the tree covering "
+                "these rows is visited. Returns a flat `array('I')` with 5 "
+                "values (col0, row0, col1, row1, color) per highlight.");
 }
@@ -0,0 +1,20 @@
+#pragma once
+
+#include <pybind11/pybind11.h>
+
+#include <stdexcept>
+#include <string>
+
+namespace py = pybind11;
+
+// Throw unless called from the Python main thread, for anything that needs
+// the GL context
+inline void check_main_thread(char const* what)
+{
+    auto threading = py::module_::import("threading");
+    if (!threading.attr("current_thread")().is(
+            threading.attr("main_thread")())) {
+        throw std::runtime_error(std::string(what) +
+                                 " can only be called from the main thread");
+    }
+}
@@ -20,8 +20,14 @@ public:
 
     int frame_counter() const { return display->get_time().frame_counter; }
 
+    // Number of draw calls made during the last frame
+    int draw_calls = 0;
+
     void swap()
     {
+        flush_batch();
+        draw_calls = gl::draw_calls;
+        gl::draw_calls = 0;
         if (log_fp) {
             fputs("swap\n", log_fp);
             fflush(log_fp);
@@ -0,0 +1,111 @@
+#pragma once
+
+#include "image_view.hpp"
+
+#include <cstddef>
+#include <cstdint>
+#include <functional>
+#include <list>
+#include <string>
+#include <unordered_map>
+
+// LRU cache of images created from text, so that drawing the same text
+// every frame does not create a new texture each time.
+template <typename Image> class BasicTextImageCache
+{
+public:
+    struct Key
+    {
+        uint32_t font_id;
+        int size;
+        uint32_t color;
+        std::string text;
+
+        bool operator==(Key const&) const = default;
+    };
+
+private:
+    struct KeyHash
+    {
+        size_t operator()(Key const& key) const
+        {
+            auto h = std::hash<std::string>{}(key.text);
+            h ^= std::hash<uint64_t>{}(
+                     (static_cast<uint64_t>(key.font_id) << 32) ^
+                     (static_cast<uint64_t>(key.size) << 24) ^ key.color) +
+                 0x9e3779b9 + (h << 6) + (h >> 2);
+            return h;
+        }
+    };
+
+    struct Entry
+    {
+        Key key;
+        Image image;
+        size_t bytes;
+    };
+
+    // Most recently used first
+    std::list<Entry> entries;
+    std::unordered_map<Key, typename std::list<Entry>::iterator, KeyHash>
+        index;
+
+    void evict_to(size_t limit)
+    {
+        while (bytes > limit && !entries.empty()) {
+            auto& last = entries.back();
+            bytes -= last.bytes;
+            index.erase(last.key);
+            entries.pop_back();
+        }
+    }
+
+public:
+    size_t max_bytes = 8 * 1024 * 1024;
+    size_t bytes = 0;
+    size_t hits = 0;
+    size_t misses = 0;
+
+    static BasicTextImageCache& instance()
+    {
+        static BasicTextImageCache cache;
+        return cache;
+    }
+
+    // Get the cached image for `key`, or call `create` to make it. `create`
+    // returns the image and its size in bytes.
+    template <typename F> Image get(Key const& key, F const& create)
+    {
+        auto it = index.find(key);
+        if (it != index.end()) {
+            hits++;
+            entries.splice(entries.begin(), entries, it->second);
+            return it->second->image;
+        }
+        misses++;
+        auto [image, image_bytes] = create();
+        if (image_bytes > max_bytes) { return image; }
+        evict_to(max_bytes - image_bytes);
+        entries.push_front({key, image, image_bytes});
+        index[key] = entries.begin();
+        bytes += image_bytes;
+        return image;
+    }
+
+    void set_max_bytes(size_t limit)
+    {
+        max_bytes = limit;
+        evict_to(limit);
+    }
+
+    [[nodiscard]] size_t size() const { return entries.size(); }
+
+    void clear()
+    {
+        entries.clear();
+        index.clear();
+        bytes = 0;
+    }
+};
+
+using TextImageCache = BasicTextImageCache<pix::ImageView>;
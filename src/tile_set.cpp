@@ -1,19 +1,26 @@
 #include "tile_set.hpp"
 
+#include "display_list.hpp"
 #include "font.hpp"
 #include "image_view.hpp"
 #include "utf8.h"
 
 #include <algorithm>
+#include <array>
+#include <cstdio>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
 
 static constexpr int align32(int val)
 {
     return (val + 3) & (~3);
 }
 
-void TileSet::add_char(char32_t c)
+bool TileSet::add_char(char32_t c)
 {
     auto pos = alloc_char(c);
+    if (!pos) { return false; }
 
     // Render character into texture
     // auto [fw, fh] = font_ptr->get_size(0x2588);
@@ -26,33 +33,60 @@ void TileSet::add_char(char32_t c)
 
     font_ptr->render_char(c, temp.data() + offs, 0xffffff00, char_width,
                           char_width - ox, char_height - oy);
-    tile_texture->update(pos.first, pos.second, char_width, char_height,
+    tile_texture->update(pos->first, pos->second, char_width, char_height,
                          temp.data());
+    return true;
 }
 
-std::pair<int, int> TileSet::alloc_char(char32_t c)
+std::optional<std::pair<int, int>> TileSet::alloc_char(char32_t c)
 {
-    if (next_pos.second >= (texture_height - char_height - gap)) {
-        throw font_exception("No room left in tileset");
-    }
-    auto cw = char_width + gap;
+    auto slot = next_slot < slot_count ? next_slot++ : evict();
+    if (slot < 0) { return std::nullopt; }
+    std::pair<int, int> pos{(slot % slots_per_row) * slot_width,
+                            (slot / slots_per_row) * slot_height};
     auto fx = texture_width / 256;
     auto fy = texture_height / 256;
-    int x = next_pos.first / fx;
-    int y = next_pos.second / fy;
-    auto uv = x | (y << 8);
+    auto uv = (pos.first / fx) | ((pos.second / fy) << 8);
     char_uvs[c] = uv;
     reverse_chars[uv] = c;
     if (c <= 0xffff) { char_array[c] = uv; }
+    slot_chars[slot] = c;
+    slot_used[slot] = ++use_counter;
+    return pos;
+}
 
-    auto res = next_pos;
-    next_pos.first += align32(char_width + gap);
-    if (next_pos.first >= (texture_width - cw - gap)) {
-        next_pos.first = 0;
-        next_pos.second += align32(char_height + gap);
+int TileSet::evict()
+{
+    // The least recently used glyph that nothing shows
+    int slot = -1;
+    for (int i = 0; i < slot_count; i++) {
+        if (slot_used[i] != pinned && slot_refs[i] == 0 &&
+            (slot < 0 || slot_used[i] < slot_used[slot])) {
+            slot = i;
+        }
     }
-    return res;
+    if (slot < 0) { return -1; }
+    auto c = slot_chars[slot];
+    reverse_chars.erase(char_uvs[c]);
+    char_uvs.erase(c);
+    if (c <= 0xffff) { char_array[c] = 0xffffffff; }
+    return slot;
+}
+
+std::pair<int, int> TileSet::uv_pos(uint32_t uv) const
+{
+    auto fx = texture_width / 256;
+    auto fy = texture_height / 256;
+    return {static_cast<int>(uv & 0xff) * fx,
+            static_cast<int>((uv >> 8) & 0xff) * fy};
+}
+
+int TileSet::uv_slot(uint32_t uv) const
+{
+    auto [x, y] = uv_pos(uv);
+    return (y / slot_height) * slots_per_row + x / slot_width;
 }
+
 char32_t TileSet::get_char_from_uv(uint32_t uv)
 {
     return reverse_chars[uv];
@@ -83,47 +117,167 @@ TileSet::TileSet(std::pair<int, int> tile_size)
     init();
 }
 
+std::string TileSet::cache_file() const
+{
+    if (cache_dir.empty() || !font_ptr) { return ""; }
+    std::array<char, 128> name{};
+    std::snprintf(name.data(), name.size(), "%016llx-%d-%dx%d-%dx%d.tiles",
+                  static_cast<unsigned long long>(font_ptr->get_hash()),
+                  pixel_size, char_width, char_height, distance.x,
+                  distance.y);
+    return (std::filesystem::path(cache_dir) / name.data()).string();
+}
+
+namespace {
+struct CacheHeader
+{
+    uint32_t magic = 0x53545850; // "PXTS"
+    uint32_t version = 1;
+    int32_t texture_width = 0;
+    int32_t texture_height = 0;
+    int32_t pixel_size = 0;
+    int32_t char_width = 0;
+    int32_t char_height = 0;
+    int32_t count = 0;
+};
+} // namespace
+
+bool TileSet::load_cache(std::string const& file_name,
+                         std::vector<uint32_t>& data)
+{
+    std::ifstream file{file_name, std::ios::binary | std::ios::ate};
+    if (!file) { return false; }
+    std::vector<char> contents(file.tellg());
+    file.seekg(0);
+    file.read(contents.data(), static_cast<std::streamsize>(contents.size()));
+
+    CacheHeader header;
+    if (!file || contents.size() < sizeof(header)) { return false; }
+    std::memcpy(&header, contents.data(), sizeof(header));
+    if (header.magic != CacheHeader{}.magic ||
+        header.version != CacheHeader{}.version ||
+        header.texture_width != texture_width ||
+        header.texture_height != texture_height || header.count < 0) {
+        return false;
+    }
+    pixel_size = header.pixel_size;
+    char_width = header.char_width;
+    char_height = header.char_height;
+    init_slots();
+    if (header.count > slot_count) { return false; }
+    auto pixels = static_cast<size_t>(used_height(header.count)) *
+                  texture_width;
+    auto size = sizeof(header) + header.count * sizeof(uint32_t) +
+                pixels * sizeof(uint32_t);
+    if (contents.size() != size) { return false; }
+
+    auto const* chars = contents.data() + sizeof(header);
+    for (int i = 0; i < header.count; i++) {
+        uint32_t c = 0;
+        std::memcpy(&c, chars + i * sizeof(uint32_t), sizeof(uint32_t));
+        alloc_char(c);
+    }
+    std::memcpy(data.data(), chars + header.count * sizeof(uint32_t),
+                pixels * sizeof(uint32_t));
+    return true;
+}
+
+void TileSet::save_cache(std::string const& file_name,
+                         std::vector<uint32_t> const& data) const
+{
+    std::error_code ec;
+    std::filesystem::create_directories(cache_dir, ec);
+    CacheHeader header{.texture_width = texture_width,
+                       .texture_height = texture_height,
+                       .pixel_size = pixel_size,
+                       .char_width = char_width,
+                       .char_height = char_height,
+                       .count = next_slot};
+    // Write to a temporary file first, so a concurrent reader never sees a
+    // partially written cache
+    auto temp_name = file_name + ".tmp";
+    {
+        std::ofstream file{temp_name, std::ios::binary};
+        file.write(reinterpret_cast<const char*>(&header), sizeof(header));
+        file.write(reinterpret_cast<const char*>(slot_chars.data()),
+                   static_cast<std::streamsize>(next_slot * sizeof(char32_t)));
+        file.write(reinterpret_cast<const char*>(data.data()),
+                   static_cast<std::streamsize>(used_height(next_slot) *
+                                                texture_width *
+                                                sizeof(uint32_t)));
+        if (!file) { return; }
+    }
+    std::filesystem::rename(temp_name, file_name, ec);
+}
+
+void TileSet::init_slots()
+{
+    slot_width = align32(char_width + gap);
+    slot_height = align32(char_height + gap);
+    slots_per_row = texture_width / slot_width;
+    slot_count = slots_per_row * (texture_height / slot_height);
+    slot_chars.resize(slot_count);
+    slot_used.resize(slot_count);
+    slot_refs.resize(slot_count);
+}
+
+int TileSet::used_height(int slots) const
+{
+    return (slots + slots_per_row - 1) / slots_per_row * slot_height;
+}
+
 void TileSet::init()
 {
     std::vector<uint32_t> data;
     data.resize(texture_width * texture_height);
-    if (char_width <= 0) {
-        if (pixel_size < 0) { throw font_exception("Must specify size"); }
-        font_ptr->set_pixel_size(pixel_size);
-        if (char_width <= 0 || char_height <= 0) {
-            std::tie(char_width, char_height) = font_ptr->get_mono_size();
-            //printf("%d %d\n", char_width, char_height);
+    std::ranges::fill(char_array, 0xffffffff);
+
+    auto cache_name = cache_file();
+    if (cache_name.empty() || !load_cache(cache_name, data)) {
+        if (char_width <= 0) {
+            if (pixel_size < 0) { throw font_exception("Must specify size"); }
+            font_ptr->set_pixel_size(pixel_size);
+            if (char_width <= 0 || char_height <= 0) {
+                std::tie(char_width, char_height) = font_ptr->get_mono_size();
+                //printf("%d %d\n", char_width, char_height);
+            }
         }
-    }
-    if (pixel_size == -1) {
-        int s = char_height * 2;
-        // Start with large size, loop until it fits
-        while (true) {
-            font_ptr->set_pixel_size(s);
-            auto [w, h] = font_ptr->get_mono_size();
-            if (w <= char_width && h <= char_height) {
-                pixel_size = s;
-                break;
+        if (pixel_size == -1) {
+            int s = char_height * 2;
+            // Start with large size, loop until it fits
+            while (true) {
+                font_ptr->set_pixel_size(s);
+                auto [w, h] = font_ptr->get_mono_size();
+                if (w <= char_width && h <= char_height) {
+                    pixel_size = s;
+                    break;
+                }
+                s--;
             }
-            s--;
         }
+        char_width += distance.x;
+        char_height += distance.y;
+        init_slots();
+
+        if (font_ptr) {
+            // Render straight into the texture data, so it is uploaded once
+            font_ptr->set_pixel_size(pixel_size);
+            for (char32_t c = 0x20; c <= 0x7f; c++) {
+                // Nothing is pinned yet, so there is always a slot
+                auto [x, y] = *alloc_char(c);
+                font_ptr->render_char(c, &data[x + y * texture_width],
+                                      0xffffff00, texture_width, char_width,
+                                      char_height);
+            }
+        }
+        if (!cache_name.empty()) { save_cache(cache_name, data); }
     }
     font_ptr->set_pixel_size(pixel_size);
-    char_width += distance.x;
-    char_height += distance.y;
-
-    std::ranges::fill(data, 0);
 
     tile_texture =
         std::make_shared<gl::Texture>(texture_width, texture_height, data);
-    std::ranges::fill(char_array, 0xffffffff);
-    if (font_ptr) {
-        font_ptr->set_pixel_size(pixel_size);
-        for (char32_t c = 0x20; c <= 0x7f; c++) {
-            add_char(c);
-        }
-    }
-    std::ranges::fill(data, 0xff);
+    // Keep ASCII around so the common case never needs re-rendering
+    std::fill_n(slot_used.begin(), next_slot, pinned);
     tile_texture->bind(0);
 }
 
@@ -135,43 +289,43 @@ std::pair<float, float> TileSet::get_uvscale() const
 }
 
 uint32_t TileSet::get_offset(char32_t c)
+{
+    return find_offset(c).value_or(missing_offset());
+}
+
+std::optional<uint32_t> TileSet::find_offset(char32_t c)
 {
     font_ptr->set_pixel_size(pixel_size);
     if (c <= 0xffff) {
         auto res = char_array[c];
         if (res == 0xffffffff) {
-            add_char(c);
-            res = char_array[c];
+            if (!add_char(c)) { return std::nullopt; }
+            return char_array[c];
         }
+        touch(res);
         return res;
     }
     auto it = char_uvs.find(c);
     if (it == char_uvs.end()) {
-        add_char(c);
-        it = char_uvs.find(c);
+        if (!add_char(c)) { return std::nullopt; }
+        return char_uvs[c];
     }
+    touch(it->second);
     return it->second;
 }
+
+uint32_t TileSet::missing_offset() const
+{
+    auto uv = char_array['?'];
+    return uv == 0xffffffff ? 0 : uv;
+}
 // std::pair<int, int> TileSet::get_size() const
 // {
 //     return font_ptr->get_size();
 // }
 
-pix::ImageView TileSet::get_texture_for_char(char32_t c)
+pix::ImageView TileSet::image_at(std::pair<int, int> pos) const
 {
-    auto fx = texture_width / 256;
-    auto fy = texture_height / 256;
-
-    std::pair<int, int> pos;
-    auto it = char_uvs.find(c);
-    if (it == char_uvs.end()) {
-        pos = alloc_char(c);
-    } else {
-        auto cx = (it->second & 0xff) * fx;
-        auto cy = (it->second >> 8) * fy;
-        pos = {cx, cy};
-    }
-
     auto dx = 1.0 / texture_width;
     auto dy = 1.0 / texture_height;
 
@@ -185,6 +339,44 @@ pix::ImageView TileSet::get_texture_for_char(char32_t c)
     return tr;
 }
 
+pix::ImageView TileSet::get_texture_for_char(char32_t c)
+{
+    std::pair<int, int> pos;
+    auto it = char_uvs.find(c);
+    if (it == char_uvs.end()) {
+        auto slot = alloc_char(c);
+        if (!slot) { throw font_exception("No room left in tileset"); }
+        pos = *slot;
+        // The slot may have held an evicted glyph
+        std::vector<uint32_t> blank(char_width * char_height);
+        tile_texture->update(pos.first, pos.second, char_width, char_height,
+                             blank.data());
+    } else {
+        pos = uv_pos(it->second);
+    }
+    slot_used[uv_slot(char_uvs[c])] = pinned;
+    return image_at(pos);
+}
+
+pix::ImageView TileSet::get_tile_image(char32_t c)
+{
+    return image_at(uv_pos(get_offset(c)));
+}
+
+std::array<float, 8> TileSet::glyph_uvs(pix::Context& context, char32_t c)
+{
+    auto uv = get_offset(c);
+    if (auto* list = context.get_recording()) {
+        // The recorded uvs must stay valid for every replay
+        add_ref(uv);
+        list->hold(std::shared_ptr<void>(
+            nullptr, [weak = weak_from_this(), uv](void*) {
+                if (auto ts = weak.lock()) { ts->release(uv); }
+            }));
+    }
+    return image_at(uv_pos(uv)).uvs();
+}
+
 void TileSet::render_chars(pix::Context& context, std::string const& text,
                            Vec2f pos, Vec2f size)
 {
@@ -205,13 +397,12 @@ void TileSet::render_tiles(pix::Context& context, int32_t const* tiles,
     context.set_target();
     if (size == Vec2f{0, 0}) { size = Vec2f(char_width, char_height); }
 
-    tile_texture->bind();
     for (size_t i = 0; i < count; i++) {
         auto const c = tiles[i];
-        auto img = get_texture_for_char(c);
         auto vdata = context.generate_quad_with_uvs(pos, size);
-        std::ranges::copy(img.uvs(), vdata.begin() + 8);
-        context.draw_textured(vdata, gl::Primitive::TriangleFan);
+        std::ranges::copy(glyph_uvs(context, c), vdata.begin() + 8);
+        context.draw_textured(tile_texture, vdata,
+                              gl::Primitive::TriangleFan);
         pos.x += size.x;
     }
 }
@@ -221,14 +412,13 @@ void TileSet::render_tiles(pix::Context& context, int32_t const* tiles,
 {
     context.set_target();
 
-    tile_texture->bind();
     auto const size = Vec2f(char_width, char_height);
     auto const n = points.size();
     for (size_t i = 0; i < n; i++) {
         auto const c = tiles[i];
-        auto img = get_texture_for_char(c);
         auto vdata = context.generate_quad_with_uvs(points[i], size);
-        std::ranges::copy(img.uvs(), vdata.begin() + 8);
-        context.draw_textured(vdata, gl::Primitive::TriangleFan);
+        std::ranges::copy(glyph_uvs(context, c), vdata.begin() + 8);
+        context.draw_textured(tile_texture, vdata,
+                              gl::Primitive::TriangleFan);
     }
 }
@@ -6,23 +6,67 @@
 #include "font.hpp"
 #include "vec2.hpp"
 
+#include <array>
+#include <cstdint>
+#include <memory>
+#include <optional>
 #include <string>
 #include <unordered_map>
+#include <vector>
 
-class TileSet
+class TileSet : public std::enable_shared_from_this<TileSet>
 {
     int texture_width = 256 * 4;
     int texture_height = 256 * 4;
     static constexpr int gap = 0;
     std::shared_ptr<FreetypeFont> font_ptr;
     int pixel_size = -1;
-    std::pair<int, int> next_pos{0, 0};
     std::array<uint32_t, 0xffff> char_array;
 
+    // The texture is split into slots of `slot_width * slot_height` pixels.
+    // When all slots are used, the least recently used glyph that is not
+    // shown by any console is evicted.
+    int slot_width = 0;
+    int slot_height = 0;
+    int slots_per_row = 0;
+    int slot_count = 0;
+    int next_slot = 0;
+    std::vector<char32_t> slot_chars;
+    std::vector<uint64_t> slot_used;
+    // Number of console cells showing the glyph in every slot
+    std::vector<uint32_t> slot_refs;
+    uint64_t use_counter = 0;
+    // Slots handed out for custom graphics can not be evicted
+    static constexpr uint64_t pinned = UINT64_MAX;
+
     void init();
-    std::pair<int, int> alloc_char(char32_t c);
+    void init_slots();
+    [[nodiscard]] int used_height(int slots) const;
+
+    [[nodiscard]] std::string cache_file() const;
+    bool load_cache(std::string const& file_name, std::vector<uint32_t>& data);
+    void save_cache(std::string const& file_name,
+                    std::vector<uint32_t> const& data) const;
+    std::optional<std::pair<int, int>> alloc_char(char32_t c);
+    int evict();
+    [[nodiscard]] std::pair<int, int> uv_pos(uint32_t uv) const;
+    [[nodiscard]] int uv_slot(uint32_t uv) const;
+    [[nodiscard]] pix::ImageView image_at(std::pair<int, int> pos) const;
+    // Get the uvs of the glyph for `c`, drawn into `context`. Recorded
+    // glyphs are kept until the display list is destroyed.
+    std::array<float, 8> glyph_uvs(pix::Context& context, char32_t c);
+
+    void touch(uint32_t uv)
+    {
+        auto& used = slot_used[uv_slot(uv)];
+        if (used != pinned) { used = ++use_counter; }
+    }
 
 public:
+    // If set, the initial glyphs of every new tile set are cached in this
+    // directory, keyed by font, size and tile size.
+    static inline std::string cache_dir;
+
     std::unordered_map<char32_t, uint32_t> char_uvs;
     std::unordered_map<uint32_t, char32_t> reverse_chars;
     std::shared_ptr<gl::Texture> tile_texture;
@@ -30,6 +74,10 @@ public:
     int char_height = -1;
     Vec2i distance;
 
+    // Incremented every time a glyph stops being shown by any console, which
+    // can make room for glyphs that did not fit before.
+    uint32_t releases = 0;
+
     [[nodiscard]] gl::TexRef get_texture() const
     {
         return gl::TexRef{tile_texture};
@@ -40,14 +88,41 @@ public:
     explicit TileSet(std::shared_ptr<FreetypeFont> freetype_font, int size = -1,
                      std::pair<int, int> tile_size = {-1, -1}, Vec2i distance = {0, 0});
     explicit TileSet(std::pair<int, int> tile_size);
+    // Get the tile offset of `c`, adding the glyph if needed. If there is
+    // no room for it, the offset of `missing_offset()` is returned.
     uint32_t get_offset(char32_t c);
+    // Get the tile offset of `c`, or nothing if there is no room for it
+    std::optional<uint32_t> find_offset(char32_t c);
+    // The offset shown for glyphs that do not fit
+    [[nodiscard]] uint32_t missing_offset() const;
+
+    // A glyph can not be evicted while something holds a reference to it.
+    // Only the lower 16 bits of `uv` are used.
+    void add_ref(uint32_t uv, uint32_t count = 1)
+    {
+        slot_refs[uv_slot(uv)] += count;
+    }
+    void release(uint32_t uv)
+    {
+        auto slot = uv_slot(uv);
+        if (--slot_refs[slot] == 0 && slot_used[slot] != pinned) {
+            releases++;
+        }
+    }
 
     char32_t get_char_from_uv(uint32_t uv);
 
+    // Get the image for a tile, to draw custom graphics into. The tile will
+    // never be evicted.
     pix::ImageView get_texture_for_char(char32_t c);
 
+    // Get the image of a rendered glyph. Only valid until the glyph is
+    // evicted.
+    pix::ImageView get_tile_image(char32_t c);
+
     [[nodiscard]] std::pair<float, float> get_uvscale() const;
-    void add_char(char32_t c);
+    // Add the glyph for `c`. Returns false if there is no room for it.
+    bool add_char(char32_t c);
     //[[nodiscard]] std::pair<int, int> get_size() const;
 
     void render_chars(pix::Context& context, std::string const& tiles,
@@ -69,25 +69,27 @@ void make_map()
     }
 }
 */
-void TreeSitter::walk_tree(TSNode node, uint64_t pattern,
-                           std::vector<Hilight>& result)
+int TreeSitter::get_color(TSNode node, uint64_t& pattern) const
 {
-    auto n = ts_node_child_count(node);
-
     auto sym = ts_node_symbol(node);
     if (ts_node_is_error(node)) { sym = 0; }
     pattern = (pattern << 16) | (uint64_t)sym;
 
     uint64_t mask = 0xffff'ffff'ffff;
-    int color = -1;
     while (mask != 0) {
         auto it = patterns.find(mask & pattern);
-        if (it != patterns.end()) {
-            color = it->second;
-            break;
-        }
+        if (it != patterns.end()) { return it->second; }
         mask >>= 16;
     }
+    return -1;
+}
+
+void TreeSitter::walk_tree(TSNode node, uint64_t pattern,
+                           std::vector<Hilight>& result)
+{
+    auto n = ts_node_child_count(node);
+
+    int color = get_color(node, pattern);
     // printf("%s%s -- ", &spaces[strlen(spaces) - d * 2], ts_node_type(node));
     // printf("%llx -> COLOR %d\n", pattern, color);
     if (color >= 0) {
@@ -103,8 +105,36 @@ void TreeSitter::walk_tree(TSNode node, uint64_t pattern,
     }
 }
 
+void TreeSitter::walk_rows(TSTreeCursor* cursor, uint64_t pattern,
+                           uint32_t row_start, uint32_t row_end,
+                           std::vector<uint32_t>& result)
+{
+    auto node = ts_tree_cursor_current_node(cursor);
+    int color = get_color(node, pattern);
+    if (color >= 0) {
+        TSPoint start = ts_node_start_point(node);
+        TSPoint end = ts_node_end_point(node);
+        result.insert(result.end(), {start.column, start.row, end.column,
+                                     end.row, (uint32_t)color});
+        return;
+    }
+    // Skip children that end before the first row, and stop at the
+    // first child that starts after the last row.
+    if (ts_tree_cursor_goto_first_child_for_point(cursor, {row_start, 0}) <
+        0) {
+        return;
+    }
+    do {
+        auto child = ts_tree_cursor_current_node(cursor);
+        if (ts_node_start_point(child).row >= row_end) { break; }
+        walk_rows(cursor, pattern, row_start, row_end, result);
+    } while (ts_tree_cursor_goto_next_sibling(cursor));
+    ts_tree_cursor_goto_parent(cursor);
+}
+
 std::optional<TSNode> TreeSitter::find_node(uint32_t col, uint32_t line)
 {
+    if (tree == nullptr) { return std::nullopt; }
     auto root = ts_tree_root_node(tree);
     auto node = ts_node_named_descendant_for_point_range(root, {line, col},
                                                          {line, col});
@@ -137,6 +167,7 @@ void TreeSitter::dump_nodes(TSNode node, size_t d, std::string& result)
 std::string TreeSitter::dump_tree()
 {
     std::string result;
+    if (tree == nullptr) { return result; }
     dump_nodes(ts_tree_root_node(tree), 0, result);
     return result;
 }
@@ -144,11 +175,23 @@ std::string TreeSitter::dump_tree()
 std::vector<Hilight> TreeSitter::get_highlights()
 {
     std::vector<Hilight> result;
+    if (tree == nullptr) { return result; }
     auto root_node = ts_tree_root_node(tree);
     walk_tree(root_node, 0, result);
     return result;
 }
 
+std::vector<uint32_t> TreeSitter::get_highlights(uint32_t row_start,
+                                                 uint32_t row_end)
+{
+    std::vector<uint32_t> result;
+    if (tree == nullptr || row_end <= row_start) { return result; }
+    auto cursor = ts_tree_cursor_new(ts_tree_root_node(tree));
+    walk_rows(&cursor, 0, row_start, row_end, result);
+    ts_tree_cursor_delete(&cursor);
+    return result;
+}
+
 /*
 int init_treesitter()
 {
@@ -193,17 +236,53 @@ TreeSitter::TreeSitter()
     set_format(format);
 }
 
+TreeSitter::~TreeSitter()
+{
+    if (tree != nullptr) { ts_tree_delete(tree); }
+    ts_parser_delete(parser);
+}
+
+void TreeSitter::parse(const char* source, size_t size, int encoding)
+{
+    // Only reuse the old tree if it has been told about the changes,
+    // otherwise do a full parse of the new source.
+    auto* old_tree = edited ? tree : nullptr;
+    auto* new_tree = ts_parser_parse_string_encoding(
+        parser, old_tree, source, size, (TSInputEncoding)encoding);
+    if (tree != nullptr) { ts_tree_delete(tree); }
+    tree = new_tree;
+    edited = false;
+}
+
 void TreeSitter::set_source_utf8(std::string const& source)
 {
-    tree =
-        ts_parser_parse_string(parser, nullptr, source.data(), source.size());
+    parse(source.data(), source.size(), TSInputEncodingUTF8);
 }
 
 void TreeSitter::set_source_utf16(std::vector<uint16_t> const& source)
 {
-    tree = ts_parser_parse_string_encoding(
-        parser, nullptr, (const char*)source.data(), source.size() * 2,
-        TSInputEncodingUTF16LE);
+    parse((const char*)source.data(), source.size() * 2,
+          TSInputEncodingUTF16LE);
+}
+
+void TreeSitter::set_source_utf16(std::string const& source)
+{
+    parse(source.data(), source.size(), TSInputEncodingUTF16LE);
+}
+
+void TreeSitter::edit(uint32_t start_byte, uint32_t old_end_byte,
+                      uint32_t new_end_byte, Point start, Point old_end,
+                      Point new_end)
+{
+    if (tree == nullptr) { return; }
+    TSInputEdit edit{start_byte,
+                     old_end_byte,
+                     new_end_byte,
+                     {start.second, start.first},
+                     {old_end.second, old_end.first},
+                     {new_end.second, new_end.first}};
+    ts_tree_edit(tree, &edit);
+    edited = true;
 }
 
 void TreeSitter::set_format(
@@ -8,26 +8,44 @@
 struct TSParser;
 struct TSTree;
 struct TSNode;
+struct TSTreeCursor;
 
 using Hilight = std::tuple<uint32_t, uint32_t, uint32_t, uint32_t, int>;
 
 class TreeSitter
 {
     TSParser* parser;
-    TSTree* tree;
+    TSTree* tree = nullptr;
+    // Set when the tree has been edited since it was parsed, so the next
+    // parse can reuse it.
+    bool edited = false;
     std::unordered_map<std::string, uint32_t> symbols;
     std::unordered_map<uint64_t, int> patterns;
 
+    int get_color(TSNode node, uint64_t& pattern) const;
     void walk_tree(TSNode node, uint64_t pattern,
                    std::vector<Hilight>& result);
+    void walk_rows(TSTreeCursor* cursor, uint64_t pattern, uint32_t row_start,
+                   uint32_t row_end, std::vector<uint32_t>& result);
 
     void dump_nodes(TSNode node, size_t d, std::string& result);
+    void parse(const char* source, size_t size, int encoding);
 public:
+    using Point = std::pair<uint32_t, uint32_t>;
+
     TreeSitter();
+    ~TreeSitter();
+    TreeSitter(TreeSitter const&) = delete;
+    TreeSitter& operator=(TreeSitter const&) = delete;
+
     void set_source_utf8(std::string const& source);
     void set_source_utf16(std::vector<uint16_t> const& source);
+    void set_source_utf16(std::string const& source);
+    void edit(uint32_t start_byte, uint32_t old_end_byte, uint32_t new_end_byte,
+              Point start, Point old_end, Point new_end);
     void set_format(std::vector<std::pair<std::string, int>> const& format);
     std::vector<Hilight> get_highlights();
+    std::vector<uint32_t> get_highlights(uint32_t row_start, uint32_t row_end);
     std::string dump_tree();
     std::optional<TSNode> find_node(uint32_t col, uint32_t line);
 };
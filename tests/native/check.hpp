@@ -0,0 +1,52 @@
+#pragma once
+
+// A minimal test runner for the parts of pix that do not need a display.
+// Tests are registered with TEST() and use CHECK() for their assertions.
+
+#include <cstdio>
+#include <vector>
+
+struct TestCase
+{
+    char const* name;
+    void (*run)();
+};
+
+inline std::vector<TestCase>& test_cases()
+{
+    static std::vector<TestCase> cases;
+    return cases;
+}
+
+inline int check_failures = 0;
+
+#define TEST(NAME)                                                            \
+    static void NAME();                                                       \
+    static bool const NAME##_added =                                          \
+        (test_cases().push_back({#NAME, &NAME}), true);                       \
+    static void NAME()
+
+#define CHECK(COND)                                                           \
+    do {                                                                      \
+        if (!(COND)) {                                                        \
+            std::fprintf(stderr, "%s:%d: CHECK(%s) failed\n", __FILE__,       \
+                         __LINE__, #COND);                                    \
+            check_failures++;                                                 \
+        }                                                                     \
+    } while (false)
+
+// Check that `EXPR` throws `EXCEPTION`
+#define CHECK_THROWS(EXCEPTION, EXPR)                                         \
+    do {                                                                      \
+        bool thrown = false;                                                  \
+        try {                                                                 \
+            (void)(EXPR);                                                     \
+        } catch (EXCEPTION const&) {                                          \
+            thrown = true;                                                    \
+        }                                                                     \
+        if (!thrown) {                                                        \
+            std::fprintf(stderr, "%s:%d: %s did not throw %s\n", __FILE__,    \
+                         __LINE__, #EXPR, #EXCEPTION);                        \
+            check_failures++;                                                 \
+        }                                                                     \
+    } while (false)
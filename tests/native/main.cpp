@@ -0,0 +1,24 @@
+#include "check.hpp"
+
+#include <cstdio>
+#include <exception>
+
+int main()
+{
+    int failed = 0;
+    for (auto const& test : test_cases()) {
+        auto const before = check_failures;
+        try {
+            test.run();
+        } catch (std::exception const& e) {
+            std::fprintf(stderr, "%s: threw %s\n", test.name, e.what());
+            check_failures++;
+        }
+        if (check_failures != before) {
+            std::fprintf(stderr, "FAILED %s\n", test.name);
+            failed++;
+        }
+    }
+    std::printf("%zu tests, %d failed\n", test_cases().size(), failed);
+    return failed == 0 ? 0 : 1;
+}
@@ -0,0 +1,148 @@
+#include "check.hpp"
+
+#include "atlas.hpp"
+
+#include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <iterator>
+#include <string>
+#include <vector>
+
+namespace fs = std::filesystem;
+using pix::Atlas;
+
+namespace {
+
+std::vector<pix::Image> make_images(int count, int max_side)
+{
+    std::vector<pix::Image> images;
+    uint32_t seed = 1234;
+    auto next = [&seed](int n) {
+        seed = seed * 1664525 + 1013904223;
+        return static_cast<int>((seed >> 8) % n);
+    };
+    for (int i = 0; i < count; i++) {
+        auto& image = images.emplace_back(1 + next(max_side),
+                                          1 + next(max_side));
+        auto const bytes = static_cast<size_t>(image.width) * image.height * 4;
+        for (size_t b = 0; b < bytes; b++) {
+            image.ptr[b] = static_cast<std::byte>(i + b);
+        }
+    }
+    return images;
+}
+
+bool same(Atlas::Placement const& a, Atlas::Placement const& b)
+{
+    return a.page == b.page && a.x == b.x && a.y == b.y &&
+           a.width == b.width && a.height == b.height;
+}
+
+std::string read_file(fs::path const& name)
+{
+    std::ifstream file{name, std::ios::binary};
+    return {std::istreambuf_iterator<char>{file}, {}};
+}
+
+void write_file(fs::path const& name, std::string const& contents)
+{
+    std::ofstream file{name, std::ios::binary};
+    file << contents;
+}
+
+fs::path temp_file(char const* name)
+{
+    return fs::temp_directory_path() / name;
+}
+
+} // namespace
+
+TEST(atlas_placements_are_padded_and_fit)
+{
+    constexpr int max_size = 128;
+    constexpr int padding = 3;
+    auto images = make_images(80, 40);
+    // Placed first, since it is the tallest
+    images.emplace_back(200, 60);
+    Atlas atlas{images, max_size, padding};
+    auto const& placed = atlas.get_placements();
+    CHECK(placed.size() == images.size());
+
+    for (size_t i = 0; i < placed.size(); i++) {
+        auto const& a = placed[i];
+        CHECK(a.width == images[i].width && a.height == images[i].height);
+        CHECK(a.page >= 0 && a.page < static_cast<int>(atlas.page_count()));
+        CHECK(a.x >= 0 && a.y >= 0);
+        if (i + 1 == placed.size()) { continue; }
+        CHECK(a.x + a.width <= max_size && a.y + a.height <= max_size);
+        for (size_t j = i + 1; j < placed.size(); j++) {
+            auto const& b = placed[j];
+            if (a.page != b.page) { continue; }
+            CHECK(a.x + a.width + padding <= b.x ||
+                  b.x + b.width + padding <= a.x ||
+                  a.y + a.height + padding <= b.y ||
+                  b.y + b.height + padding <= a.y);
+        }
+    }
+    // The image larger than `max_size` has a page of its own
+    auto const& large = placed.back();
+    for (size_t i = 0; i + 1 < placed.size(); i++) {
+        CHECK(placed[i].page != large.page);
+    }
+}
+
+TEST(atlas_cache_round_trips)
+{
+    auto const file = temp_file("pixunit_atlas.cache");
+    auto const copy = temp_file("pixunit_atlas_copy.cache");
+    Atlas const atlas{make_images(30, 50), 96, 1};
+    atlas.save(file.string(), 42);
+
+    auto loaded = Atlas::load(file.string(), 42);
+    CHECK(loaded.has_value());
+    if (loaded) {
+        CHECK(loaded->page_count() == atlas.page_count());
+        auto const& a = atlas.get_placements();
+        auto const& b = loaded->get_placements();
+        CHECK(a.size() == b.size());
+        for (size_t i = 0; i < a.size() && i < b.size(); i++) {
+            CHECK(same(a[i], b[i]));
+        }
+        // Including the pixels
+        loaded->save(copy.string(), 42);
+        CHECK(read_file(copy) == read_file(file));
+    }
+    fs::remove(file);
+    fs::remove(copy);
+}
+
+TEST(atlas_cache_rejects_stale_or_broken_files)
+{
+    auto const file = temp_file("pixunit_atlas_broken.cache");
+    Atlas const atlas{make_images(10, 20), 64, 0};
+    atlas.save(file.string(), 7);
+    auto const contents = read_file(file);
+
+    CHECK(!Atlas::load(file.string(), 8).has_value());
+    write_file(file, contents.substr(0, contents.size() - 1));
+    CHECK(!Atlas::load(file.string(), 7).has_value());
+    write_file(file, contents.substr(0, 12));
+    CHECK(!Atlas::load(file.string(), 7).has_value());
+    write_file(file, contents + "x");
+    CHECK(!Atlas::load(file.string(), 7).has_value());
+    fs::remove(file);
+    CHECK(!Atlas::load(file.string(), 7).has_value());
+}
+
+TEST(atlas_cache_key_follows_file_contents)
+{
+    auto const file = temp_file("pixunit_atlas_source.png");
+    write_file(file, "one");
+    auto const key = Atlas::cache_key({file}, 256, 1);
+    CHECK(Atlas::cache_key({file}, 256, 1) == key);
+    CHECK(Atlas::cache_key({file}, 256, 2) != key);
+    write_file(file, "two");
+    CHECK(Atlas::cache_key({file}, 256, 1) != key);
+    fs::remove(file);
+}
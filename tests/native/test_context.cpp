@@ -0,0 +1,40 @@
+#include "check.hpp"
+
+#include "context.hpp"
+
+#include <cmath>
+
+using pix::Context;
+
+TEST(circle_segments_are_multiples_of_4)
+{
+    for (int i = 0; i <= 20000; i++) {
+        auto const n = Context::circle_segments(i * 0.25);
+        CHECK(n % 4 == 0);
+        CHECK(n >= 8 && n <= 1024);
+    }
+    CHECK(Context::circle_segments(0) == 8);
+    CHECK(Context::circle_segments(-5) == 8);
+    CHECK(Context::circle_segments(1e9) == 1024);
+}
+
+TEST(circle_segments_grow_with_radius)
+{
+    int last = 0;
+    for (int i = 0; i <= 20000; i++) {
+        auto const n = Context::circle_segments(i * 0.25);
+        CHECK(n >= last);
+        last = n;
+    }
+    CHECK(Context::circle_segments(100) > Context::circle_segments(10));
+}
+
+TEST(circle_segments_are_smooth)
+{
+    // The edges never stray more than half a pixel from the circle
+    for (int i = 4; i <= 40000; i++) {
+        auto const r = i * 0.25;
+        auto const n = Context::circle_segments(r);
+        CHECK(r * (1 - std::cos(M_PI / n)) <= 0.5);
+    }
+}
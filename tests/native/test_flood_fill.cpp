@@ -0,0 +1,165 @@
+#include "check.hpp"
+
+#include "flood_fill.hpp"
+
+#include <algorithm>
+#include <cstdint>
+#include <deque>
+#include <string>
+#include <utility>
+#include <vector>
+
+using pix::Rect;
+using pix::scanline_fill;
+
+namespace {
+
+constexpr uint32_t fill_color = 0xff00ff00;
+
+// A simple 4-connected flood fill to compare against
+std::vector<uint32_t> reference_fill(std::vector<uint32_t> const& source,
+                                     int width, int height, int x, int y,
+                                     uint32_t color, int tolerance)
+{
+    auto result = source;
+    std::vector<bool> seen(source.size());
+    auto const start = source[y * width + x];
+    std::deque<std::pair<int, int>> queue{{x, y}};
+    while (!queue.empty()) {
+        auto [px, py] = queue.front();
+        queue.pop_front();
+        if (px < 0 || py < 0 || px >= width || py >= height) { continue; }
+        auto const i = static_cast<size_t>(py) * width + px;
+        if (seen[i] || !pix::colors_match(source[i], start, tolerance)) {
+            continue;
+        }
+        seen[i] = true;
+        result[i] = color;
+        queue.insert(queue.end(),
+                     {{px - 1, py}, {px + 1, py}, {px, py - 1}, {px, py + 1}});
+    }
+    return result;
+}
+
+Rect bounds(std::vector<uint32_t> const& before,
+            std::vector<uint32_t> const& after, int width)
+{
+    Rect area{width, INT32_MAX, 0, 0};
+    for (size_t i = 0; i < before.size(); i++) {
+        if (before[i] == after[i]) { continue; }
+        auto const x = static_cast<int>(i % width);
+        auto const y = static_cast<int>(i / width);
+        area = {std::min(area.x0, x), std::min(area.y0, y),
+                std::max(area.x1, x + 1), std::max(area.y1, y + 1)};
+    }
+    return area;
+}
+
+bool same(Rect const& a, Rect const& b)
+{
+    return a.x0 == b.x0 && a.y0 == b.y0 && a.x1 == b.x1 && a.y1 == b.y1;
+}
+
+// Rows of '#' (walls) and '.' (open), top row first
+std::vector<uint32_t> grid(std::vector<std::string> const& rows)
+{
+    std::vector<uint32_t> pixels;
+    for (auto const& row : rows) {
+        for (auto c : row) {
+            pixels.push_back(c == '#' ? 0xffffffff : 0xff000000);
+        }
+    }
+    return pixels;
+}
+
+} // namespace
+
+TEST(scanline_fill_matches_reference)
+{
+    constexpr int width = 23;
+    constexpr int height = 17;
+    uint32_t seed = 99;
+    auto next = [&seed](int n) {
+        seed = seed * 1664525 + 1013904223;
+        return static_cast<int>((seed >> 8) % n);
+    };
+    for (int round = 0; round < 200; round++) {
+        // Few, close colors, so tolerance decides what is connected
+        std::vector<uint32_t> source(width * height);
+        for (auto& p : source) {
+            p = 0xff000000 | static_cast<uint32_t>(next(3) * 8);
+        }
+        auto const x = next(width);
+        auto const y = next(height);
+        auto const tolerance = next(3) * 8;
+        auto expected =
+            reference_fill(source, width, height, x, y, fill_color, tolerance);
+
+        auto in_place = source;
+        auto area = scanline_fill(in_place, in_place, width, height, x, y,
+                                  fill_color, tolerance);
+        CHECK(in_place == expected);
+        CHECK(same(area, bounds(source, expected, width)));
+
+        // A separate mask only gets the filled pixels
+        std::vector<uint32_t> mask(source.size());
+        scanline_fill(source, mask, width, height, x, y, fill_color,
+                      tolerance);
+        for (size_t i = 0; i < mask.size(); i++) {
+            CHECK((mask[i] == fill_color) == (expected[i] != source[i]));
+        }
+    }
+}
+
+TEST(scanline_fill_tolerance_is_inclusive)
+{
+    std::vector<uint32_t> const source{0xff101010, 0xff141010, 0xff101015,
+                                       0xff101010};
+    for (int tolerance : {0, 4, 5}) {
+        auto pixels = source;
+        scanline_fill(pixels, pixels, 4, 1, 0, 0, fill_color, tolerance);
+        CHECK(pixels[0] == fill_color);
+        CHECK((pixels[1] == fill_color) == (tolerance >= 4));
+        CHECK((pixels[2] == fill_color) == (tolerance >= 5));
+        // Only reached through the pixels before it
+        CHECK((pixels[3] == fill_color) == (tolerance >= 5));
+    }
+}
+
+TEST(scanline_fill_reaches_mask_edges)
+{
+    // Open along every edge, with walls inside
+    auto const source = grid({
+        "..........",
+        ".###.####.",
+        ".#......#.",
+        ".####.###.",
+        "..........",
+    });
+    std::vector<uint32_t> mask(source.size());
+    auto area = scanline_fill(source, mask, 10, 5, 9, 4, fill_color);
+    CHECK(same(area, Rect{0, 0, 10, 5}));
+    auto const expected = reference_fill(source, 10, 5, 9, 4, fill_color, 0);
+    for (size_t i = 0; i < mask.size(); i++) {
+        CHECK((mask[i] == fill_color) == (expected[i] == fill_color));
+    }
+    // Corners and the enclosed area through the gaps
+    CHECK(mask[0] == fill_color && mask[9] == fill_color);
+    CHECK(mask[40] == fill_color && mask[49] == fill_color);
+    CHECK(mask[23] == fill_color);
+    // The walls are not filled
+    CHECK(mask[11] == 0 && mask[38] == 0);
+}
+
+TEST(scanline_fill_outside_does_nothing)
+{
+    std::vector<uint32_t> pixels(4, 0xff000000);
+    auto area = scanline_fill(pixels, pixels, 2, 2, 2, 0, fill_color);
+    CHECK(area.empty());
+    area = scanline_fill(pixels, pixels, 2, 2, 0, -1, fill_color);
+    CHECK(area.empty());
+    CHECK(pixels == std::vector<uint32_t>(4, 0xff000000));
+    // Filling with the same color
+    area = scanline_fill(pixels, pixels, 2, 2, 0, 0, 0xff000000);
+    CHECK(area.empty());
+}
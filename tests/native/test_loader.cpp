@@ -0,0 +1,65 @@
+#include "check.hpp"
+
+#include "loader.hpp"
+
+#include <chrono>
+#include <stdexcept>
+#include <string>
+#include <thread>
+#include <vector>
+
+using pix::load_async;
+using pix::Loader;
+
+TEST(pending_is_done_after_finish)
+{
+    auto pending =
+        load_async<int>([] { return 20; }, [](int v) { return v + 1; });
+    // Finishing only happens on the main thread, when polled
+    CHECK(!pending->is_done());
+    CHECK(pending->get() == 21);
+    CHECK(pending->is_done());
+}
+
+TEST(pending_rethrows_decode_error)
+{
+    auto pending = load_async<int>(
+        []() -> int { throw std::runtime_error("no such file"); },
+        [](int v) { return v; });
+    try {
+        pending->get();
+        CHECK(false);
+    } catch (std::runtime_error const& e) {
+        CHECK(std::string(e.what()) == "no such file");
+    }
+    CHECK(pending->is_done());
+}
+
+TEST(pending_rethrows_finish_error)
+{
+    auto pending = load_async<int>([] { return 1; }, [](int) -> int {
+        throw std::invalid_argument("bad data");
+    });
+    CHECK_THROWS(std::invalid_argument, pending->get());
+}
+
+TEST(clear_cancels_pending_loads)
+{
+    std::vector<std::shared_ptr<pix::Pending<int>>> pending;
+    for (int i = 0; i < 20; i++) {
+        pending.push_back(load_async<int>(
+            [i] {
+                std::this_thread::sleep_for(std::chrono::milliseconds(5));
+                return i;
+            },
+            [](int v) { return v; }));
+    }
+    Loader::get_instance().clear();
+    for (auto const& p : pending) {
+        CHECK(!p->is_done());
+        CHECK_THROWS(std::runtime_error, p->get());
+    }
+    // Threads are started again by the next load
+    auto again = load_async<int>([] { return 3; }, [](int v) { return v; });
+    CHECK(again->get() == 3);
+}
@@ -0,0 +1,95 @@
+#include "check.hpp"
+
+#include "text_cache.hpp"
+
+#include <string>
+#include <utility>
+
+namespace {
+
+// Cache ints instead of images, so no display is needed
+using Cache = BasicTextImageCache<int>;
+
+Cache::Key key(std::string const& text)
+{
+    return {.font_id = 1, .size = 16, .color = 0xffffffff, .text = text};
+}
+
+// Get `text` from the cache, and return true if it had to be created
+bool get(Cache& cache, std::string const& text, size_t bytes)
+{
+    bool created = false;
+    cache.get(key(text), [&] {
+        created = true;
+        return std::pair{0, bytes};
+    });
+    return created;
+}
+
+} // namespace
+
+TEST(text_cache_counts_hits_and_misses)
+{
+    Cache cache;
+    CHECK(get(cache, "one", 10));
+    CHECK(!get(cache, "one", 10));
+    CHECK(get(cache, "two", 10));
+    CHECK(!get(cache, "one", 10));
+    CHECK(cache.hits == 2);
+    CHECK(cache.misses == 2);
+    CHECK(cache.size() == 2);
+    CHECK(cache.bytes == 20);
+
+    // Other sizes or colors of the same text are different images
+    auto other = key("one");
+    other.size = 17;
+    bool created = false;
+    cache.get(other, [&] {
+        created = true;
+        return std::pair{0, size_t{10}};
+    });
+    CHECK(created);
+}
+
+TEST(text_cache_evicts_least_recently_used)
+{
+    Cache cache;
+    cache.max_bytes = 100;
+    get(cache, "a", 40);
+    get(cache, "b", 40);
+    // "b" is now the least recently used
+    get(cache, "a", 40);
+    get(cache, "c", 40);
+    CHECK(cache.size() == 2);
+    CHECK(cache.bytes == 80);
+    CHECK(!get(cache, "a", 40));
+    CHECK(!get(cache, "c", 40));
+    CHECK(get(cache, "b", 40));
+    CHECK(cache.bytes <= cache.max_bytes);
+}
+
+TEST(text_cache_stays_within_max_bytes)
+{
+    Cache cache;
+    cache.max_bytes = 100;
+    for (int i = 0; i < 50; i++) {
+        get(cache, std::to_string(i), 7 + i % 13);
+        CHECK(cache.bytes <= cache.max_bytes);
+    }
+    // Too large to cache at all
+    CHECK(get(cache, "huge", 101));
+    CHECK(get(cache, "huge", 101));
+    CHECK(cache.bytes <= cache.max_bytes);
+
+    get(cache, "x", 30);
+    get(cache, "y", 30);
+    cache.set_max_bytes(30);
+    CHECK(cache.size() == 1);
+    CHECK(cache.bytes == 30);
+    CHECK(!get(cache, "y", 30));
+
+    cache.clear();
+    CHECK(cache.size() == 0);
+    CHECK(cache.bytes == 0);
+    CHECK(get(cache, "y", 30));
+}
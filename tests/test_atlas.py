@@ -0,0 +1,29 @@
+import os
+import unittest
+
+import pixpy as pix
+
+
+class TestAtlas(unittest.TestCase):
+    """Test cases for packing images with pix.Atlas"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("PIX_HEADLESS", "1")
+        try:
+            pix.open_display(width=64, height=64)
+        except Exception as e:
+            raise unittest.SkipTest(f"No display: {e}")
+
+    def test_oversized_image_gets_own_page(self):
+        """Nothing else is packed next to an image larger than max_size"""
+        wide, small = pix.Atlas.pack(
+            [pix.Image(100, 10), pix.Image(8, 8)], max_size=64, padding=1
+        )
+        self.assertEqual(wide.size, pix.Float2(100, 10))
+        self.assertEqual(small.pos, pix.Float2(0, 0))
+        self.assertEqual(small.size, pix.Float2(8, 8))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,319 @@
+import math
+import os
+import unittest
+from array import array
+
+import pixpy as pix
+
+
+class TestCanvas(unittest.TestCase):
+    """Test cases for drawing to an offscreen canvas"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("PIX_HEADLESS", "1")
+        try:
+            pix.open_display(width=64, height=64)
+        except Exception as e:
+            raise unittest.SkipTest(f"No display: {e}")
+
+    def pixel(self, image: pix.Image, x: int, y: int) -> list[int]:
+        pixels = image.read_pixels()
+        return [pixels[y, x, c] for c in range(4)]
+
+    def check_no_stale_pixels(self, fill):
+        """Drawing done after `fill` must survive a later set_pixel()"""
+        image = pix.Image(32, 32)
+        image.clear(pix.color.BLACK)
+        fill(image)
+        image.draw_color = pix.color.WHITE
+        image.filled_rect((8, 8), (8, 8))
+        image.set_pixel((0, 0), pix.color.WHITE)
+        self.assertEqual(self.pixel(image, 10, 10), [255, 255, 255, 255])
+        self.assertEqual(self.pixel(image, 0, 0), [255, 255, 255, 255])
+
+    def test_flood_fill_nothing_then_set_pixel(self):
+        # The start pixel already has the fill color, so nothing is filled
+        self.check_no_stale_pixels(
+            lambda image: image.flood_fill((1, 1), pix.color.BLACK)
+        )
+
+    def test_flood_fill_mask_then_set_pixel(self):
+        mask = pix.Image(32, 32)
+        self.check_no_stale_pixels(
+            lambda image: image.flood_fill((1, 1), pix.color.WHITE, mask=mask)
+        )
+
+    def make_sprite(self) -> pix.Image:
+        """An 8x8 image that is red on the left and green on the right"""
+        sprite = pix.Image(8, 8)
+        sprite.clear(0xFF0000FF)
+        sprite.draw_color = 0x00FF00FF
+        sprite.filled_rect((4, 0), (4, 8))
+        return sprite
+
+    def canvas(self) -> pix.Image:
+        image = pix.Image(64, 64)
+        image.clear(pix.color.BLACK)
+        return image
+
+    def test_draw_many_matches_draw(self):
+        sprite = self.make_sprite()
+        centers = [(10, 10), (30, 12), (50, 40)]
+        sizes = [(8, 8), (16, 8), (12, 12)]
+        rotations = [0, math.pi / 2, math.pi]
+        colors = [0xFFFFFFFF, 0xFF8080FF, 0x80FF80FF]
+        expected = self.canvas()
+        for center, size, rot, color in zip(centers, sizes, rotations, colors):
+            expected.draw_color = color
+            expected.draw(sprite, center=center, size=size, rot=rot)
+
+        image = self.canvas()
+        image.draw_many(
+            sprite,
+            array("f", [v for c in centers for v in c]),
+            sizes=array("f", [v for s in sizes for v in s]),
+            rotations=array("d", rotations),
+            colors=array("I", colors),
+        )
+        self.assertEqual(
+            image.read_pixels().tobytes(), expected.read_pixels().tobytes()
+        )
+
+    def test_draw_many_images(self):
+        """One image per center, with one size for all of them"""
+        frames = self.make_sprite().split(width=4, height=8)
+        self.assertEqual(len(frames), 2)
+        centers = [(8, 8), (20, 8), (32, 8), (44, 8)]
+        expected = self.canvas()
+        expected.draw_color = pix.color.WHITE
+        for i, center in enumerate(centers):
+            expected.draw(frames[i % 2], center=center, size=(6, 10))
+
+        image = self.canvas()
+        image.draw_color = pix.color.WHITE
+        image.draw_many(
+            [frames[i % 2] for i in range(4)],
+            array("i", [v for c in centers for v in c]),
+            sizes=array("f", [6, 10]),
+        )
+        self.assertEqual(
+            image.read_pixels().tobytes(), expected.read_pixels().tobytes()
+        )
+
+    def test_draw_many_checks_counts(self):
+        sprite = self.make_sprite()
+        image = self.canvas()
+        centers = array("f", [1, 2, 3, 4])
+        with self.assertRaises(ValueError):
+            image.draw_many(sprite, array("f", [1, 2, 3]))
+        with self.assertRaises(ValueError):
+            image.draw_many(sprite, centers, sizes=array("f", [1, 2, 3]))
+        with self.assertRaises(ValueError):
+            image.draw_many(sprite, centers, rotations=array("f", [0, 0, 0]))
+        with self.assertRaises(ValueError):
+            image.draw_many(sprite, centers, colors=array("I", [0, 0, 0]))
+        with self.assertRaises(ValueError):
+            image.draw_many([sprite] * 3, centers)
+
+    def plotted(self, plot) -> bytes:
+        image = self.canvas()
+        image.point_size = 1
+        plot(image)
+        return image.read_pixels().tobytes()
+
+    def test_plot_buffers(self):
+        points = [(3, 4), (10, 20), (40, 7), (63, 63)]
+        colors = [0xFF0000FF, 0x00FF00FF, 0x0000FFFF, 0xFFFFFFFF]
+        xy = [v for p in points for v in p]
+
+        def one_by_one(image):
+            for p, c in zip(points, colors):
+                image.plot(pix.Float2(*p), c)
+
+        expected = self.plotted(one_by_one)
+        self.assertNotEqual(expected, self.plotted(lambda image: None))
+        for plot in (
+            lambda image: image.plot(xy, colors),
+            lambda image: image.plot(array("f", xy), array("I", colors)),
+            lambda image: image.plot(array("d", xy), array("Q", colors)),
+            lambda image: image.plot(array("h", xy), array("I", colors)),
+            lambda image: image.plot_xy(
+                array("d", [p[0] for p in points]),
+                array("b", [p[1] for p in points]),
+                array("L", colors),
+            ),
+        ):
+            self.assertEqual(self.plotted(plot), expected)
+
+    def test_plot_checks_buffers(self):
+        image = self.canvas()
+        with self.assertRaises(ValueError):
+            image.plot(array("f", [1, 2, 3]), array("I", [0, 0]))
+        with self.assertRaises(ValueError):
+            image.plot(array("f", [1, 2]), array("f", [0]))
+        with self.assertRaises(ValueError):
+            image.plot_xy(array("f", [1, 2]), array("f", [1]), array("I", [0, 0]))
+        with self.assertRaises(ValueError):
+            image.plot_xy(array("f", [1, 2]), array("f", [1, 2]), array("I", [0]))
+
+
+    def pattern(self, width: int, height: int) -> memoryview:
+        """A (height, width, 4) buffer with a different color in every pixel"""
+        data = bytearray()
+        for y in range(height):
+            for x in range(width):
+                data += bytes([x * 16, y * 16, (x + y) * 8, 255])
+        return memoryview(data).cast("B", (height, width, 4))
+
+    def test_pixels_round_trip(self):
+        pixels = self.pattern(8, 6)
+        image = pix.Image(8, 6)
+        image.write_pixels(pixels)
+        self.assertEqual(image.read_pixels().tobytes(), pixels.tobytes())
+
+        # Only the area at `xy` is written
+        image = self.canvas()
+        image.write_pixels(pixels, (20, 30))
+        result = image.read_pixels()
+        self.assertEqual(result.shape, (64, 64, 4))
+        for y in range(6):
+            for x in range(8):
+                self.assertEqual(
+                    [result[y + 30, x + 20, c] for c in range(4)],
+                    [pixels[y, x, c] for c in range(4)],
+                )
+        self.assertEqual(self.pixel(image, 19, 30), [0, 0, 0, 255])
+        self.assertEqual(self.pixel(image, 28, 30), [0, 0, 0, 255])
+        self.assertEqual(self.pixel(image, 20, 29), [0, 0, 0, 255])
+        self.assertEqual(self.pixel(image, 20, 36), [0, 0, 0, 255])
+
+    def test_write_strided_pixels(self):
+        """Every other row of a larger buffer"""
+        pixels = self.pattern(8, 8)
+        image = pix.Image(8, 4)
+        image.write_pixels(pixels[::2])
+        row = 8 * 4
+        data = pixels.tobytes()
+        expected = b"".join(data[y * row : (y + 1) * row] for y in range(0, 8, 2))
+        self.assertEqual(image.read_pixels().tobytes(), expected)
+
+    def test_write_pixels_checks_buffers(self):
+        image = pix.Image(8, 8)
+        pixels = self.pattern(4, 4)
+        for xy in ((-1, 0), (0, -1), (5, 0), (0, 5)):
+            with self.assertRaises(ValueError):
+                image.write_pixels(pixels, xy)
+        with self.assertRaises(ValueError):
+            image.write_pixels(self.pattern(9, 1))
+        with self.assertRaises(ValueError):
+            image.write_pixels(memoryview(bytearray(48)).cast("B", (4, 4, 3)))
+        with self.assertRaises(ValueError):
+            image.write_pixels(memoryview(bytearray(64)))
+        # Nothing was written
+        self.assertEqual(image.read_pixels().tobytes(), bytes(8 * 8 * 4))
+
+    def covered(self, image: pix.Image) -> int:
+        """Number of pixels that are not black"""
+        data = image.read_pixels().tobytes()
+        return sum(1 for i in range(0, len(data), 4) if data[i : i + 3] != b"\0\0\0")
+
+    def test_filled_circle_area(self):
+        for radius in (3, 10, 28):
+            image = self.canvas()
+            image.draw_color = pix.color.WHITE
+            image.filled_circle((32, 32), radius)
+            area = math.pi * radius * radius
+            self.assertAlmostEqual(self.covered(image), area, delta=area * 0.05 + 4)
+
+    def test_scaled_circle_is_smooth(self):
+        """Segments are picked from the radius on screen, not the given one"""
+        expected = self.canvas()
+        expected.draw_color = pix.color.WHITE
+        expected.filled_circle((32, 32), 28)
+
+        image = self.canvas()
+        image.draw_color = pix.color.WHITE
+        image.push_transform(scale=(8, 8))
+        image.filled_circle((4, 4), 3.5)
+        image.pop_transform()
+        # An octagon would cover about 10% less
+        self.assertAlmostEqual(
+            self.covered(image), self.covered(expected), delta=math.pi * 28 * 28 * 0.01
+        )
+
+    def drawn(self, draw) -> bytes:
+        image = self.canvas()
+        image.draw_color = pix.color.WHITE
+        draw(image)
+        return image.read_pixels().tobytes()
+
+    def check_transform(self, transformed, direct):
+        expected = self.drawn(direct)
+        self.assertNotEqual(expected, self.drawn(lambda image: None))
+
+        def draw(image):
+            transformed(image)
+            image.pop_transform()
+
+        self.assertEqual(self.drawn(draw), expected)
+
+    def test_push_transform(self):
+        def translated(image):
+            image.push_transform(translate=(10, 5))
+            image.filled_rect((2, 2), (8, 8))
+
+        self.check_transform(translated, lambda i: i.filled_rect((12, 7), (8, 8)))
+
+        def scaled(image):
+            image.push_transform(scale=(2, 3))
+            image.filled_rect((4, 4), (5, 5))
+
+        self.check_transform(scaled, lambda i: i.filled_rect((8, 12), (10, 15)))
+
+        def rotated(image):
+            # Rotated a quarter turn around the origin, then moved into view
+            image.push_transform(translate=(32, 0), rotate=math.pi / 2)
+            image.filled_rect((0, 0), (10, 20))
+
+        self.check_transform(rotated, lambda i: i.filled_rect((12, 0), (20, 10)))
+
+        def matrix(image):
+            image.push_transform([[1, 0, 5], [0, 2, 6]], translate=(1, 1))
+            image.filled_rect((0, 0), (4, 4))
+
+        self.check_transform(matrix, lambda i: i.filled_rect((6, 7), (4, 8)))
+
+    def test_nested_transforms(self):
+        def nested(image):
+            image.push_transform(translate=(20, 10))
+            image.push_transform(scale=(2, 2))
+            image.filled_rect((1, 1), (4, 4))
+            image.pop_transform()
+            image.filled_rect((0, 20), (4, 4))
+            image.pop_transform()
+            image.filled_rect((50, 50), (4, 4))
+
+        def direct(image):
+            image.filled_rect((22, 12), (8, 8))
+            image.filled_rect((20, 30), (4, 4))
+            image.filled_rect((50, 50), (4, 4))
+
+        self.assertEqual(self.drawn(nested), self.drawn(direct))
+
+    def test_pop_empty_transform_stack(self):
+        image = self.canvas()
+        with self.assertRaises(IndexError):
+            image.pop_transform()
+        image.push_transform(translate=(1, 1))
+        image.pop_transform()
+        with self.assertRaises(IndexError):
+            image.pop_transform()
+        # The transform is still the identity
+        image.draw_color = pix.color.WHITE
+        image.filled_rect((0, 0), (1, 1))
+        self.assertEqual(self.pixel(image, 0, 0), [255, 255, 255, 255])
+        self.assertEqual(self.pixel(image, 1, 1), [0, 0, 0, 255])
+
+if __name__ == "__main__":
+    unittest.main()
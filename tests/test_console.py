@@ -0,0 +1,174 @@
+import os
+import unittest
+from array import array
+
+import pixpy as pix
+
+
+class TestConsole(unittest.TestCase):
+    """Test cases for reading and writing console tiles"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("PIX_HEADLESS", "1")
+        try:
+            pix.open_display(width=64, height=64)
+        except Exception as e:
+            raise unittest.SkipTest(f"No display: {e}")
+
+    def rows(self, con: pix.Console) -> list[list[int]]:
+        cols, rows = con.grid_size
+        return [[con.get((x, y)) for x in range(cols)] for y in range(rows)]
+
+    def test_scroll_right_wraps_every_row(self):
+        con = pix.Console(4, 3)
+        for y in range(3):
+            for x in range(4):
+                con.put((x, y), 65 + x + y * 4)
+        con.scroll(0, 1)
+        self.assertEqual(
+            self.rows(con), [[68, 65, 66, 67], [72, 69, 70, 71], [76, 73, 74, 75]]
+        )
+
+    def cell(self, con: pix.Console, x: int, y: int) -> list[int]:
+        cols, _ = con.grid_size
+        i = (x + y * cols) * 3
+        return con.get_tiles()[i : i + 3]
+
+    def test_put_row(self):
+        con = pix.Console(6, 2)
+        con.put_row(1, 2, b"ABC", fg=0x11111111, bg=array("I", [1, 2, 3]))
+        self.assertEqual(self.cell(con, 2, 1), [65, 0x11111111, 1])
+        self.assertEqual(self.cell(con, 4, 1), [67, 0x11111111, 3])
+        # Other integer types are converted, and tiles outside are ignored
+        con.put_row(0, -1, array("H", [0x100, 0x101, 0x102]))
+        self.assertEqual([con.get((x, 0)) for x in range(3)], [0x101, 0x102, 32])
+        con.put_row(0, 4, array("q", [68, 69, 70]), fg=array("b", [1, 2, 3]))
+        self.assertEqual([con.get((x, 0)) for x in range(4, 6)], [68, 69])
+        self.assertEqual(self.cell(con, 5, 0)[1], 2)
+        before = con.get_tiles()
+        con.put_row(5, 0, b"X")
+        self.assertEqual(con.get_tiles(), before)
+
+    def test_put_row_rejects_bad_buffers(self):
+        con = pix.Console(6, 2)
+        with self.assertRaises(ValueError):
+            con.put_row(0, 0, b"ABC", fg=array("I", [1, 2]))
+        with self.assertRaises(ValueError):
+            con.put_row(0, 0, array("f", [65.0]))
+        with self.assertRaises(ValueError):
+            con.put_row(0, 0, memoryview(array("I", [65, 0, 66]))[::2])
+        self.assertEqual(con.get((0, 0)), 32)
+
+    def test_set_region(self):
+        con = pix.Console(4, 3)
+        tiles = array("I")
+        for i in range(6):
+            tiles.extend([65 + i, i, 100 + i])
+        con.set_region(2, 1, 3, 2, tiles)
+        # Clipped at the right edge
+        self.assertEqual(self.cell(con, 2, 1), [65, 0, 100])
+        self.assertEqual(self.cell(con, 3, 1), [66, 1, 101])
+        self.assertEqual(self.cell(con, 2, 2), [68, 3, 103])
+        self.assertEqual(con.get((1, 1)), 32)
+        before = con.get_tiles()
+        with self.assertRaises(ValueError):
+            con.set_region(0, 0, 3, 2, tiles[:-1])
+        con.set_region(0, 0, 0, 2, array("I"))
+        self.assertEqual(con.get_tiles(), before)
+
+    def view_rows(self, view: memoryview) -> list[list[int]]:
+        rows, cols, _ = view.shape
+        return [[view[y, x, 0] for x in range(cols)] for y in range(rows)]
+
+    def test_buffer_view_holds_cells(self):
+        con = pix.Console(4, 3)
+        con.put((1, 2), 65, fg=0x11223344, bg=0x55667788)
+        with memoryview(con) as view:
+            self.assertEqual(view.shape, (3, 4, 3))
+            self.assertEqual(view.format, "I")
+            self.assertEqual(
+                [view[2, 1, c] for c in range(3)], [65, 0x11223344, 0x55667788]
+            )
+            view[0, 3, 0] = 66
+            con.mark_dirty()
+        self.assertEqual(con.get((3, 0)), 66)
+
+    def test_scroll_while_viewed(self):
+        con = pix.Console(4, 3)
+        view = memoryview(con)
+        with self.assertRaises(BufferError):
+            con.scroll(1)
+        # Writing past the bottom scrolls, and keeps the view in row order
+        con.write("a\nb\nc\nd")
+        self.assertEqual(view[0, 0, 0], ord("b"))
+        self.assertEqual(self.view_rows(view), self.rows(con))
+        view.release()
+        con.scroll(1)
+        with memoryview(con) as view:
+            self.assertEqual(view[0, 0, 0], ord("d"))
+            self.assertEqual(self.view_rows(view), self.rows(con))
+
+    def render(self, con: pix.Console) -> bytes:
+        image = pix.Image(con.size)
+        image.draw(con)
+        return image.read_pixels().tobytes()
+
+    def test_only_changed_rows_are_uploaded(self):
+        con = pix.Console(10, 5)
+        row = 10 * 4 * 2  # uv and color textures
+        self.render(con)
+        self.assertEqual(con.bytes_uploaded, 5 * row)
+        self.render(con)
+        self.assertEqual(con.bytes_uploaded, 0)
+        con.put((4, 3), 65)
+        self.render(con)
+        self.assertEqual(con.bytes_uploaded, row)
+        # Rows in between are uploaded too
+        con.put((0, 1), 66)
+        con.put((9, 3), 67)
+        self.render(con)
+        self.assertEqual(con.bytes_uploaded, 3 * row)
+        # Scrolling vertically only moves the first row
+        con.scroll(2)
+        self.render(con)
+        self.assertEqual(con.bytes_uploaded, 0)
+        con.put((5, 0), 68)
+        shown = self.render(con)
+        self.assertEqual(con.bytes_uploaded, row)
+
+        expected = pix.Console(10, 5)
+        expected.set_tiles(con.get_tiles())
+        self.assertEqual(shown, self.render(expected))
+
+    def test_shared_tile_set_keeps_shown_glyphs(self):
+        """Glyphs shown by one console are not evicted by another one"""
+        # 256 slots, where the 96 ASCII glyphs are always kept
+        tile_set = pix.TileSet(pix.Font.UNSCII_FONT, tile_size=(64, 64))
+        shown = pix.Console(10, 10, tile_set)
+        shown.write("".join(chr(0x100 + i) for i in range(100)))
+        before = self.render(shown)
+
+        # Only 60 of these fit next to the 100 glyphs above
+        other = pix.Console(10, 10, tile_set)
+        text = "".join(chr(0x400 + i) for i in range(100))
+        other.write(text)
+        self.assertEqual(self.render(shown), before)
+        self.render(other)
+        # Glyphs that did not fit are not retried every frame
+        self.render(shown)
+        self.render(other)
+        self.assertEqual(shown.bytes_uploaded, 0)
+        self.assertEqual(other.bytes_uploaded, 0)
+
+        full = pix.Console(10, 10, pix.TileSet(pix.Font.UNSCII_FONT, tile_size=(64, 64)))
+        full.write(text)
+        self.assertNotEqual(self.render(other), self.render(full))
+        # Once the first console stops showing its glyphs they fit
+        shown.clear()
+        self.render(shown)
+        self.assertEqual(self.render(other), self.render(full))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import threading
+import unittest
+
+import pixpy as pix
+
+
+class TestDisplayList(unittest.TestCase):
+    """Test cases for recording and replaying display lists"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("PIX_HEADLESS", "1")
+        try:
+            pix.open_display(width=64, height=64)
+        except Exception as e:
+            raise unittest.SkipTest(f"No display: {e}")
+
+    def pixel(self, image: pix.Image, x: int, y: int) -> list[int]:
+        pixels = image.read_pixels()
+        return [pixels[y, x, c] for c in range(4)]
+
+    def scene(self, canvas: pix.Canvas, sprite: pix.Image):
+        canvas.clear(pix.color.BLUE)
+        canvas.draw_color = pix.color.RED
+        canvas.filled_rect((2, 2), (12, 8))
+        canvas.draw_color = pix.color.GREEN
+        canvas.filled_circle((40, 40), 10)
+        canvas.line((0, 63), (63, 0))
+        canvas.draw(sprite, top_left=(20, 4))
+
+    def make_sprite(self) -> pix.Image:
+        sprite = pix.Image(8, 8)
+        sprite.clear(pix.color.YELLOW)
+        return sprite
+
+    def test_replay_matches_drawing(self):
+        sprite = self.make_sprite()
+        drawn = pix.Image(64, 64)
+        self.scene(drawn, sprite)
+
+        replayed = pix.Image(64, 64)
+        with replayed.record() as dl:
+            self.scene(dl, sprite)
+        for _ in range(2):
+            replayed.replay(dl)
+            self.assertEqual(
+                replayed.read_pixels().tobytes(), drawn.read_pixels().tobytes()
+            )
+
+    def test_replay_flushes_source_pixels(self):
+        sprite = self.make_sprite()
+        target = pix.Image(16, 16)
+        with target.record() as dl:
+            dl.draw(sprite, top_left=(0, 0))
+        sprite.set_pixel((1, 1), 0xFF0000FF)
+        target.replay(dl)
+        self.assertEqual(self.pixel(target, 1, 1), [255, 0, 0, 255])
+        self.assertEqual(self.pixel(target, 2, 2), self.pixel(sprite, 2, 2))
+
+    def test_recorded_text_keeps_glyphs(self):
+        """Glyphs drawn by a display list are not evicted while it exists"""
+        # 256 slots, most of them taken by the console below
+        tile_set = pix.TileSet(pix.Font.UNSCII_FONT, tile_size=(64, 64))
+        text = "".join(chr(0x100 + i) for i in range(4))
+        target = pix.Image(256, 64)
+        with target.record() as dl:
+            tile_set.render_text(dl, text, (0, 0))
+
+        con = pix.Console(16, 10, tile_set)
+        con.write("".join(chr(0x400 + i) for i in range(160)))
+        pix.Image(con.size).draw(con)
+
+        target.replay(dl)
+        expected = pix.Image(256, 64)
+        fresh = pix.TileSet(pix.Font.UNSCII_FONT, tile_size=(64, 64))
+        fresh.render_text(expected, text, (0, 0))
+        self.assertEqual(
+            target.read_pixels().tobytes(), expected.read_pixels().tobytes()
+        )
+
+    def test_recording_is_main_thread_only(self):
+        image = pix.Image(16, 16)
+        dl = image.record()
+        errors: list[Exception] = []
+
+        def record():
+            for fn in (
+                image.record,
+                lambda: pix.DisplayList(image),
+                lambda: dl.filled_rect((0, 0), (4, 4)),
+            ):
+                try:
+                    fn()
+                except RuntimeError as e:
+                    errors.append(e)
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(dl.command_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
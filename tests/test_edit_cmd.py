@@ -1,9 +1,14 @@
 import unittest
 from pixide.edit_cmd import EditCmd, EditSplit, EditJoin, EditDelete, EditInsert
+from pixide.text_buffer import TextBuffer
 
 Char = tuple[int, int]
 
 
+def as_lists(doc: TextBuffer) -> list[list[Char]]:
+    return [list(line) for line in doc]
+
+
 class TestEditCmd(unittest.TestCase):
     """Test cases for the EditCmd base class and all its subclasses"""
 
@@ -20,11 +25,11 @@ class TestEditCmd(unittest.TestCase):
         """Test the base EditCmd class"""
         cmd = EditCmd()
         # Base class has basic apply/undo methods
-        self.assertIsNone(cmd.apply([]))
+        self.assertIsNone(cmd.apply(TextBuffer()))
 
     def test_edit_split_basic(self):
         """Test basic line splitting functionality"""
-        doc = [self.test_doc[0].copy()]  # Copy to avoid modifying original
+        doc = TextBuffer.from_lines([self.test_doc[0]])  # Copy to avoid modifying original
 
         # Split "Hello" at position 2 (after "He")
         cmd = EditSplit(0, 2)
@@ -35,11 +40,11 @@ class TestEditCmd(unittest.TestCase):
             [(0, ord("H")), (0, ord("e"))],
             [(0, ord("l")), (0, ord("l")), (0, ord("o"))],
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_split_undo(self):
         """Test undoing a line split"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         # Split the line
         cmd = EditSplit(0, 2)
@@ -49,12 +54,12 @@ class TestEditCmd(unittest.TestCase):
         cursor_pos = cmd.undo(doc)
 
         # Should restore original line
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
         self.assertEqual(cursor_pos, (0, 2))  # Cursor at split point
 
     def test_edit_split_at_beginning(self):
         """Test splitting at the beginning of a line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditSplit(0, 0)
         cmd.apply(doc)
@@ -63,11 +68,11 @@ class TestEditCmd(unittest.TestCase):
             [],
             [(0, ord("H")), (0, ord("e")), (0, ord("l")), (0, ord("l")), (0, ord("o"))],
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_split_at_end(self):
         """Test splitting at the end of a line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditSplit(0, 5)
         cmd.apply(doc)
@@ -76,14 +81,16 @@ class TestEditCmd(unittest.TestCase):
             [(0, ord("H")), (0, ord("e")), (0, ord("l")), (0, ord("l")), (0, ord("o"))],
             [],
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_join_basic(self):
         """Test basic line joining functionality"""
-        doc: list[list[Char]] = [
-            [(0, ord("H")), (0, ord("e")), (0, ord("l"))],
-            [(0, ord("l")), (0, ord("o"))],
-        ]
+        doc = TextBuffer.from_lines(
+            [
+                [(0, ord("H")), (0, ord("e")), (0, ord("l"))],
+                [(0, ord("l")), (0, ord("o"))],
+            ]
+        )
 
         cmd = EditJoin(0)
         cmd.apply(doc)
@@ -91,7 +98,7 @@ class TestEditCmd(unittest.TestCase):
         expected: list[list[Char]] = [
             [(0, ord("H")), (0, ord("e")), (0, ord("l")), (0, ord("l")), (0, ord("o"))]
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_join_undo(self):
         """Test undoing a line join"""
@@ -99,52 +106,52 @@ class TestEditCmd(unittest.TestCase):
             [(0, ord("H")), (0, ord("e")), (0, ord("l"))],
             [(0, ord("l")), (0, ord("o"))],
         ]
-        doc: list[list[Char]] = [line.copy() for line in original_doc]
+        doc = TextBuffer.from_lines(original_doc)
 
         cmd = EditJoin(0)
         cmd.apply(doc)
         cursor_pos = cmd.undo(doc)
 
         # Should restore original lines
-        self.assertEqual(doc, original_doc)
+        self.assertEqual(as_lists(doc), original_doc)
         self.assertEqual(cursor_pos, (1, 0))  # Cursor at start of second line
 
     def test_edit_join_empty_lines(self):
         """Test joining empty lines"""
-        doc = [[], []]
+        doc = TextBuffer.from_lines([[], []])
 
         cmd = EditJoin(0)
         cmd.apply(doc)
 
         expected = [[]]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_delete_basic(self):
         """Test basic character deletion"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         # Delete 2 characters starting at position 1
         cmd = EditDelete(0, 1, 2)
         cmd.apply(doc)
 
         expected = [[(0, ord("H")), (0, ord("l")), (0, ord("o"))]]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_delete_undo(self):
         """Test undoing character deletion"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditDelete(0, 1, 2)
         cmd.apply(doc)
         cursor_pos = cmd.undo(doc)
 
         # Should restore original line
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
         self.assertEqual(cursor_pos, (0, 3))  # Cursor after restored characters
 
     def test_edit_delete_undo_without_apply(self):
         """Test undoing deletion without applying first"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditDelete(0, 1, 2)
         # Don't apply the command, just try to undo
@@ -153,41 +160,41 @@ class TestEditCmd(unittest.TestCase):
         # Should return None when no characters were removed
         self.assertIsNone(cursor_pos)
         # Document should remain unchanged
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
 
     def test_edit_delete_at_beginning(self):
         """Test deleting characters at the beginning of a line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditDelete(0, 0, 2)
         cmd.apply(doc)
 
         expected = [[(0, ord("l")), (0, ord("l")), (0, ord("o"))]]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_delete_at_end(self):
         """Test deleting characters at the end of a line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditDelete(0, 3, 2)
         cmd.apply(doc)
 
         expected = [[(0, ord("H")), (0, ord("e")), (0, ord("l"))]]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_delete_entire_line(self):
         """Test deleting the entire line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditDelete(0, 0, 5)
         cmd.apply(doc)
 
         expected = [[]]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_insert_basic(self):
         """Test basic character insertion"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         new_chars = [(0, ord("X")), (0, ord("Y"))]
         cmd = EditInsert(0, 2, new_chars)
@@ -204,11 +211,11 @@ class TestEditCmd(unittest.TestCase):
                 (0, ord("o")),
             ]
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_insert_undo(self):
         """Test undoing character insertion"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         new_chars = [(0, ord("X")), (0, ord("Y"))]
         cmd = EditInsert(0, 2, new_chars)
@@ -216,12 +223,12 @@ class TestEditCmd(unittest.TestCase):
         cursor_pos = cmd.undo(doc)
 
         # Should restore original line
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
         self.assertEqual(cursor_pos, (0, 2))  # Cursor at insertion point
 
     def test_edit_insert_at_beginning(self):
         """Test inserting characters at the beginning of a line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         new_chars = [(0, ord("X")), (0, ord("Y"))]
         cmd = EditInsert(0, 0, new_chars)
@@ -238,11 +245,11 @@ class TestEditCmd(unittest.TestCase):
                 (0, ord("o")),
             ]
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_insert_at_end(self):
         """Test inserting characters at the end of a line"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         new_chars = [(0, ord("X")), (0, ord("Y"))]
         cmd = EditInsert(0, 5, new_chars)
@@ -259,33 +266,33 @@ class TestEditCmd(unittest.TestCase):
                 (0, ord("Y")),
             ]
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_edit_insert_empty(self):
         """Test inserting empty character list"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditInsert(0, 2, [])
         cmd.apply(doc)
 
         # Should not change the document
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
 
     def test_edit_insert_empty_undo(self):
         """Test undoing empty insertion"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         cmd = EditInsert(0, 2, [])
         cmd.apply(doc)
         cursor_pos = cmd.undo(doc)
 
         # Should not change the document
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
         self.assertEqual(cursor_pos, (0, 2))
 
     def test_multiple_operations(self):
         """Test multiple operations on the same document"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         # Insert characters
         insert_cmd = EditInsert(0, 2, [(0, ord("X")), (0, ord("Y"))])
@@ -303,11 +310,11 @@ class TestEditCmd(unittest.TestCase):
             [(0, ord("H")), (0, ord("Y")), (0, ord("l"))],
             [(0, ord("l")), (0, ord("o"))],
         ]
-        self.assertEqual(doc, expected)
+        self.assertEqual(as_lists(doc), expected)
 
     def test_undo_chain(self):
         """Test undoing multiple operations in reverse order"""
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
 
         # Apply multiple operations
         insert_cmd = EditInsert(0, 2, [(0, ord("X")), (0, ord("Y"))])
@@ -325,12 +332,12 @@ class TestEditCmd(unittest.TestCase):
         insert_cmd.undo(doc)
 
         # Should restore original document
-        self.assertEqual(doc, [self.test_doc[0]])
+        self.assertEqual(as_lists(doc), [self.test_doc[0]])
 
     def test_edge_cases(self):
         """Test edge cases and boundary conditions"""
         # Test with empty document
-        empty_doc: list[list[Char]] = []
+        empty_doc = TextBuffer.from_lines([])
 
         # These should raise IndexError or behave appropriately
         with self.assertRaises(IndexError):
@@ -353,7 +360,7 @@ class TestEditCmd(unittest.TestCase):
         """Test the CmdStack join_prev parameter functionality"""
         from pixide.edit_cmd import CmdStack, CombinedCmd
         
-        doc = [self.test_doc[0].copy()]
+        doc = TextBuffer.from_lines([self.test_doc[0]])
         stack = CmdStack()
         
         # Apply two commands with join_prev=True for the second
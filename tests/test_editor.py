@@ -140,12 +140,12 @@ class TestEditor(unittest.TestCase):
         # Verify that the console methods were called
         self.mock_console.set_color.assert_called()
         self.mock_console.clear.assert_called()
-        self.mock_console.put.assert_called()
+        self.mock_console.put_row.assert_called()
 
         print("✓ TextEdit.render() test passed")
         print(f"  - set_color called {self.mock_console.set_color.call_count} times")
         print(f"  - clear called {self.mock_console.clear.call_count} times")
-        print(f"  - put called {self.mock_console.put.call_count} times")
+        print(f"  - put_row called {self.mock_console.put_row.call_count} times")
 
 
 if __name__ == "__main__":
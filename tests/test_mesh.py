@@ -0,0 +1,39 @@
+import unittest
+
+import pixpy as pix
+
+
+def comb(teeth: int, vertical: bool) -> list[pix.Float2]:
+    """A polygon with `teeth` thin teeth, 1 unit wide and 1 unit apart"""
+    points: list[tuple[int, int]] = []
+    for i in range(teeth):
+        x = i * 2
+        points += [(x, 0), (x, teeth * 2), (x + 1, teeth * 2), (x + 1, 0)]
+    points += [(teeth * 2, -1), (0, -1)]
+    return [pix.Float2(y, x) if vertical else pix.Float2(x, y) for x, y in points]
+
+
+class TestMesh(unittest.TestCase):
+    """Test cases for triangulating meshes, which does not need a display"""
+
+    def test_winding_does_not_matter(self):
+        square = [pix.Float2(0, 0), pix.Float2(10, 0), pix.Float2(10, 10)]
+        square.append(pix.Float2(0, 10))
+        self.assertEqual(pix.Mesh(square).triangle_count, 2)
+        self.assertEqual(pix.Mesh(square[::-1]).triangle_count, 2)
+
+    def test_too_many_vertices_after_tesselation(self):
+        """Crossing edges add vertices, so few points can be too many"""
+        contours = [comb(140, False), comb(140, True)]
+        self.assertLess(sum(len(c) for c in contours), 2000)
+        with self.assertRaises(ValueError):
+            pix.Mesh(contours=contours)
+
+    def test_too_many_points(self):
+        points = [pix.Float2(i, i % 2) for i in range(0x10001)]
+        with self.assertRaises(ValueError):
+            pix.Mesh(points)
+
+
+if __name__ == "__main__":
+    unittest.main()
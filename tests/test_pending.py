@@ -0,0 +1,66 @@
+import os
+import threading
+import unittest
+from pathlib import Path
+
+import pixpy as pix
+
+DATA = Path(__file__).parent.parent / "examples" / "data"
+FACE = DATA / "face.png"
+FONT = DATA / "HackNerdFont-Regular.ttf"
+
+
+class TestPending(unittest.TestCase):
+    """Test cases for images and fonts loaded in the background"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("PIX_HEADLESS", "1")
+        try:
+            pix.open_display(width=64, height=64)
+        except Exception as e:
+            raise unittest.SkipTest(f"No display: {e}")
+
+    def test_result_only_on_main_thread(self):
+        """Waiting from another thread raises instead of uploading there"""
+        pending = pix.load_png_async(FACE)
+        errors: list[Exception] = []
+
+        def wait():
+            try:
+                pending.result()
+            except RuntimeError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(pending.result().size, pix.Float2(320, 200))
+
+    def test_load_images(self):
+        pending = pix.load_images([FACE, FACE])
+        self.assertEqual(len(pending), 2)
+        for p in pending:
+            self.assertEqual(p.result().size, pix.Float2(320, 200))
+            self.assertTrue(p.done())
+
+    def test_load_font_async(self):
+        font = pix.load_font_async(FONT).result()
+        self.assertEqual(
+            font.text_size("hello", 16), pix.load_font(FONT).text_size("hello", 16)
+        )
+
+    def test_load_errors_are_raised_by_result(self):
+        """A failed load raises its error from result(), not from the loader"""
+        face, missing = pix.load_images([FACE, DATA / "missing.png"])
+        with self.assertRaisesRegex(RuntimeError, "missing.png"):
+            missing.result()
+        self.assertTrue(missing.done())
+        self.assertEqual(face.result().size, pix.Float2(320, 200))
+        with self.assertRaisesRegex(RuntimeError, "missing.ttf"):
+            pix.load_font_async(DATA / "missing.ttf").result()
+
+
+if __name__ == "__main__":
+    unittest.main()
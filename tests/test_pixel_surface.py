@@ -0,0 +1,130 @@
+import os
+import unittest
+
+import pixpy as pix
+
+
+class TestPixelSurface(unittest.TestCase):
+    """Test cases for uploading only the changed areas of a pixel surface"""
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("PIX_HEADLESS", "1")
+        try:
+            pix.open_display(width=64, height=64)
+        except Exception as e:
+            raise unittest.SkipTest(f"No display: {e}")
+
+    def uploaded(self, surface: pix.PixelSurface, change) -> int:
+        """Number of bytes uploaded for the changes done by `change`"""
+        before = surface.bytes_uploaded
+        change(surface)
+        _ = surface.image
+        return surface.bytes_uploaded - before
+
+    def check_image(self, surface: pix.PixelSurface):
+        """The texture must hold the same pixels as the surface"""
+        pixels = surface.image.read_pixels()
+        w, h = surface.size
+        for y in range(h):
+            for x in range(w):
+                color = (
+                    pixels[y, x, 0] << 24
+                    | pixels[y, x, 1] << 16
+                    | pixels[y, x, 2] << 8
+                    | pixels[y, x, 3]
+                )
+                self.assertEqual(color, surface.get_pixel((x, y)), (x, y))
+
+    def test_nothing_changed(self):
+        surface = pix.PixelSurface(32, 32, 0x000000FF)
+        self.assertEqual(self.uploaded(surface, lambda s: None), 0)
+
+    def test_separate_pixels(self):
+        surface = pix.PixelSurface(32, 32, 0x000000FF)
+
+        def change(s):
+            s.set_pixel((0, 0), 0xFF0000FF)
+            s.set_pixel((10, 10), 0x00FF00FF)
+            s.set_pixel((20, 5), 0x0000FFFF)
+            s.set_pixel((31, 31), 0xFFFFFFFF)
+
+        self.assertEqual(self.uploaded(surface, change), 4 * 4)
+        self.check_image(surface)
+
+    def test_touching_pixels_are_merged(self):
+        surface = pix.PixelSurface(32, 32, 0x000000FF)
+
+        def line(s):
+            for x in range(10):
+                s.set_pixel((5 + x, 3), 0xFF0000FF)
+
+        self.assertEqual(self.uploaded(surface, line), 10 * 4)
+
+        def diagonal(s):
+            for i in range(5):
+                s.set_pixel((20 + i, 10 + i), 0x00FF00FF)
+
+        # Corners touch, so the whole 5x5 box is uploaded
+        self.assertEqual(self.uploaded(surface, diagonal), 5 * 5 * 4)
+
+        def same_pixel(s):
+            for _ in range(3):
+                s.set_pixel((1, 1), 0x0000FFFF)
+
+        self.assertEqual(self.uploaded(surface, same_pixel), 4)
+        self.check_image(surface)
+
+    def test_too_many_rects_are_merged(self):
+        surface = pix.PixelSurface(40, 8, 0x000000FF)
+
+        def spaced(count):
+            def change(s):
+                for i in range(count):
+                    s.set_pixel((i * 2, 0), 0xFFFFFFFF)
+
+            return change
+
+        self.assertEqual(self.uploaded(surface, spaced(16)), 16 * 4)
+        # One more than fits, so one box around all of them
+        self.assertEqual(self.uploaded(surface, spaced(17)), 33 * 4)
+        self.check_image(surface)
+
+    def test_clear_uploads_everything(self):
+        surface = pix.PixelSurface(24, 16, 0x000000FF)
+
+        def change(s):
+            s.set_pixel((3, 3), 0xFF0000FF)
+            s.clear(0x102030FF)
+            s.set_pixel((5, 5), 0xFF0000FF)
+
+        self.assertEqual(self.uploaded(surface, change), 24 * 16 * 4)
+        self.check_image(surface)
+
+    def test_flood_fill_uploads_filled_area(self):
+        surface = pix.PixelSurface(16, 16, 0x000000FF)
+        for y in range(16):
+            surface.set_pixel((8, y), 0xFFFFFFFF)
+        _ = surface.image
+
+        def fill(s):
+            s.flood_fill((12, 4), 0xFF0000FF)
+
+        self.assertEqual(self.uploaded(surface, fill), 7 * 16 * 4)
+        self.check_image(surface)
+
+    def test_copy_of_image(self):
+        image = pix.Image(8, 8)
+        image.clear(0x00FF00FF)
+        image.set_pixel((2, 3), 0xFF0000FF)
+        surface = pix.PixelSurface(image)
+        self.assertEqual(surface.size, pix.Int2(8, 8))
+        self.assertEqual(surface.get_pixel((2, 3)), 0xFF0000FF)
+        self.assertEqual(surface.get_pixel((3, 2)), 0x00FF00FF)
+        self.assertEqual(surface.get_pixel((8, 0)), 0)
+        self.assertEqual(self.uploaded(surface, lambda s: None), 0)
+        self.check_image(surface)
+
+
+if __name__ == "__main__":
+    unittest.main()
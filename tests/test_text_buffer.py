@@ -0,0 +1,148 @@
+import unittest
+from pixide.text_buffer import Line, TextBuffer
+
+
+class TestTextBuffer(unittest.TestCase):
+    """Test cases for the TextBuffer text storage"""
+
+    def test_set_and_get_text(self):
+        """Text should survive a round trip unchanged"""
+        buffer = TextBuffer("Hello\nWorld\n")
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.get_text(), "Hello\nWorld\n")
+        self.assertEqual(buffer.line_length(1), 5)
+
+    def test_get_codepoints(self):
+        """Every line, including the last, should end with a newline"""
+        buffer = TextBuffer("Hi\nBye")
+        self.assertEqual(buffer.get_codepoints(), [ord(c) for c in "Hi\nBye\n"])
+
+    def test_text_cache_follows_edits(self):
+        """Cached text must be refreshed by every kind of edit"""
+        buffer = TextBuffer("Hello\nWorld")
+        self.assertEqual(buffer.get_text(), "Hello\nWorld")
+
+        buffer.insert_chars(0, 5, [(ord("!"), 1)])
+        self.assertEqual(buffer.get_text(), "Hello!\nWorld")
+
+        removed = buffer.delete_chars(1, 0, 2)
+        self.assertEqual(removed, [(ord("W"), 1), (ord("o"), 1)])
+        self.assertEqual(buffer.get_text(), "Hello!\nrld")
+
+        buffer.split_line(0, 2)
+        self.assertEqual(buffer.get_text(), "He\nllo!\nrld")
+
+        col = buffer.join_line(1)
+        self.assertEqual(col, 4)
+        self.assertEqual(buffer.get_text(), "He\nllo!rld")
+
+    def test_version(self):
+        """Version should change on text edits but not on color changes"""
+        buffer = TextBuffer("abc")
+        version = buffer.version
+        buffer.set_color(0, 0, -1, 5)
+        self.assertEqual(buffer.version, version)
+        self.assertEqual(buffer[0], [(ord("a"), 5), (ord("b"), 5), (ord("c"), 5)])
+        buffer.insert_chars(0, 0, [(ord("x"), 1)])
+        self.assertNotEqual(buffer.version, version)
+
+    def test_get_chars(self):
+        """get_chars should return a copy of the requested columns"""
+        buffer = TextBuffer("abcd")
+        chars = buffer.get_chars(0, 1, 3)
+        self.assertEqual(chars, [(ord("b"), 1), (ord("c"), 1)])
+        del chars[:]
+        self.assertEqual(buffer.get_text(), "abcd")
+        self.assertEqual(len(buffer.get_chars(0, 2)), 2)
+
+    def test_changes(self):
+        """Recorded changes should describe exactly how the text changed"""
+        buffer = TextBuffer("Hello\nWorld")
+        self.assertIsNone(buffer.take_changes())
+
+        edits = [
+            lambda: buffer.insert_chars(1, 2, [(ord("x"), 1), (ord("y"), 1)]),
+            lambda: buffer.delete_chars(0, 1, 3),
+            lambda: buffer.split_line(1, 3),
+            lambda: buffer.join_line(0),
+        ]
+        for edit in edits:
+            old_text = buffer.get_text()
+            edit()
+            new_text = buffer.get_text()
+            changes = buffer.take_changes()
+            assert changes is not None
+            self.assertEqual(len(changes), 1)
+            c = changes[0]
+            self.assertEqual(c.start_offset, buffer.offset(*c.start))
+            self.assertEqual(c.new_end_offset, buffer.offset(*c.new_end))
+            patched = (
+                old_text[: c.start_offset]
+                + new_text[c.start_offset : c.new_end_offset]
+                + old_text[c.old_end_offset :]
+            )
+            self.assertEqual(patched, new_text)
+
+        buffer.set_text("New text")
+        self.assertIsNone(buffer.take_changes())
+        self.assertEqual(buffer.take_changes(), [])
+
+    def test_offsets_follow_edits(self):
+        """Cached line offsets must match the text after every kind of edit"""
+        buffer = TextBuffer("one\ntwo\nthree\nfour")
+
+        def check():
+            text = buffer.get_text()
+            for line_no in range(len(buffer)):
+                line = buffer.get_line_text(line_no)
+                start = buffer.offset(line_no, 0)
+                self.assertEqual(text[start : start + len(line)], line)
+                self.assertEqual(text.count("\n", 0, start), line_no)
+
+        check()
+        buffer.insert_chars(1, 0, [(ord("x"), 1)] * 3)
+        check()
+        buffer.split_line(0, 1)
+        check()
+        buffer.delete_chars(2, 0, 2)
+        check()
+        buffer.join_line(3)
+        check()
+        buffer.set_text("a\nbb\nccc")
+        check()
+
+
+class TestLine(unittest.TestCase):
+    """Test cases for the array backed Line"""
+
+    def test_list_semantics(self):
+        """A Line should behave like a list of Char tuples"""
+        line = Line.from_text("abc", 2)
+        self.assertEqual(len(line), 3)
+        self.assertEqual(line[1], (ord("b"), 2))
+        self.assertEqual(line, [(ord("a"), 2), (ord("b"), 2), (ord("c"), 2)])
+        self.assertEqual(line[1:], Line([(ord("b"), 2), (ord("c"), 2)]))
+        self.assertEqual(line.get_text(), "abc")
+
+    def test_slice_assignment(self):
+        """Slice assignment should accept both Lines and lists of Chars"""
+        line = Line.from_text("abc")
+        line[1:1] = [(ord("x"), 3)]
+        self.assertEqual(line.get_text(), "axbc")
+        line[0:2] = Line.from_text("12345", 4)
+        self.assertEqual(line.get_text(), "12345bc")
+        self.assertEqual(list(line.colors), [4] * 5 + [1, 1])
+        del line[2:]
+        line += [(ord("!"), 5)]
+        self.assertEqual(line, [(ord("1"), 4), (ord("2"), 4), (ord("!"), 5)])
+
+    def test_set_color(self):
+        """set_color should only touch the colors"""
+        line = Line.from_text("hello")
+        line.set_color(1, 4, 7)
+        self.assertEqual(list(line.colors), [1, 7, 7, 7, 1])
+        self.assertEqual(line.get_text(), "hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,8 +18,30 @@ class MockConsole:
     def put(self, pos, char, fg, bg):
         self.characters[pos] = (char, fg, bg)
     
+    def put_row(self, y, x, tiles, fg=None, bg=None):
+        for i, tile in enumerate(tiles):
+            self.characters[(x + i, y)] = (
+                tile,
+                fg if fg is None or isinstance(fg, int) else fg[i],
+                bg if bg is None or isinstance(bg, int) else bg[i],
+            )
+
     def clear(self):
         self.characters.clear()
+
+    def clear_area(self, x, y, w, h):
+        for pos in list(self.characters):
+            if x <= pos[0] < x + w and y <= pos[1] < y + h:
+                del self.characters[pos]
+
+    def scroll(self, dy, dx=0):
+        self.scrolled = (dy, dx)
+        old = self.characters
+        # Scrolling wraps around like the real console
+        w, h = int(self.grid_size.x), int(self.grid_size.y)
+        self.characters = {
+            ((px + dx) % w, (py + dy) % h): v for (px, py), v in old.items()
+        }
     
     def set_color(self, fg, bg):
         self.fg_color = fg
@@ -137,7 +159,7 @@ class TestTextViewer(unittest.TestCase):
     
     def test_textviewer_initialization(self):
         """Test proper TextViewer initialization"""
-        self.assertEqual(self.viewer.lines, [[]])
+        self.assertEqual([list(line) for line in self.viewer.lines], [[]])
         self.assertEqual(self.viewer.horizontal_scroll, 0)
         self.assertEqual(self.viewer.vertical_scroll, 0)
         self.assertTrue(self.viewer.dirty)
@@ -157,20 +179,20 @@ class TestTextViewer(unittest.TestCase):
             [(ord('W'), 1), (ord('o'), 1), (ord('r'), 1), (ord('l'), 1), (ord('d'), 1)],
             [(ord('T'), 1), (ord('e'), 1), (ord('s'), 1), (ord('t'), 1)]
         ]
-        self.assertEqual(self.viewer.lines, expected_lines)
+        self.assertEqual([list(line) for line in self.viewer.lines], expected_lines)
         self.assertTrue(self.viewer.dirty)
     
     def test_set_text_empty(self):
         """Test setting empty text"""
         self.viewer.set_text("")
-        self.assertEqual(self.viewer.lines, [[]])
+        self.assertEqual([list(line) for line in self.viewer.lines], [[]])
         self.assertTrue(self.viewer.dirty)
     
     def test_set_text_single_line(self):
         """Test setting single line text"""
         self.viewer.set_text("Hello")
         expected = [[(ord('H'), 1), (ord('e'), 1), (ord('l'), 1), (ord('l'), 1), (ord('o'), 1)]]
-        self.assertEqual(self.viewer.lines, expected)
+        self.assertEqual([list(line) for line in self.viewer.lines], expected)
     
     def test_get_text_simple(self):
         """Test retrieving text as string"""
@@ -323,7 +345,7 @@ class TestTextViewer(unittest.TestCase):
             [(ord('D'), 3), (ord('E'), 3), (ord('F'), 3)],  # All highlighted
             [(ord('G'), 3), (ord('H'), 3), (ord('I'), 1)]   # G,H highlighted
         ]
-        self.assertEqual(self.viewer.lines, expected)
+        self.assertEqual([list(line) for line in self.viewer.lines], expected)
     
     def test_highlight_textranges_out_of_bounds(self):
         """Test highlighting with ranges beyond text bounds"""
@@ -427,6 +449,37 @@ class TestTextViewer(unittest.TestCase):
             # The '$' indicator should be placed for cropping
             pass  # This is complex to test without mocking internals
     
+    def test_render_only_changed_rows(self):
+        """Only rows that changed since the last render should be written"""
+        self.viewer.set_text("Hello\nWorld\nAgain")
+        self.viewer.render()
+        self.assertEqual(self.viewer.cells_written, 80 * 24 + 15)
+
+        self.viewer.buffer.insert_chars(1, 5, [(ord("!"), 1)])
+        self.viewer.dirty = True
+        self.viewer.render()
+        self.assertEqual(self.viewer.cells_written, 80 + 6)
+        self.assertEqual(self.console.characters[(5, 1)][0], ord("!"))
+        self.assertEqual(self.console.characters[(0, 2)][0], ord("A"))
+
+        self.viewer.highlight([TextRange(Int2(0, 2), Int2(2, 2), 3)])
+        self.viewer.dirty = True
+        self.viewer.render(selection=TextRange(Int2(0, 0), Int2(2, 0)))
+        self.assertEqual(self.viewer.cells_written, 2 * (80 + 5))
+
+    def test_render_scroll(self):
+        """Scrolling should move the console contents and draw new rows"""
+        self.viewer.set_text("\n".join([f"Line {i}" for i in range(100)]))
+        self.viewer.render()
+        self.viewer.horizontal_scroll = 1
+        self.viewer.dirty = True
+        self.viewer.render()
+        self.assertEqual(self.console.scrolled, (-1, 0))
+        self.assertEqual(self.viewer.cells_written, 80 + 7)
+        self.assertEqual(self.console.characters[(5, 0)][0], ord("1"))
+        self.assertEqual(self.console.characters[(5, 23)][0], ord("2"))
+        self.assertEqual(self.console.characters[(6, 23)][0], ord("4"))
+
     def test_empty_text_rendering(self):
         """Test rendering with empty text"""
         self.viewer.set_text("")
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import Mock
+
+from pixide.text_buffer import TextBuffer
+from pixide.treesitter import TreeSitter
+
+
+def full_parse(text: str) -> TreeSitter:
+    ts = TreeSitter(Mock(buffer=TextBuffer(text)))
+    ts.parse()
+    return ts
+
+
+class TestTreeSitter(unittest.TestCase):
+    """Test cases for the pixide syntax highlighter"""
+
+    def test_incremental_after_non_bmp(self):
+        """Edits after a character outside the BMP must match a full parse"""
+        buffer = TextBuffer(
+            's = "\U0001f600" + 1\nx = 1\ndef f(a):\n    return "\U0001f600" + a\n'
+        )
+        ts = TreeSitter(Mock(buffer=buffer))
+        ts.parse()
+        buffer.insert_chars(0, 5, [(0x1F600, 1)])
+        buffer.split_line(0, 9)
+        buffer.split_line(3, 7)
+        ts.parse()
+
+        full = full_parse(buffer.get_text())
+        self.assertEqual(ts.treesitter.dump_tree(), full.treesitter.dump_tree())
+        self.assertEqual(
+            ts.treesitter.get_highlights(0, len(buffer)),
+            full.treesitter.get_highlights(0, len(buffer)),
+        )
+
+    def test_columns_after_non_bmp(self):
+        """Highlight columns must count a character outside the BMP once"""
+        text = 'x = "\U0001f600" + 12'
+        ts = full_parse(text)
+        hl = iter(ts.treesitter.get_highlights(0, 1))
+        cols = [c0 // 2 for c0, _, _, _, _ in zip(hl, hl, hl, hl, hl)]
+        self.assertEqual(cols, [0, text.index('"'), text.index("12")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from itertools import accumulate
+
+from pixide.utils.wrap import wrap_text
+
+
+class FakeFont:
+    """A proportional font where 'i' is narrow and everything else is 10 wide"""
+
+    def char_width(self, c: str) -> int:
+        return 4 if c == "i" else 10
+
+    def prefix_widths(self, text: str, size: int) -> list[int]:
+        return list(accumulate(map(self.char_width, text), initial=0))
+
+    def text_width(self, text: str) -> int:
+        return sum(map(self.char_width, text))
+
+
+class TestWrapText(unittest.TestCase):
+    """Test cases for wrapping text using a proportional font"""
+
+    def setUp(self):
+        self.font = FakeFont()
+
+    def test_wrap(self):
+        """Lines should fit in the width and break between words"""
+        text = "the quick brown fox jumps over the lazy dog " * 10
+        lines = wrap_text(text, self.font, 16, 200)
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(" ".join(lines), text.strip())
+        for line in lines:
+            self.assertLessEqual(self.font.text_width(line), 200)
+
+    def test_wrap_proportional(self):
+        """Narrow characters should let more of them fit on a line"""
+        lines = wrap_text("iiiiiiiiii xxxxx", self.font, 16, 60)
+        self.assertEqual(lines, ["iiiiiiiiii", "xxxxx"])
+
+    def test_wrap_long_word(self):
+        """Words wider than a line should be split"""
+        lines = wrap_text("x" * 100, self.font, 16, 50)
+        self.assertEqual(lines, ["xxxxx"] * 20)
+        self.assertEqual(wrap_text("x", self.font, 16, 5), ["x"])
+        self.assertEqual(wrap_text("", self.font, 16, 50), [])
+
+
+if __name__ == "__main__":
+    unittest.main()